@@ -10,8 +10,11 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -41,6 +44,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.QueryProfileMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -76,10 +80,99 @@ WSGI_APPLICATION = 'clinic.wsgi.application'
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'NAME': os.environ.get('CLINIC_DB_PATH', BASE_DIR / 'db.sqlite3'),
+    }
+}
+
+# SQLite tuned for concurrent web traffic. WAL lets readers carry on while a
+# booking is being written, synchronous=NORMAL is safe under WAL and avoids an
+# fsync per commit, IMMEDIATE takes the write lock when a transaction begins
+# (so two writers queue on the busy timeout instead of one failing with
+# "database is locked" when it upgrades), and connections are kept open
+# between requests. Select it with CLINIC_DB_PROFILE=production; compare
+# with `manage.py benchmark_booking`.
+CLINIC_SQLITE_PRODUCTION_OPTIONS = {
+    'init_command': 'PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL;',
+    'transaction_mode': 'IMMEDIATE',
+    'timeout': 20,
+}
+
+CLINIC_DB_PROFILE = os.environ.get('CLINIC_DB_PROFILE', 'development')
+if CLINIC_DB_PROFILE == 'production':
+    DATABASES['default'].update(
+        CONN_MAX_AGE=600,
+        CONN_HEALTH_CHECKS=True,
+        OPTIONS=CLINIC_SQLITE_PRODUCTION_OPTIONS,
+    )
+
+
+# Cache
+# Per-process memory is enough: cached fragments are keyed by version stamps
+# stored in the database (see core.caching), so no shared cache is needed.
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
     }
 }
 
+CLINIC_PAGE_CACHE_SECONDS = 600
+
+
+# Sessions and flash messages
+# "db" is Django's default. Every login, and any message too large for its
+# cookie, becomes a write to django_session that queues behind bookings for
+# SQLite's single writer lock. The other modes keep messages in a signed
+# cookie and sessions off the database (file, signed_cookies) or read them
+# through the cache (cached_db, which still writes on save). Expired rows
+# and files are removed by `manage.py cleanup_sessions`; compare the modes
+# with `manage.py benchmark_sessions`.
+CLINIC_SESSION_STORAGE_MODES = {
+    'db': (
+        'django.contrib.sessions.backends.db',
+        'django.contrib.messages.storage.fallback.FallbackStorage',
+    ),
+    'cached_db': (
+        'django.contrib.sessions.backends.cached_db',
+        'django.contrib.messages.storage.cookie.CookieStorage',
+    ),
+    'file': (
+        'django.contrib.sessions.backends.file',
+        'django.contrib.messages.storage.cookie.CookieStorage',
+    ),
+    'signed_cookies': (
+        'django.contrib.sessions.backends.signed_cookies',
+        'django.contrib.messages.storage.cookie.CookieStorage',
+    ),
+}
+
+CLINIC_SESSION_STORAGE = os.environ.get('CLINIC_SESSION_STORAGE', 'db')
+if CLINIC_SESSION_STORAGE not in CLINIC_SESSION_STORAGE_MODES:
+    raise ImproperlyConfigured(
+        f"CLINIC_SESSION_STORAGE={CLINIC_SESSION_STORAGE!r} is not one of: "
+        + ", ".join(CLINIC_SESSION_STORAGE_MODES)
+    )
+SESSION_ENGINE, MESSAGE_STORAGE = CLINIC_SESSION_STORAGE_MODES[CLINIC_SESSION_STORAGE]
+SESSION_FILE_PATH = os.environ.get('CLINIC_SESSION_FILE_PATH') or None
+
+
+# Notifications
+# Bookings and status changes queue emails (and optionally SMS) in the
+# core_notification outbox inside their own transaction; run
+# `manage.py send_notifications --loop` to deliver them. Tests use Django's
+# locmem email backend automatically.
+EMAIL_BACKEND = os.environ.get(
+    'CLINIC_EMAIL_BACKEND', 'django.core.mail.backends.console.EmailBackend'
+)
+DEFAULT_FROM_EMAIL = os.environ.get('CLINIC_FROM_EMAIL', 'Clinic <no-reply@clinic.local>')
+
+CLINIC_NOTIFICATION_CHANNELS = ('email',)
+# Dotted path to a callable(phone, text) that sends an SMS; add 'sms' to
+# CLINIC_NOTIFICATION_CHANNELS once it is set.
+CLINIC_SMS_SENDER = None
+CLINIC_NOTIFICATION_MAX_ATTEMPTS = 5
+CLINIC_NOTIFICATION_RETRY_SECONDS = 60
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -122,6 +215,15 @@ STATIC_ROOT = BASE_DIR / "staticfiles"
 MEDIA_URL = "media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
+# How long a patient may hold a slot while finishing the booking form.
+# 0 disables holds, which keeps booking to a single INSERT.
+CLINIC_SLOT_HOLD_SECONDS = 0
+
+# Per-request SQL profiling (X-SQL-Profile header and the "core.sql" logger).
+# Off unless CLINIC_SQL_PROFILE=1 is set in the environment.
+CLINIC_SQL_PROFILE = os.environ.get("CLINIC_SQL_PROFILE") == "1"
+CLINIC_SQL_PROFILE_HISTORY = 200
+
 LOGIN_URL = "login"
 LOGIN_REDIRECT_URL = "home"
 LOGOUT_REDIRECT_URL = "home"
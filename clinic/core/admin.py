@@ -1,6 +1,15 @@
 from django.contrib import admin
 
-from .models import Appointment, Doctor, Patient, Specialization
+from . import search
+from .models import (
+    Appointment,
+    AppointmentArchive,
+    Doctor,
+    Notification,
+    Patient,
+    SlotHold,
+    Specialization,
+)
 
 
 @admin.register(Specialization)
@@ -14,6 +23,13 @@ class DoctorAdmin(admin.ModelAdmin):
     search_fields = ["name", "specialization__name"]
     list_filter = ["specialization"]
 
+    def get_search_results(self, request, queryset, search_term):
+        # Use the FTS5 index instead of LIKE scans when it is available.
+        ids = search.ranked_ids(search_term, limit=1000, using=queryset.db)
+        if ids is None:
+            return super().get_search_results(request, queryset, search_term)
+        return queryset.filter(pk__in=ids), False
+
 
 @admin.register(Patient)
 class PatientAdmin(admin.ModelAdmin):
@@ -26,3 +42,24 @@ class AppointmentAdmin(admin.ModelAdmin):
     list_display = ["patient", "doctor", "date", "time", "status"]
     list_filter = ["status", "doctor"]
     search_fields = ["patient__name", "doctor__name", "patient__email"]
+
+
+@admin.register(AppointmentArchive)
+class AppointmentArchiveAdmin(admin.ModelAdmin):
+    list_display = ["patient", "doctor", "date", "time", "status", "archived_at"]
+    list_filter = ["doctor"]
+    search_fields = ["patient__name", "doctor__name", "patient__email"]
+    list_select_related = ["patient", "doctor"]
+
+
+@admin.register(SlotHold)
+class SlotHoldAdmin(admin.ModelAdmin):
+    list_display = ["doctor", "date", "time", "user", "expires_at"]
+    list_filter = ["doctor"]
+
+
+@admin.register(Notification)
+class NotificationAdmin(admin.ModelAdmin):
+    list_display = ["recipient", "channel", "subject", "status", "attempts", "next_attempt_at"]
+    list_filter = ["status", "channel"]
+    search_fields = ["recipient", "appointment_id"]
@@ -0,0 +1,77 @@
+"""
+Moving old completed appointments out of the hot ``Appointment`` table.
+
+``archive_completed`` copies Completed appointments dated before a cutoff
+into ``AppointmentArchive`` and deletes them from ``Appointment``, a small
+batch per transaction. Each batch holds the SQLite write lock for a few
+milliseconds, so bookings made while it runs only wait for one batch.
+
+Archiving is a move, not a delete. The dashboard counters and revenue
+rollups keep counting archived visits, so the delete bypasses the
+Appointment signals. ``stats.reconcile`` and ``reporting.rebuild`` count
+both tables.
+"""
+import time
+from datetime import timedelta
+
+from django.db import connections, router, transaction
+from django.utils import timezone
+
+from .models import Appointment, AppointmentArchive
+
+BATCH_SIZE = 500
+ARCHIVE_AFTER_DAYS = 365
+
+_COPIED_FIELDS = ("id", "patient_id", "doctor_id", "date", "time", "status", "notes", "fee", "created_at")
+
+
+def default_cutoff():
+    return timezone.localdate() - timedelta(days=ARCHIVE_AFTER_DAYS)
+
+
+def candidates(before):
+    return Appointment.objects.filter(status=Appointment.STATUS_COMPLETED, date__lt=before)
+
+
+def archive_batch(before, batch_size=BATCH_SIZE):
+    """Move up to ``batch_size`` of the oldest candidates in one transaction; returns the count."""
+    using = router.db_for_write(Appointment)
+    with transaction.atomic(using=using):
+        rows = list(candidates(before).order_by("date", "time", "id").values(*_COPIED_FIELDS)[:batch_size])
+        if not rows:
+            return 0
+        now = timezone.now()
+        AppointmentArchive.objects.bulk_create(
+            AppointmentArchive(archived_at=now, **row) for row in rows
+        )
+        # Nothing references an appointment, so a plain DELETE is safe. It is
+        # raw SQL because .delete() sends the signals that would take these
+        # visits off the counters and rollups. A batch fits in one IN list.
+        ids = [row["id"] for row in rows]
+        with connections[using].cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {Appointment._meta.db_table} WHERE id IN ({', '.join(['%s'] * len(ids))})",
+                ids,
+            )
+    return len(rows)
+
+
+def archive_completed(before=None, batch_size=BATCH_SIZE, pause=0.0, limit=None):
+    """
+    Archive every Completed appointment dated before ``before`` (default: a
+    year ago), ``batch_size`` rows per transaction, sleeping ``pause``
+    seconds between batches. Yields the size of each batch moved.
+    """
+    before = before or default_cutoff()
+    moved = 0
+    while limit is None or moved < limit:
+        size = batch_size if limit is None else min(batch_size, limit - moved)
+        count = archive_batch(before, size)
+        if not count:
+            return
+        moved += count
+        yield count
+        if count < size:
+            return
+        if pause:
+            time.sleep(pause)
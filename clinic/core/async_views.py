@@ -0,0 +1,110 @@
+"""
+Async variants of the public read views, for deployments served by
+``clinic.asgi``. Queries go through the async ORM, so a worker can hold many
+slow clients open without tying up a thread for each. Templates are still
+rendered synchronously because context processors read the session and
+user lazily.
+
+A warm page fragment needs no rows at all. When it is warm, the view passes
+the same lazy fallbacks as the sync view. They only run if the fragment
+expires before rendering, and then they run in the render thread.
+"""
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from django.shortcuts import aget_object_or_404, get_object_or_404, render
+from django.utils.functional import SimpleLazyObject
+
+from . import caching, search
+from .conditional import (
+    conditional,
+    doctor_detail_validators,
+    doctor_list_validators,
+    specialization_validators,
+)
+from .models import Doctor, Specialization
+from .pagination import DOCTOR_ORDERING, KeysetPage, akeyset_paginate, keyset_paginate
+from .profiling import query_budget
+from .views import staff_required
+
+
+@query_budget(6)
+@conditional(doctor_list_validators, private=True)
+async def doctor_list(request):
+    specialization_id = request.GET.get("specialization") or ""
+    if not specialization_id.isdigit():
+        # A page ignores a filter that is not an id; api_doctor_list rejects it.
+        specialization_id = ""
+    query = request.GET.get("q", "").strip()
+    cursor = request.GET.get("cursor") or ""
+    doctors = Doctor.objects.select_related("specialization")
+    specializations = Specialization.objects.all()
+    searching = bool(search.terms(query))
+    if specialization_id and not searching:
+        doctors = doctors.filter(specialization_id=specialization_id)
+
+    def fetch_page():
+        if searching:
+            return KeysetPage(search.search_doctors(doctors, query, specialization_id))
+        return keyset_paginate(doctors, DOCTOR_ORDERING, cursor, per_page=24)
+
+    version = (await caching.aget_versions(caching.DOCTORS, request=request))[caching.DOCTORS]
+    if await caching.ahas_fragment("doctor_list", version, specialization_id, query, cursor):
+        page = SimpleLazyObject(fetch_page)
+    else:
+        if searching:
+            # FTS5 MATCH is raw SQL, which has no async cursor.
+            page = await sync_to_async(fetch_page)()
+        else:
+            page = await akeyset_paginate(doctors, DOCTOR_ORDERING, cursor, per_page=24)
+        specializations = [spec async for spec in specializations]
+    return await sync_to_async(render)(
+        request,
+        "doctors.html",
+        {
+            "doctors": page,
+            "page": page,
+            "specializations": specializations,
+            "specialization_id": specialization_id,
+            "q": query,
+            "cursor": cursor,
+            "cache_seconds": caching.page_cache_seconds(),
+            "cache_version": version,
+        },
+    )
+
+
+@query_budget(5)
+@conditional(doctor_detail_validators, private=True)
+async def doctor_detail(request, pk):
+    key = caching.doctor_key(pk)
+    version = (await caching.aget_versions(key))[key]
+    doctors = Doctor.objects.select_related("specialization")
+    if await caching.ahas_fragment("doctor_title", pk, version) and await caching.ahas_fragment(
+        "doctor_detail", pk, version
+    ):
+        doctor = SimpleLazyObject(lambda: get_object_or_404(doctors, pk=pk))
+    else:
+        doctor = await aget_object_or_404(doctors, pk=pk)
+    return await sync_to_async(render)(
+        request,
+        "doctor_detail.html",
+        {
+            "doctor": doctor,
+            "doctor_pk": pk,
+            "cache_seconds": caching.page_cache_seconds(),
+            "cache_version": version,
+        },
+    )
+
+
+@query_budget(5)
+@staff_required()
+@conditional(specialization_validators)
+async def admin_specialization_detail(request, pk):
+    specialization = await aget_object_or_404(Specialization, pk=pk)
+    data = {
+        "id": specialization.id,
+        "name": specialization.name,
+        "doctor_count": await specialization.doctor_set.acount(),
+    }
+    return JsonResponse(data)
@@ -0,0 +1,207 @@
+from dataclasses import dataclass, field
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from . import notifications, reporting, stats
+from .models import Appointment, SlotHold
+
+SLOT_TAKEN_MESSAGE = "This slot has already been booked for the chosen doctor."
+SLOT_HELD_MESSAGE = "This slot is being booked by another patient. Please pick another time."
+
+# Why an occurrence of a recurring booking could not be booked.
+CONFLICT_BOOKED = "booked"
+CONFLICT_HELD = "held"
+CONFLICT_OFF_SCHEDULE = "off_schedule"
+
+
+class SlotUnavailable(Exception):
+    """The requested slot is already booked or held by someone else."""
+
+
+def hold_seconds():
+    return getattr(settings, "CLINIC_SLOT_HOLD_SECONDS", 0)
+
+
+def create_booking(patient, doctor, date, time, notes="", user=None):
+    """
+    Insert an appointment, relying on the (doctor, date, time) unique
+    constraint instead of a separate existence check.
+
+    With slot holds disabled the appointment is a single INSERT with no
+    read before it; its post_save handlers then update the counters and
+    queue the patient's notification in the same transaction. When holds
+    are enabled the slot must not be held by another user, and the caller's
+    own hold is released in the same transaction.
+    """
+    try:
+        with transaction.atomic():
+            if hold_seconds():
+                held = SlotHold.objects.filter(
+                    doctor=doctor, date=date, time=time, expires_at__gt=timezone.now()
+                )
+                if user is not None:
+                    held = held.exclude(user=user)
+                if held.exists():
+                    raise SlotUnavailable(SLOT_HELD_MESSAGE)
+            appointment = Appointment.objects.create(
+                patient=patient, doctor=doctor, date=date, time=time, notes=notes
+            )
+            if hold_seconds():
+                SlotHold.objects.filter(doctor=doctor, date=date, time=time).delete()
+    except IntegrityError:
+        raise SlotUnavailable(SLOT_TAKEN_MESSAGE)
+    return appointment
+
+
+def hold_slot(user, doctor, date, time):
+    """
+    Reserve a slot for ``user`` for ``CLINIC_SLOT_HOLD_SECONDS``. Holding a new
+    slot releases any other hold the user has; re-holding the same slot
+    extends it.
+    """
+    now = timezone.now()
+    expires_at = now + timedelta(seconds=hold_seconds())
+    with transaction.atomic():
+        if Appointment.objects.filter(doctor=doctor, date=date, time=time).exists():
+            raise SlotUnavailable(SLOT_TAKEN_MESSAGE)
+        SlotHold.objects.filter(doctor=doctor, date=date, time=time, expires_at__lte=now).delete()
+        SlotHold.objects.filter(user=user).exclude(doctor=doctor, date=date, time=time).delete()
+        hold, created = SlotHold.objects.get_or_create(
+            doctor=doctor,
+            date=date,
+            time=time,
+            defaults={"user": user, "expires_at": expires_at},
+        )
+        if not created:
+            if hold.user_id != user.pk:
+                raise SlotUnavailable(SLOT_HELD_MESSAGE)
+            hold.expires_at = expires_at
+            hold.save(update_fields=["expires_at"])
+    return hold
+
+
+def bulk_set_status(queryset, status):
+    """
+    Move every appointment in ``queryset`` to ``status`` with one UPDATE and
+    return how many rows changed. Signals do not fire for queryset updates,
+    so the status counters and revenue rollups are adjusted here from
+    GROUP BYs taken in the same transaction, and patient notifications are
+    queued in it too.
+    """
+    queryset = queryset.exclude(status=status).order_by()
+    with transaction.atomic():
+        previous = dict(
+            queryset.values_list("status").annotate(total=Count("id"))
+        )
+        if not previous:
+            return 0
+        if status == Appointment.STATUS_COMPLETED:
+            rollups = reporting.grouped(queryset)
+        elif Appointment.STATUS_COMPLETED in previous:
+            rollups = reporting.negate(reporting.grouped_completed(queryset))
+        else:
+            rollups = {}
+        notifications.for_bulk_status(queryset, status)
+        updated = queryset.update(status=status)
+        deltas = {stats.status_key(old): -total for old, total in previous.items()}
+        deltas[stats.status_key(status)] = sum(previous.values())
+        stats.adjust(deltas)
+        reporting.record(rollups)
+    return updated
+
+
+@dataclass
+class SeriesResult:
+    created: list = field(default_factory=list)
+    conflicts: list = field(default_factory=list)
+
+    def conflict(self, day, slot, reason):
+        self.conflicts.append((day, slot, reason))
+
+
+def series_conflicts(doctor, slots, user=None):
+    """
+    ``{(date, time): reason}`` for every requested slot that cannot be
+    booked. One query covers every existing appointment, whatever the number
+    of slots, plus one for active holds when holds are enabled.
+    """
+    schedule = doctor.schedule
+    conflicts = {
+        (day, slot): CONFLICT_OFF_SCHEDULE for day, slot in slots if not schedule.allows(day, slot)
+    }
+    candidates = [pair for pair in slots if pair not in conflicts]
+    if not candidates:
+        return conflicts
+    # date IN / time IN can match a few extra pairs, so the result is
+    # narrowed to the requested ones in Python.
+    requested = set(candidates)
+    dates = {day for day, _ in candidates}
+    times = {slot for _, slot in candidates}
+    for pair in Appointment.objects.filter(doctor=doctor, date__in=dates, time__in=times).values_list(
+        "date", "time"
+    ):
+        if pair in requested:
+            conflicts[pair] = CONFLICT_BOOKED
+    if hold_seconds():
+        held = SlotHold.objects.filter(
+            doctor=doctor, date__in=dates, time__in=times, expires_at__gt=timezone.now()
+        )
+        if user is not None:
+            held = held.exclude(user=user)
+        for pair in held.values_list("date", "time"):
+            if pair in requested:
+                conflicts.setdefault(pair, CONFLICT_HELD)
+    return conflicts
+
+
+def create_series(patient, doctor, slots, notes="", user=None, allow_partial=False):
+    """
+    Book every ``(date, time)`` in ``slots`` for ``patient`` in one
+    transaction: one set-based conflict check, then one ``bulk_create``.
+
+    If any slot conflicts, nothing is booked and every conflict is reported.
+    With ``allow_partial``, the free slots are booked anyway. bulk_create
+    skips the model signals, so the counters and the confirmation message
+    are written here, in the same transaction.
+    """
+    slots = sorted(set(slots))
+    result = SeriesResult()
+    for attempt in range(2):
+        try:
+            with transaction.atomic():
+                conflicts = series_conflicts(doctor, slots, user)
+                if conflicts and not allow_partial:
+                    break
+                free = [pair for pair in slots if pair not in conflicts]
+                appointments = Appointment.objects.bulk_create(
+                    Appointment(
+                        patient=patient, doctor=doctor, date=day, time=slot, notes=notes, fee=doctor.fees
+                    )
+                    for day, slot in free
+                )
+                if appointments:
+                    stats.adjust(
+                        {
+                            stats.APPOINTMENTS: len(appointments),
+                            stats.status_key(Appointment.STATUS_PENDING): len(appointments),
+                        }
+                    )
+                    notifications.for_series(appointments)
+                if hold_seconds() and free:
+                    booked = Q()
+                    for day, slot in free:
+                        booked |= Q(date=day, time=slot)
+                    SlotHold.objects.filter(booked, doctor=doctor).delete()
+            result.created = appointments
+            break
+        except IntegrityError:
+            # Someone booked one of the slots after the check; check again.
+            if attempt:
+                raise SlotUnavailable(SLOT_TAKEN_MESSAGE)
+    for (day, slot), reason in sorted(conflicts.items()):
+        result.conflict(day, slot, reason)
+    return result
@@ -0,0 +1,120 @@
+"""
+Version-stamped caching for the public doctor pages.
+
+Rendered fragments live in each worker's local cache, keyed by a version read
+from the CacheVersion table. Bumping a version in the database makes every
+worker miss on its next request, so invalidation needs no shared cache
+server. The version read is a primary-key lookup, far cheaper than the
+queries and template rendering it saves.
+
+Versions are random tokens rather than counters so a rolled-back bump can
+never make a stale fragment match again.
+"""
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+
+from .models import CacheVersion, Doctor
+
+# Doctor list, its specialization filter, the featured doctors on home and
+# the doctor choices in forms.
+DOCTORS = "doctors"
+
+
+def doctor_key(pk):
+    return f"doctor:{pk}"
+
+
+def page_cache_seconds():
+    return getattr(settings, "CLINIC_PAGE_CACHE_SECONDS", 600)
+
+
+def get_versions(*keys, request=None):
+    """
+    Return ``{key: version}`` for ``keys`` in one query; unknown keys map to "".
+    Passing ``request`` remembers the versions for the rest of the request,
+    so the conditional GET check and the view share one lookup.
+    """
+    seen = getattr(request, "_cache_versions", {})
+    missing = [key for key in keys if key not in seen]
+    if missing:
+        versions = dict.fromkeys(missing, "")
+        versions.update(CacheVersion.objects.filter(key__in=missing).values_list("key", "version"))
+        seen = {**seen, **versions}
+        if request is not None:
+            request._cache_versions = seen
+    return {key: seen[key] for key in keys}
+
+
+async def aget_versions(*keys, request=None):
+    """``get_versions`` for async views."""
+    seen = getattr(request, "_cache_versions", {})
+    missing = [key for key in keys if key not in seen]
+    if missing:
+        versions = dict.fromkeys(missing, "")
+        async for key, version in CacheVersion.objects.filter(key__in=missing).values_list(
+            "key", "version"
+        ):
+            versions[key] = version
+        seen = {**seen, **versions}
+        if request is not None:
+            request._cache_versions = seen
+    return {key: seen[key] for key in keys}
+
+
+async def ahas_fragment(name, *vary_on):
+    """Whether the ``{% cache %}`` fragment ``name`` for ``vary_on`` is currently stored."""
+    if not page_cache_seconds():
+        return False
+    return await cache.ahas_key(make_template_fragment_key(name, vary_on))
+
+
+def doctor_choices(request=None):
+    """
+    Every doctor with its specialization, ordered by name, for form choices.
+
+    Only the fields the forms and booking use are loaded: id, name,
+    specialization, fees (stored on new appointments) and the schedule (see
+    ``Doctor.schedule``). The list is cached
+    under the DOCTORS version, so any doctor or specialization change builds
+    a fresh one. A warm request costs just the version lookup, which it
+    shares with the page's other cached parts when ``request`` is given.
+    """
+    version = get_versions(DOCTORS, request=request)[DOCTORS]
+    key = f"doctor_choices:{version}"
+    doctors = cache.get(key) if page_cache_seconds() else None
+    if doctors is None:
+        doctors = list(
+            Doctor.objects.select_related("specialization")
+            .only("name", "fees", "available_days", "time_slots", "updated_at", "specialization__name")
+            .order_by("name", "id")
+        )
+        if page_cache_seconds():
+            cache.set(key, doctors, page_cache_seconds())
+    return doctors
+
+
+def bump(*keys):
+    keys = set(keys)
+    if not keys:
+        return
+    version = uuid4().hex
+    updated = CacheVersion.objects.filter(key__in=keys).update(version=version)
+    if updated < len(keys):
+        existing = set(CacheVersion.objects.filter(key__in=keys).values_list("key", flat=True))
+        CacheVersion.objects.bulk_create(
+            [CacheVersion(key=key, version=version) for key in keys - existing],
+            ignore_conflicts=True,
+        )
+
+
+def invalidate_doctor(pk):
+    bump(DOCTORS, doctor_key(pk))
+
+
+def invalidate_specialization(specialization):
+    """Invalidate the list plus every doctor page that shows ``specialization``."""
+    doctor_ids = Doctor.objects.filter(specialization=specialization).values_list("pk", flat=True)
+    bump(DOCTORS, *(doctor_key(pk) for pk in doctor_ids))
@@ -0,0 +1,131 @@
+"""
+Conditional GET for the doctor pages and JSON endpoints.
+
+Each resource has a validators function returning ``(etag, last_modified)``
+from one cheap query (``updated_at`` timestamps or a cache version stamp).
+A request whose If-None-Match / If-Modified-Since still match gets a 304
+before the view runs, so nothing is fetched or rendered.
+
+Lists use the cache version stamp rather than ``max(updated_at)``, because
+deleting a row does not move the newest timestamp. They send no
+Last-Modified for the same reason, and neither does any payload that
+depends on more than its own timestamps.
+"""
+from calendar import timegm
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.db.models import Count
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+from . import caching
+from .models import Doctor, Specialization
+
+
+def _stamp(value):
+    return f"{value.timestamp():.6f}" if value else "-"
+
+
+def conditional(validators, private=False):
+    """
+    Answer GET/HEAD with 304 when ``validators(request, *args, **kwargs)`` still
+    matches the client's copy, and add ETag, Last-Modified and
+    ``Cache-Control: no-cache`` (so clients always revalidate) to 200s.
+    ``validators`` may return None to skip validation, e.g. for a missing
+    object. Works on sync and async views.
+    """
+
+    def check(request, *args, **kwargs):
+        found = validators(request, *args, **kwargs)
+        if found is None:
+            return None, None, None
+        etag, last_modified = found
+        etag = quote_etag(etag)
+        modified = int(timegm(last_modified.utctimetuple())) if last_modified else None
+        return get_conditional_response(request, etag=etag, last_modified=modified), etag, modified
+
+    def finish(response, etag, modified):
+        if etag is not None and response.status_code == 200:
+            response.headers.setdefault("ETag", etag)
+            if modified is not None:
+                response.headers.setdefault("Last-Modified", http_date(modified))
+        patch_cache_control(response, no_cache=True, **({"private": True} if private else {}))
+        return response
+
+    def decorator(view):
+        if iscoroutinefunction(view):
+
+            @wraps(view)
+            async def wrapper(request, *args, **kwargs):
+                if request.method not in ("GET", "HEAD"):
+                    return await view(request, *args, **kwargs)
+                response, etag, modified = await sync_to_async(check)(request, *args, **kwargs)
+                if response is None:
+                    response = await view(request, *args, **kwargs)
+                return finish(response, etag, modified)
+
+            return markcoroutinefunction(wrapper)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ("GET", "HEAD"):
+                return view(request, *args, **kwargs)
+            response, etag, modified = check(request, *args, **kwargs)
+            if response is None:
+                response = view(request, *args, **kwargs)
+            return finish(response, etag, modified)
+
+        return wrapper
+
+    return decorator
+
+
+def _viewer(request):
+    # Pages show the signed-in user in the navbar.
+    return f"u{request.user.pk or 0}"
+
+
+def _doctor_stamps(pk):
+    row = Doctor.objects.filter(pk=pk).values_list("updated_at", "specialization__updated_at").first()
+    if row is None:
+        return None
+    doctor_at, specialization_at = row
+    return f"{_stamp(doctor_at)}-{_stamp(specialization_at)}", max(filter(None, row))
+
+
+def doctor_list_validators(request):
+    version = caching.get_versions(caching.DOCTORS, request=request)[caching.DOCTORS]
+    return f"{version}-{_viewer(request)}", None
+
+
+def doctor_detail_validators(request, pk):
+    stamps = _doctor_stamps(pk)
+    if stamps is None:
+        return None
+    etag, last_modified = stamps
+    return f"{etag}-{_viewer(request)}", last_modified
+
+
+def doctor_api_list_validators(request):
+    return caching.get_versions(caching.DOCTORS, request=request)[caching.DOCTORS], None
+
+
+def doctor_api_detail_validators(request, pk):
+    return _doctor_stamps(pk)
+
+
+def specialization_validators(request, pk):
+    # The payload includes a doctor count, which changes without touching
+    # updated_at, so it is part of the ETag and no Last-Modified is sent.
+    row = (
+        Specialization.objects.filter(pk=pk)
+        .values_list("updated_at")
+        .annotate(doctor_count=Count("doctor"))
+        .order_by("pk")
+        .first()
+    )
+    if row is None:
+        return None
+    updated_at, doctor_count = row
+    return f"{_stamp(updated_at)}-{doctor_count}", None
@@ -0,0 +1,67 @@
+"""
+Streaming appointment exports.
+
+Rows are read with ``values_list(...).iterator()`` so only one chunk is held
+in memory at a time, and each row is encoded and handed to the caller as
+soon as it is read. Memory use is the same for 1k or 5M appointments.
+"""
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+CHUNK_SIZE = 2000
+
+COLUMNS = [
+    ("id", "id"),
+    ("date", "date"),
+    ("time", "time"),
+    ("status", "status"),
+    ("patient", "patient__name"),
+    ("patient_email", "patient__email"),
+    ("patient_phone", "patient__phone"),
+    ("doctor", "doctor__name"),
+    ("specialization", "doctor__specialization__name"),
+    ("notes", "notes"),
+    ("created_at", "created_at"),
+]
+HEADERS = [header for header, _ in COLUMNS]
+
+
+class _Echo:
+    """File-like object whose write() hands the encoded line straight back."""
+
+    def write(self, value):
+        return value
+
+
+def iter_rows(queryset, chunk_size=CHUNK_SIZE):
+    # No ORDER BY: rows come back in storage order so SQLite never has to sort.
+    return (
+        queryset.order_by()
+        .values_list(*(lookup for _, lookup in COLUMNS))
+        .iterator(chunk_size=chunk_size)
+    )
+
+
+def csv_lines(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(HEADERS)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def ndjson_lines(rows):
+    for row in rows:
+        yield json.dumps(dict(zip(HEADERS, row)), cls=DjangoJSONEncoder) + "\n"
+
+
+FORMATS = {
+    "csv": (csv_lines, "text/csv"),
+    "ndjson": (ndjson_lines, "application/x-ndjson"),
+}
+
+
+def export_lines(queryset, fmt="csv", chunk_size=CHUNK_SIZE):
+    encode, _ = FORMATS[fmt]
+    return encode(iter_rows(queryset, chunk_size))
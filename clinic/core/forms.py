@@ -1,34 +1,128 @@
+from datetime import timedelta
+
 from django import forms
 
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.models import User
+from django.utils import timezone
 
+from . import caching
 from .models import Appointment, Doctor, Specialization, Patient
+from .schedule import TIME_INPUT_FORMATS, WEEKDAY_NAMES, format_slot_time
+
+
+class DoctorChoiceField(forms.ChoiceField):
+    """
+    A doctor picker over an already loaded list of doctors (normally
+    ``caching.doctor_choices``). It cleans to the matching Doctor, so
+    neither rendering nor validation queries the doctor table.
+    """
+
+    def __init__(self, *, empty_label="---------", **kwargs):
+        self.empty_label = empty_label
+        self._doctors = ()
+        self._by_pk = None
+        super().__init__(**kwargs)
+
+    def set_doctors(self, doctors):
+        """``doctors`` is a list, or a callable returning one when first needed."""
+        self._doctors = doctors
+        self._by_pk = None
+        # A callable is only evaluated when the widget renders.
+        self.choices = self._choice_list
+
+    def _by_id(self):
+        if self._by_pk is None:
+            if callable(self._doctors):
+                self._doctors = self._doctors()
+            self._by_pk = {str(doctor.pk): doctor for doctor in self._doctors}
+        return self._by_pk
+
+    def _choice_list(self):
+        return [("", self.empty_label)] + [
+            (pk, doctor.name) for pk, doctor in self._by_id().items()
+        ]
+
+    def prepare_value(self, value):
+        return value.pk if isinstance(value, Doctor) else value
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+        try:
+            return self._by_id()[str(value)]
+        except KeyError:
+            raise forms.ValidationError(
+                self.error_messages["invalid_choice"],
+                code="invalid_choice",
+                params={"value": value},
+            )
+
+    def validate(self, value):
+        # to_python already rejected unknown ids.
+        forms.Field.validate(self, value)
+
 
+class DoctorChoicesMixin:
+    """
+    Fills the form's ``doctor`` field from ``doctors``, or from the cached
+    choices the first time the field renders or cleans a doctor id.
+    """
 
-class AppointmentForm(forms.Form):
+    def __init__(self, *args, doctors=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields["doctor"].set_doctors(caching.doctor_choices if doctors is None else doctors)
+
+
+def check_schedule(form):
+    """
+    Add field errors when the cleaned ``date``/``time`` fall outside the
+    cleaned doctor's weekly schedule. Uses the compiled schedule, so it is
+    two set lookups and no queries.
+    """
+    doctor = form.cleaned_data.get("doctor")
+    day = form.cleaned_data.get("date")
+    slot = form.cleaned_data.get("time")
+    if not (doctor and day and slot):
+        return
+    schedule = doctor.schedule
+    if not schedule.works_on(day):
+        form.add_error(
+            "date",
+            f"{doctor.name} does not see patients on {WEEKDAY_NAMES[day.weekday()]}. "
+            f"Available days: {', '.join(schedule.day_names) or 'none'}.",
+        )
+    elif not schedule.has_slot(slot):
+        form.add_error(
+            "time",
+            f"{format_slot_time(slot)} is not one of {doctor.name}'s slots. "
+            f"Available times: {', '.join(schedule.slot_labels) or 'none'}.",
+        )
+
+
+class AppointmentForm(DoctorChoicesMixin, forms.Form):
     name = forms.CharField(max_length=200)
     phone = forms.CharField(max_length=20)
     email = forms.EmailField()
-    doctor = forms.ModelChoiceField(queryset=Doctor.objects.all())
+    doctor = DoctorChoiceField()
     date = forms.DateField(widget=forms.DateInput(attrs={"type": "date"}))
-    time = forms.CharField(max_length=50)
+    time = forms.TimeField(input_formats=TIME_INPUT_FORMATS)
     notes = forms.CharField(widget=forms.Textarea, required=False)
 
     def clean(self):
         cleaned_data = super().clean()
-        doctor = cleaned_data.get("doctor")
-        time = cleaned_data.get("time", "").strip()
-        date = cleaned_data.get("date")
-
-        if doctor and date and time:
-            exists = Appointment.objects.filter(
-                doctor=doctor, date=date, time=time
-            ).exists()
-            if exists:
-                raise forms.ValidationError(
-                    "This slot has already been booked for the chosen doctor."
-                )
+        check_schedule(self)
+        return cleaned_data
+
+
+class SlotHoldForm(DoctorChoicesMixin, forms.Form):
+    doctor = DoctorChoiceField()
+    date = forms.DateField()
+    time = forms.TimeField(input_formats=TIME_INPUT_FORMATS)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        check_schedule(self)
         return cleaned_data
 
 
@@ -61,17 +155,127 @@ class AppointmentStatusForm(forms.ModelForm):
         fields = ["status"]
 
 
-class AppointmentFilterForm(forms.Form):
-    doctor = forms.ModelChoiceField(
-        queryset=Doctor.objects.all(),
-        required=False,
-        empty_label="All doctors",
-    )
+class AppointmentFilterForm(DoctorChoicesMixin, forms.Form):
+    doctor = DoctorChoiceField(required=False, empty_label="All doctors")
     status = forms.ChoiceField(
         choices=[("", "All statuses")] + list(Appointment.STATUS_CHOICES),
         required=False,
     )
+    date_from = forms.DateField(
+        required=False, widget=forms.DateInput(attrs={"type": "date"})
+    )
+    date_to = forms.DateField(
+        required=False, widget=forms.DateInput(attrs={"type": "date"})
+    )
+
+    def filter(self, queryset):
+        """Apply the cleaned filters to ``queryset``; unbound or invalid forms filter nothing."""
+        if not self.is_valid():
+            return queryset
+        doctor = self.cleaned_data.get("doctor")
+        status = self.cleaned_data.get("status")
+        date_from = self.cleaned_data.get("date_from")
+        date_to = self.cleaned_data.get("date_to")
+        if doctor:
+            queryset = queryset.filter(doctor=doctor)
+        if status:
+            queryset = queryset.filter(status=status)
+        if date_from:
+            queryset = queryset.filter(date__gte=date_from)
+        if date_to:
+            queryset = queryset.filter(date__lte=date_to)
+        return queryset
+
+
+class IdListField(forms.Field):
+    widget = forms.MultipleHiddenInput
+
+    def to_python(self, value):
+        try:
+            return [int(pk) for pk in value or []]
+        except (TypeError, ValueError):
+            raise forms.ValidationError("Invalid appointment selection.")
+
+
+class AppointmentBulkStatusForm(forms.Form):
+    SCOPE_SELECTED = "selected"
+    SCOPE_FILTERED = "filtered"
+
+    status = forms.ChoiceField(choices=Appointment.STATUS_CHOICES)
+    scope = forms.ChoiceField(
+        choices=[
+            (SCOPE_SELECTED, "Selected appointments"),
+            (SCOPE_FILTERED, "All matching the filter"),
+        ],
+        initial=SCOPE_SELECTED,
+    )
+    ids = IdListField(required=False)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if cleaned_data.get("scope") == self.SCOPE_SELECTED and not cleaned_data.get("ids"):
+            raise forms.ValidationError("Select at least one appointment.")
+        return cleaned_data
+
+
+class OccurrenceListField(forms.Field):
+    """A JSON list of ``{"date": ..., "time": ...}`` objects, cleaned to ``[(date, time), ...]``."""
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return []
+        if not isinstance(value, list):
+            raise forms.ValidationError("Expected a list of {date, time} objects.")
+        date_field = forms.DateField()
+        time_field = forms.TimeField(input_formats=TIME_INPUT_FORMATS)
+        slots = []
+        for number, item in enumerate(value, start=1):
+            try:
+                if not isinstance(item, dict):
+                    raise forms.ValidationError("not an object")
+                slots.append((date_field.clean(item.get("date")), time_field.clean(item.get("time"))))
+            except forms.ValidationError:
+                raise forms.ValidationError(f"Occurrence {number} needs a valid date and time.")
+        return slots
+
 
+class RecurringBookingForm(DoctorChoicesMixin, forms.Form):
+    """
+    A series of bookings with one doctor: ``start``, ``time`` and ``count``
+    repeated every ``interval_weeks``, and/or an explicit ``occurrences``
+    list. Cleans to ``slots``, a sorted list of distinct ``(date, time)``.
+    """
+
+    MAX_OCCURRENCES = 26
+
+    doctor = DoctorChoiceField()
+    start = forms.DateField(required=False)
+    time = forms.TimeField(input_formats=TIME_INPUT_FORMATS, required=False)
+    count = forms.IntegerField(min_value=1, max_value=MAX_OCCURRENCES, required=False)
+    interval_weeks = forms.IntegerField(min_value=1, max_value=4, required=False)
+    occurrences = OccurrenceListField(required=False)
+    notes = forms.CharField(required=False)
+    allow_partial = forms.BooleanField(required=False)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if self.errors:
+            return cleaned_data
+        slots = set(cleaned_data.get("occurrences") or [])
+        start, slot = cleaned_data.get("start"), cleaned_data.get("time")
+        if start and slot:
+            step = timedelta(weeks=cleaned_data.get("interval_weeks") or 1)
+            slots.update((start + step * i, slot) for i in range(cleaned_data.get("count") or 1))
+        elif start or slot or cleaned_data.get("count"):
+            raise forms.ValidationError("A repeating series needs both start and time.")
+        if not slots:
+            raise forms.ValidationError("Give start, time and count, or a list of occurrences.")
+        if len(slots) > self.MAX_OCCURRENCES:
+            raise forms.ValidationError(f"A series can have at most {self.MAX_OCCURRENCES} occurrences.")
+        cleaned_data["slots"] = sorted(slots)
+        if cleaned_data["slots"][0][0] < timezone.localdate():
+            raise forms.ValidationError("Occurrences cannot be in the past.")
+        return cleaned_data
 
 
 class PatientSignupForm(UserCreationForm):
@@ -0,0 +1,308 @@
+"""
+Bulk import of doctors, patients and appointments from CSV, JSON or NDJSON.
+
+Rows are validated in Python and written with ``bulk_create`` one batch per
+transaction. Lookups that would otherwise run per row happen once per batch:
+specializations by name, patients by email (case-insensitively), and booked
+(doctor, date, time) slots. A bad row is recorded as rejected and never
+aborts its batch. A batch that still hits a constraint, say because another
+process inserted the same patient meanwhile, is rolled back and the rest
+of its rows are reported as rejected too; later batches carry on.
+
+``bulk_create`` skips ``save()`` and signals, so each batch also builds
+schedule slots, adjusts the dashboard counters and revenue rollups,
+indexes new doctors for search and invalidates the doctor page cache itself.
+"""
+import abc
+import csv
+import json
+from dataclasses import dataclass, field
+from datetime import date
+from itertools import islice
+from pathlib import Path
+
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import IntegrityError, transaction
+from django.db.models.functions import Lower
+
+from . import caching, reporting, search, stats
+from .models import Appointment, Doctor, Patient, ScheduleSlot, Specialization
+from .schedule import parse_schedule, parse_slot_time
+
+BATCH_SIZE = 5000
+STATUSES = {status for status, _ in Appointment.STATUS_CHOICES}
+
+
+class RowError(ValueError):
+    pass
+
+
+@dataclass
+class ImportResult:
+    created: int = 0
+    rejected: list = field(default_factory=list)
+
+    def reject(self, number, row, reason):
+        self.rejected.append((number, reason, row))
+
+
+def read_rows(path, fmt=None):
+    """Yield one dict per record from a .csv, .json (array) or .ndjson file."""
+    path = Path(path)
+    fmt = fmt or path.suffix.lstrip(".").lower()
+    with path.open(newline="", encoding="utf-8") as fh:
+        if fmt == "csv":
+            yield from csv.DictReader(fh)
+        elif fmt == "json":
+            yield from json.load(fh)
+        elif fmt == "ndjson":
+            for line in fh:
+                if line.strip():
+                    try:
+                        yield json.loads(line)
+                    except ValueError as exc:
+                        # One bad line is one rejected row, not a failed import.
+                        yield RowError(f"not valid JSON: {exc}")
+        else:
+            raise ValueError(f"Unsupported import format: {fmt!r}")
+
+
+def _text(row, key, required=True):
+    value = str(row.get(key) or "").strip()
+    if required and not value:
+        raise RowError(f"'{key}' is required")
+    return value
+
+
+def _int(row, key):
+    try:
+        return int(_text(row, key))
+    except ValueError:
+        raise RowError(f"'{key}' must be a whole number")
+
+
+def _date(row, key):
+    try:
+        return date.fromisoformat(_text(row, key))
+    except ValueError:
+        raise RowError(f"'{key}' must be a YYYY-MM-DD date")
+
+
+def _email(row, key):
+    email = _text(row, key).lower()
+    try:
+        validate_email(email)
+    except ValidationError:
+        raise RowError(f"'{key}' is not a valid email address")
+    return email
+
+
+def _time(row, key):
+    parsed = parse_slot_time(_text(row, key))
+    if parsed is None:
+        raise RowError(f"'{key}' is not a recognised time")
+    return parsed
+
+
+def _patient_ids(emails):
+    """Map lowercased ``emails`` to patient ids, ignoring the case stored."""
+    return dict(
+        Patient.objects.annotate(email_lower=Lower("email"))
+        .filter(email_lower__in=emails)
+        .values_list("email_lower", "id")
+    )
+
+
+class Importer(abc.ABC):
+    def __init__(self, batch_size=BATCH_SIZE):
+        self.batch_size = batch_size
+
+    def run(self, rows):
+        result = ImportResult()
+        numbered = enumerate(rows, start=1)
+        while batch := list(islice(numbered, self.batch_size)):
+            records = []
+            for number, row in batch:
+                if isinstance(row, dict):
+                    records.append((number, row))
+                elif isinstance(row, RowError):
+                    result.reject(number, None, str(row))
+                else:
+                    result.reject(number, row, "expected an object with named fields")
+            if not records:
+                continue
+            rejected, created = len(result.rejected), result.created
+            try:
+                with transaction.atomic():
+                    self.import_batch(records, result)
+            except IntegrityError as exc:
+                result.created = created
+                self.batch_failed()
+                already = {number for number, _, _ in result.rejected[rejected:]}
+                for number, row in records:
+                    if number not in already:
+                        result.reject(number, row, f"batch rolled back: {exc}")
+        return result
+
+    @abc.abstractmethod
+    def import_batch(self, batch, result):
+        """Validate and insert ``(number, row)`` pairs, recording rejects on ``result``."""
+
+    def batch_failed(self):
+        """Forget state cached from a batch that was rolled back."""
+
+
+class DoctorImporter(Importer):
+    """Columns: name, specialization, experience, fees, available_days, time_slots, biography."""
+
+    def __init__(self, batch_size=BATCH_SIZE):
+        super().__init__(batch_size)
+        self.specializations = dict(Specialization.objects.values_list("name", "id"))
+
+    def import_batch(self, batch, result):
+        doctors = []
+        for number, row in batch:
+            try:
+                doctors.append(
+                    Doctor(
+                        name=_text(row, "name"),
+                        specialization_id=self._specialization_id(_text(row, "specialization", False)),
+                        experience=_int(row, "experience"),
+                        fees=_int(row, "fees"),
+                        available_days=_text(row, "available_days"),
+                        time_slots=_text(row, "time_slots"),
+                        biography=_text(row, "biography", False),
+                    )
+                )
+            except RowError as exc:
+                result.reject(number, row, str(exc))
+        if not doctors:
+            return
+        Doctor.objects.bulk_create(doctors)
+        slots = []
+        for doctor in doctors:
+            days, times = parse_schedule(doctor.available_days, doctor.time_slots)
+            slots.extend(
+                ScheduleSlot(doctor_id=doctor.pk, weekday=day, start_time=time)
+                for day in days
+                for time in times
+            )
+        ScheduleSlot.objects.bulk_create(slots)
+        stats.adjust({stats.DOCTORS: len(doctors)})
+        search.index_doctors(doctor.pk for doctor in doctors)
+        caching.bump(caching.DOCTORS)
+        result.created += len(doctors)
+
+    def _specialization_id(self, name):
+        if not name:
+            return None
+        if name not in self.specializations:
+            self.specializations[name] = Specialization.objects.get_or_create(name=name)[0].pk
+        return self.specializations[name]
+
+    def batch_failed(self):
+        self.specializations = dict(Specialization.objects.values_list("name", "id"))
+
+
+class PatientImporter(Importer):
+    """Columns: name, phone, email. Malformed emails and emails already on file are rejected."""
+
+    def import_batch(self, batch, result):
+        emails = {str(row.get("email") or "").strip().lower() for _, row in batch}
+        taken = set(_patient_ids(emails))
+        patients = []
+        for number, row in batch:
+            try:
+                email = _email(row, "email")
+                if email in taken:
+                    raise RowError(f"a patient with email {email} already exists")
+                patients.append(Patient(name=_text(row, "name"), phone=_text(row, "phone"), email=email))
+                taken.add(email)
+            except RowError as exc:
+                result.reject(number, row, str(exc))
+        Patient.objects.bulk_create(patients)
+        stats.adjust({stats.PATIENTS: len(patients)})
+        result.created += len(patients)
+
+
+class AppointmentImporter(Importer):
+    """
+    Columns: patient_email, doctor_id, date, time, status, notes. Rows that
+    collide with a booked (doctor, date, time) slot, or with an earlier row
+    in the file, are rejected.
+    """
+
+    def __init__(self, batch_size=BATCH_SIZE):
+        super().__init__(batch_size)
+        self.doctor_fees = dict(Doctor.objects.values_list("id", "fees"))
+        self.seen = set()
+
+    def import_batch(self, batch, result):
+        parsed = []
+        for number, row in batch:
+            try:
+                doctor_id = _int(row, "doctor_id")
+                if doctor_id not in self.doctor_fees:
+                    raise RowError(f"doctor {doctor_id} does not exist")
+                status = _text(row, "status", False) or Appointment.STATUS_PENDING
+                if status not in STATUSES:
+                    raise RowError(f"unknown status {status!r}")
+                parsed.append(
+                    (number, row, _email(row, "patient_email"), doctor_id,
+                     _date(row, "date"), _time(row, "time"), status)
+                )
+            except RowError as exc:
+                result.reject(number, row, str(exc))
+        if not parsed:
+            return
+
+        patients = _patient_ids({item[2] for item in parsed})
+        booked = set(
+            Appointment.objects.filter(
+                doctor_id__in={item[3] for item in parsed},
+                date__in={item[4] for item in parsed},
+            ).values_list("doctor_id", "date", "time")
+        )
+
+        appointments, keys = [], set()
+        for number, row, email, doctor_id, day, slot, status in parsed:
+            key = (doctor_id, day, slot)
+            if email not in patients:
+                result.reject(number, row, f"no patient with email {email}")
+            elif key in booked or key in self.seen or key in keys:
+                result.reject(number, row, "slot already booked for this doctor")
+            else:
+                keys.add(key)
+                appointments.append(
+                    Appointment(
+                        patient_id=patients[email],
+                        doctor_id=doctor_id,
+                        date=day,
+                        time=slot,
+                        status=status,
+                        notes=_text(row, "notes", False),
+                        fee=self.doctor_fees[doctor_id],
+                    )
+                )
+        Appointment.objects.bulk_create(appointments)
+        self.seen |= keys
+        deltas = {stats.APPOINTMENTS: len(appointments)}
+        rollups = {}
+        for appointment in appointments:
+            key = stats.status_key(appointment.status)
+            deltas[key] = deltas.get(key, 0) + 1
+            if appointment.status == Appointment.STATUS_COMPLETED:
+                month = (appointment.doctor_id, reporting.month_of(appointment.date))
+                completed, revenue = rollups.get(month, (0, 0))
+                rollups[month] = (completed + 1, revenue + appointment.fee)
+        stats.adjust(deltas)
+        reporting.record(rollups)
+        result.created += len(appointments)
+
+
+IMPORTERS = {
+    "doctors": DoctorImporter,
+    "patients": PatientImporter,
+    "appointments": AppointmentImporter,
+}
@@ -0,0 +1,58 @@
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import archive
+
+
+class Command(BaseCommand):
+    help = (
+        "Move completed appointments older than the cutoff into the archive "
+        "table, in small transactions so bookings are not blocked."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--before",
+            help=f"Archive appointments dated before this YYYY-MM-DD "
+            f"(default: {archive.ARCHIVE_AFTER_DAYS} days ago).",
+        )
+        parser.add_argument("--batch-size", type=int, default=archive.BATCH_SIZE)
+        parser.add_argument(
+            "--pause", type=float, default=0.05, help="Seconds to sleep between batches."
+        )
+        parser.add_argument("--limit", type=int, help="Stop after moving this many rows.")
+        parser.add_argument(
+            "--dry-run", action="store_true", help="Only count what would be archived."
+        )
+
+    def handle(self, *args, **options):
+        try:
+            before = date.fromisoformat(options["before"]) if options["before"] else archive.default_cutoff()
+        except ValueError:
+            raise CommandError("--before must be a date in YYYY-MM-DD format.")
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be at least 1.")
+
+        if options["dry_run"]:
+            count = archive.candidates(before).count()
+            self.stdout.write(f"{count} completed appointment(s) before {before} would be archived.")
+            return
+
+        started = time.perf_counter()
+        moved = batches = 0
+        for count in archive.archive_completed(
+            before, options["batch_size"], options["pause"], options["limit"]
+        ):
+            moved += count
+            batches += 1
+            if options["verbosity"] > 1:
+                self.stdout.write(f"batch {batches}: {count} row(s)")
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Archived {moved} appointment(s) dated before {before} "
+                f"in {batches} batch(es), {elapsed:.1f}s."
+            )
+        )
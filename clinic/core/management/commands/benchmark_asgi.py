@@ -0,0 +1,148 @@
+import asyncio
+import json
+import platform
+import random
+import statistics
+import time
+from datetime import datetime, timezone
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import AsyncClient, Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from core import probes, seeding
+
+# (sync URL name, async URL name) for each view with an async variant.
+PAIRS = [
+    ("doctor_list", "doctor_list_async"),
+    ("doctor_detail", "doctor_detail_async"),
+    ("api_specialization_detail", "api_specialization_detail_async"),
+]
+
+
+def summarize(timings, elapsed):
+    return {
+        "requests": len(timings),
+        "requests_per_s": round(len(timings) / elapsed, 1),
+        "mean_ms": round(statistics.fmean(timings), 3),
+        "p50_ms": round(probes.percentile(timings, 50), 3),
+        "p99_ms": round(probes.percentile(timings, 99), 3),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a scratch database and compare each read view served the WSGI "
+        "way (sync view, sync client) with its async variant under ASGI, one "
+        "request at a time and with many requests in flight. The sync view "
+        "under ASGI is included as the baseline for concurrency. Prints JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--appointments", type=int, default=10000, help="Seeded appointment count.")
+        parser.add_argument("--requests", type=int, default=50, help="Timed requests per mode.")
+        parser.add_argument("--concurrency", type=int, default=20, help="Requests in flight at once.")
+        parser.add_argument("--seed", type=int, default=1)
+        parser.add_argument("--no-cache", action="store_true", help="Disable page fragment caching.")
+        parser.add_argument("--output", "-o", help="Write JSON here instead of stdout.")
+
+    def handle(self, *args, **options):
+        overrides = {"ALLOWED_HOSTS": ["testserver"], "DEBUG": False}
+        if options["no_cache"]:
+            overrides["CLINIC_PAGE_CACHE_SECONDS"] = 0
+        report = {
+            "commit": probes.git_commit(),
+            "started_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "database": connection.vendor,
+            "appointments": options["appointments"],
+            "concurrency": options["concurrency"],
+            "page_cache": not options["no_cache"],
+            "views": [],
+        }
+
+        with probes.scratch_database(), override_settings(**overrides):
+            scale = options["appointments"]
+            self.stderr.write(f"Seeding {scale} appointments...")
+            seeding.seed(
+                specializations=12,
+                doctors=max(5, scale // 200),
+                patients=max(10, scale // 5),
+                appointments=scale,
+                rng=random.Random(options["seed"]),
+            )
+            sample = probes.create_sample_data()
+            for sync_name, async_name in PAIRS:
+                sync_path = reverse(sync_name, kwargs=self._kwargs(sync_name, sample))
+                async_path = reverse(async_name, kwargs=self._kwargs(async_name, sample))
+                report["views"].append(
+                    {
+                        "view": sync_name,
+                        "wsgi": self._wsgi(sample["user"], sync_path, options["requests"]),
+                        **asyncio.run(self._asgi(sample["user"], sync_path, async_path, options)),
+                    }
+                )
+
+        output = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as fh:
+                fh.write(output + "\n")
+        else:
+            self.stdout.write(output)
+
+    @staticmethod
+    def _kwargs(name, sample):
+        if name == "doctor_list" or name == "doctor_list_async":
+            return {}
+        key = "specialization" if "specialization" in name else "doctor"
+        return {"pk": sample[key].pk}
+
+    @staticmethod
+    def _wsgi(user, path, requests):
+        client = Client()
+        client.force_login(user)
+        client.get(path)
+        timings = []
+        started = time.perf_counter()
+        for _ in range(requests):
+            request_started = time.perf_counter()
+            client.get(path)
+            timings.append((time.perf_counter() - request_started) * 1000)
+        return summarize(timings, time.perf_counter() - started)
+
+    async def _asgi(self, user, sync_path, async_path, options):
+        client = AsyncClient()
+        await client.aforce_login(user)
+
+        async def timed(path, timings):
+            started = time.perf_counter()
+            await client.get(path)
+            timings.append((time.perf_counter() - started) * 1000)
+
+        async def sequential(path):
+            await client.get(path)
+            timings = []
+            started = time.perf_counter()
+            for _ in range(options["requests"]):
+                await timed(path, timings)
+            return summarize(timings, time.perf_counter() - started)
+
+        async def concurrent(path):
+            timings = []
+            started = time.perf_counter()
+            remaining = options["requests"]
+            while remaining > 0:
+                batch = min(remaining, options["concurrency"])
+                await asyncio.gather(*(timed(path, timings) for _ in range(batch)))
+                remaining -= batch
+            return summarize(timings, time.perf_counter() - started)
+
+        return {
+            "asgi_async": await sequential(async_path),
+            "asgi_sync_concurrent": await concurrent(sync_path),
+            "asgi_async_concurrent": await concurrent(async_path),
+        }
@@ -0,0 +1,208 @@
+import json
+import platform
+import random
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+import django
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection, connections
+
+from core import booking, probes
+from core.availability import free_slots
+from core.models import Doctor, Patient, Specialization
+from core.schedule import WEEKDAY_NAMES, format_slot_time
+from core.seeding import SLOT_TIMES
+
+
+def profiles():
+    return {
+        "default": {},
+        "production": settings.CLINIC_SQLITE_PRODUCTION_OPTIONS,
+    }
+
+
+@contextmanager
+def sqlite_file(options):
+    """Point the default connection at a fresh file database opened with ``options``."""
+    settings_dict = connection.settings_dict
+    saved = {key: settings_dict.get(key) for key in ("NAME", "OPTIONS")}
+    connections.close_all()
+    with TemporaryDirectory() as tmp:
+        settings_dict["NAME"] = str(Path(tmp) / "bench.sqlite3")
+        settings_dict["OPTIONS"] = dict(options)
+        try:
+            yield
+        finally:
+            connections.close_all()
+            settings_dict.update(saved)
+
+
+class Command(BaseCommand):
+    help = (
+        "Book appointments from several threads at once against a throwaway "
+        "file database, once per SQLite profile, while reader threads query "
+        "availability. Reports booking throughput, latency and how many "
+        "attempts failed with 'database is locked', as JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=8, help="Concurrent booking threads.")
+        parser.add_argument("--bookings", type=int, default=50, help="Booking attempts per thread.")
+        parser.add_argument("--readers", type=int, default=2, help="Concurrent availability readers.")
+        parser.add_argument(
+            "--profiles",
+            default="default,production",
+            help="Comma separated database profiles to compare.",
+        )
+        parser.add_argument("--seed", type=int, default=1)
+        parser.add_argument("--output", "-o", help="Write JSON here instead of stdout.")
+
+    def handle(self, *args, **options):
+        if connection.vendor != "sqlite":
+            raise CommandError("benchmark_booking only supports SQLite.")
+        known = profiles()
+        names = [name.strip() for name in options["profiles"].split(",") if name.strip()]
+        unknown = set(names) - set(known)
+        if unknown:
+            raise CommandError(f"Unknown profile(s): {', '.join(sorted(unknown))}")
+
+        report = {
+            "commit": probes.git_commit(),
+            "started_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "threads": options["threads"],
+            "bookings_per_thread": options["bookings"],
+            "readers": options["readers"],
+            "profiles": [],
+        }
+        for name in names:
+            self.stderr.write(f"Benchmarking the {name} profile...")
+            with sqlite_file(known[name]):
+                call_command("migrate", interactive=False, verbosity=0)
+                result = self._run(options)
+            report["profiles"].append({"profile": name, "options": known[name], **result})
+
+        output = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as fh:
+                fh.write(output + "\n")
+        else:
+            self.stdout.write(output)
+
+    def _run(self, options):
+        threads, per_thread = options["threads"], options["bookings"]
+        doctor, patients = self._setup(threads)
+        journal_mode = self._pragma("journal_mode")
+        connection.close()
+
+        # Twice as many slots as attempts, so roughly a quarter of the
+        # attempts collide with a slot another thread already took.
+        first_day = date.today() + timedelta(days=1)
+        days_needed = -(-threads * per_thread * 2 // len(SLOT_TIMES))
+        pool = [
+            (first_day + timedelta(days=offset), slot)
+            for offset in range(days_needed)
+            for slot in SLOT_TIMES
+        ]
+
+        outcomes = {"booked": 0, "conflicts": 0, "locked": 0, "read_errors": 0}
+        latencies, read_latencies = [], []
+        lock = threading.Lock()
+        writers_done = threading.Event()
+
+        def book(patient, rng):
+            try:
+                for _ in range(per_thread):
+                    day, slot = rng.choice(pool)
+                    started = time.perf_counter()
+                    try:
+                        booking.create_booking(patient, doctor, day, slot)
+                        outcome = "booked"
+                    except booking.SlotUnavailable:
+                        outcome = "conflicts"
+                    except OperationalError:
+                        outcome = "locked"
+                    elapsed = (time.perf_counter() - started) * 1000
+                    with lock:
+                        outcomes[outcome] += 1
+                        latencies.append(elapsed)
+            finally:
+                connection.close()
+
+        def read():
+            try:
+                while not writers_done.is_set():
+                    started = time.perf_counter()
+                    try:
+                        free_slots(doctor, first_day, first_day + timedelta(days=6))
+                    except OperationalError:
+                        with lock:
+                            outcomes["read_errors"] += 1
+                        continue
+                    with lock:
+                        read_latencies.append((time.perf_counter() - started) * 1000)
+            finally:
+                connection.close()
+
+        writers = [
+            threading.Thread(target=book, args=(patient, random.Random(options["seed"] + i)))
+            for i, patient in enumerate(patients)
+        ]
+        readers = [threading.Thread(target=read) for _ in range(options["readers"])]
+        for thread in readers:
+            thread.start()
+        started = time.perf_counter()
+        for thread in writers:
+            thread.start()
+        for thread in writers:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        writers_done.set()
+        for thread in readers:
+            thread.join()
+
+        return {
+            "journal_mode": journal_mode,
+            **outcomes,
+            "elapsed_s": round(elapsed, 3),
+            "bookings_per_s": round(outcomes["booked"] / elapsed, 1),
+            "attempts_per_s": round(len(latencies) / elapsed, 1),
+            "p50_ms": round(probes.percentile(latencies, 50), 3),
+            "p99_ms": round(probes.percentile(latencies, 99), 3),
+            "reads": len(read_latencies),
+            "reads_per_s": round(len(read_latencies) / elapsed, 1),
+            "read_p99_ms": round(probes.percentile(read_latencies, 99), 3) if read_latencies else None,
+        }
+
+    @staticmethod
+    def _setup(threads):
+        specialization = Specialization.objects.create(name="Benchmark")
+        doctor = Doctor.objects.create(
+            name="Dr Benchmark",
+            specialization=specialization,
+            experience=10,
+            fees=100,
+            available_days=",".join(WEEKDAY_NAMES),
+            time_slots=",".join(format_slot_time(slot) for slot in SLOT_TIMES),
+        )
+        patients = [
+            Patient.objects.create(name=f"Patient {i}", phone="000", email=f"bench-{i}@example.com")
+            for i in range(threads)
+        ]
+        return doctor, patients
+
+    @staticmethod
+    def _pragma(name):
+        with connection.cursor() as cursor:
+            cursor.execute(f"PRAGMA {name}")
+            return cursor.fetchone()[0]
@@ -0,0 +1,82 @@
+import json
+import platform
+import timeit
+from datetime import date, datetime, time, timezone
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+
+from core import probes
+from core.models import Doctor
+from core.schedule import compile_schedule, format_slot_time, parse_schedule
+
+
+def _split(value):
+    # What Doctor.day_list / slot_list did before schedules were compiled.
+    return [part.strip() for part in value.split(",") if part.strip()]
+
+
+class Command(BaseCommand):
+    help = (
+        "Microbenchmark booking slot validation: re-parsing the doctor's CSV "
+        "schedule on every check against the memoized compiled schedule. "
+        "Reports nanoseconds per call as JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--number", type=int, default=20000, help="Calls per timing run.")
+        parser.add_argument("--repeat", type=int, default=5, help="Timing runs; the best is kept.")
+        parser.add_argument("--slots", type=int, default=16, help="Slots per day in the sample schedule.")
+        parser.add_argument("--output", "-o", help="Write JSON here instead of stdout.")
+
+    def handle(self, *args, **options):
+        if options["number"] < 1 or options["repeat"] < 1 or not 1 <= options["slots"] <= 48:
+            raise CommandError("--number and --repeat must be positive and --slots between 1 and 48.")
+        slots = [time(8 + i // 4, i % 4 * 15) for i in range(options["slots"])]
+        doctor = Doctor(
+            pk=1,
+            name="Dr Bench",
+            available_days="Mon, Tue, Wed, Thu, Fri",
+            time_slots=",".join(format_slot_time(slot) for slot in slots),
+            updated_at=datetime(2030, 1, 1, tzinfo=timezone.utc),
+        )
+        day, slot = date(2030, 1, 11), slots[-1]  # a Friday, the last slot: worst case for lists
+
+        def reparse():
+            days, times = parse_schedule(doctor.available_days, doctor.time_slots)
+            return day.weekday() in days and slot in times
+
+        cases = {
+            # The old property bodies, re-split on every access.
+            "csv_split_day_and_slot_lists": lambda: (
+                _split(doctor.available_days),
+                _split(doctor.time_slots),
+            ),
+            "validate_by_reparsing": reparse,
+            "compile_schedule_cold": lambda: compile_schedule(doctor.available_days, doctor.time_slots),
+            "validate_with_compiled_schedule": lambda: doctor.schedule.allows(day, slot),
+        }
+
+        results = {}
+        for name, case in cases.items():
+            best = min(timeit.repeat(case, number=options["number"], repeat=options["repeat"]))
+            results[name] = round(best / options["number"] * 1e9, 1)
+        report = {
+            "commit": probes.git_commit(),
+            "started_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "slots_per_day": options["slots"],
+            "calls_per_run": options["number"],
+            "ns_per_call": results,
+            "speedup_vs_reparsing": round(
+                results["validate_by_reparsing"] / results["validate_with_compiled_schedule"], 1
+            ),
+        }
+
+        output = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as fh:
+                fh.write(output + "\n")
+        else:
+            self.stdout.write(output)
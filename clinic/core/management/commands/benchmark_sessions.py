@@ -0,0 +1,169 @@
+import json
+import platform
+import time
+from collections import Counter
+from datetime import date, datetime, timedelta, timezone
+from tempfile import TemporaryDirectory
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+from core import probes
+from core.schedule import format_slot_time
+
+WRITE_VERBS = ("INSERT", "UPDATE", "DELETE", "REPLACE")
+
+
+def flow(client, sample, day, slot):
+    """
+    The steps of one visit: browse anonymously, get sent to log in, book a
+    slot and land on the success page. Yields ``(step, response)``.
+    """
+    yield "home", client.get(reverse("home"))
+    yield "doctor_list", client.get(reverse("doctor_list"))
+    yield "book_redirect", client.get(reverse("book_appointment"))
+    yield "login", client.post(
+        reverse("login"), {"username": "probe-staff", "password": "probe-pass"}
+    )
+    yield "book_form", client.get(reverse("book_appointment"))
+    yield "book_submit", client.post(
+        reverse("book_appointment"),
+        {
+            "name": sample["patient"].name,
+            "phone": sample["patient"].phone,
+            "email": sample["patient"].email,
+            "doctor": sample["doctor"].pk,
+            "date": day.isoformat(),
+            "time": format_slot_time(slot),
+        },
+    )
+    yield "success", client.get(reverse("appointment_success"))
+
+
+def classify(queries):
+    """Count ``{"writes", "session_writes", "session_reads"}`` in captured queries."""
+    counts = Counter()
+    for query in queries:
+        sql = query["sql"].lstrip().upper()
+        session = "DJANGO_SESSION" in sql
+        if sql.startswith(WRITE_VERBS):
+            counts["writes"] += 1
+            counts["session_writes"] += session
+        elif sql.startswith("SELECT"):
+            counts["session_reads"] += session
+    return counts
+
+
+class Command(BaseCommand):
+    help = (
+        "Walk the home -> doctor_list -> book_appointment flow through the "
+        "test client once per session storage mode (see "
+        "CLINIC_SESSION_STORAGE_MODES) on a scratch database, counting SQL "
+        "writes and django_session queries per step, as JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--flows", type=int, default=20, help="Visits per mode.")
+        parser.add_argument(
+            "--modes",
+            default=",".join(settings.CLINIC_SESSION_STORAGE_MODES),
+            help="Comma separated session storage modes to compare.",
+        )
+        parser.add_argument("--output", "-o", help="Write JSON here instead of stdout.")
+
+    def handle(self, *args, **options):
+        known = settings.CLINIC_SESSION_STORAGE_MODES
+        modes = [mode.strip() for mode in options["modes"].split(",") if mode.strip()]
+        unknown = set(modes) - set(known)
+        if unknown:
+            raise CommandError(f"Unknown mode(s): {', '.join(sorted(unknown))}")
+        if options["flows"] < 1:
+            raise CommandError("--flows must be at least 1.")
+
+        report = {
+            "commit": probes.git_commit(),
+            "started_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "flows_per_mode": options["flows"],
+            "modes": [],
+        }
+        overrides = {"ALLOWED_HOSTS": ["testserver"], "DEBUG": False}
+        with probes.scratch_database(), override_settings(**overrides), TemporaryDirectory() as tmp:
+            sample = probes.create_sample_data()
+            slots = self._slots(sample["doctor"], len(modes) * options["flows"])
+            for mode in modes:
+                engine, message_storage = known[mode]
+                with override_settings(
+                    SESSION_ENGINE=engine, MESSAGE_STORAGE=message_storage, SESSION_FILE_PATH=tmp
+                ):
+                    report["modes"].append(self._run(mode, sample, slots, options["flows"]))
+
+        baseline = report["modes"][0]
+        for result in report["modes"]:
+            result["writes_saved_per_flow_vs_" + baseline["mode"]] = round(
+                baseline["writes_per_flow"] - result["writes_per_flow"], 2
+            )
+
+        output = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as fh:
+                fh.write(output + "\n")
+        else:
+            self.stdout.write(output)
+
+    @staticmethod
+    def _slots(doctor, count):
+        """``count`` distinct future (day, time) pairs from the doctor's weekly schedule."""
+        times = sorted(doctor.schedule_slots.values_list("weekday", "start_time"))
+        day = date.today() + timedelta(days=30)
+        found = []
+        while len(found) < count:
+            found += [(day, start) for weekday, start in times if weekday == day.weekday()]
+            day += timedelta(days=1)
+        return found[:count]
+
+    @staticmethod
+    def _run(mode, sample, slots, flows):
+        steps = {}
+        timings = []
+        statuses = Counter()
+        for _ in range(flows):
+            day, slot = slots.pop()
+            client = Client()
+            started = time.perf_counter()
+            responses = flow(client, sample, day, slot)
+            while True:
+                with CaptureQueriesContext(connection) as ctx:
+                    step = next(responses, None)
+                if step is None:
+                    break
+                name, response = step
+                statuses[f"{name}:{response.status_code}"] += 1
+                totals = steps.setdefault(name, Counter())
+                totals.update(classify(ctx.captured_queries))
+                totals["queries"] += len(ctx.captured_queries)
+            timings.append((time.perf_counter() - started) * 1000)
+
+        per_step = {
+            name: {key: round(value / flows, 2) for key, value in sorted(totals.items())}
+            for name, totals in steps.items()
+        }
+        return {
+            "mode": mode,
+            "session_engine": settings.SESSION_ENGINE,
+            "message_storage": settings.MESSAGE_STORAGE,
+            "writes_per_flow": round(sum(step.get("writes", 0) for step in per_step.values()), 2),
+            "session_queries_per_flow": round(
+                sum(step.get("session_writes", 0) + step.get("session_reads", 0) for step in per_step.values()),
+                2,
+            ),
+            "flow_p50_ms": round(probes.percentile(timings, 50), 3),
+            "statuses": dict(sorted(statuses.items())),
+            "steps": per_step,
+        }
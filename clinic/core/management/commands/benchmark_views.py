@@ -0,0 +1,111 @@
+import json
+import platform
+import random
+import statistics
+import time
+from datetime import datetime, timezone
+
+import django
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from core import probes, seeding
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a scratch database at each scale and request every core URL "
+        "through the test client, recording latency percentiles and SQL "
+        "query counts per view as JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--scales",
+            default="1000,10000",
+            help="Comma separated appointment counts to benchmark at.",
+        )
+        parser.add_argument("--requests", type=int, default=20, help="Timed requests per URL.")
+        parser.add_argument("--seed", type=int, default=1)
+        parser.add_argument("--no-cache", action="store_true", help="Disable page fragment caching.")
+        parser.add_argument("--output", "-o", help="Write JSON here instead of stdout.")
+
+    def handle(self, *args, **options):
+        scales = [int(scale) for scale in options["scales"].split(",") if scale.strip()]
+        report = {
+            "commit": probes.git_commit(),
+            "started_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "database": connection.vendor,
+            "requests_per_url": options["requests"],
+            "page_cache": not options["no_cache"],
+            "scales": [],
+        }
+        overrides = {"ALLOWED_HOSTS": ["testserver"], "DEBUG": False}
+        if options["no_cache"]:
+            overrides["CLINIC_PAGE_CACHE_SECONDS"] = 0
+
+        with probes.scratch_database(), override_settings(**overrides):
+            for scale in scales:
+                self.stderr.write(f"Seeding {scale} appointments...")
+                call_command("flush", interactive=False, verbosity=0)
+                counts = seeding.seed(
+                    specializations=12,
+                    doctors=max(5, scale // 200),
+                    patients=max(10, scale // 5),
+                    appointments=scale,
+                    rng=random.Random(options["seed"]),
+                )
+                report["scales"].append(
+                    {"appointments": scale, "counts": counts, "views": self._run(options["requests"])}
+                )
+
+        output = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as fh:
+                fh.write(output + "\n")
+        else:
+            self.stdout.write(output)
+
+    def _run(self, requests):
+        sample = probes.create_sample_data()
+        client = Client()
+        client.force_login(sample["user"])
+        results = []
+        for name, path in probes.iter_probe_paths(sample):
+            with CaptureQueriesContext(connection) as ctx:
+                status = self._get(client, path)
+            cold_queries = len(ctx.captured_queries)
+            timings = []
+            for _ in range(requests):
+                with CaptureQueriesContext(connection) as ctx:
+                    started = time.perf_counter()
+                    self._get(client, path)
+                    timings.append((time.perf_counter() - started) * 1000)
+            results.append(
+                {
+                    "view": name,
+                    "path": path,
+                    "status": status,
+                    "queries_cold": cold_queries,
+                    "queries": len(ctx.captured_queries),
+                    "mean_ms": round(statistics.fmean(timings), 3),
+                    "p50_ms": round(probes.percentile(timings, 50), 3),
+                    "p90_ms": round(probes.percentile(timings, 90), 3),
+                    "p99_ms": round(probes.percentile(timings, 99), 3),
+                }
+            )
+        return results
+
+    @staticmethod
+    def _get(client, path):
+        response = client.get(path)
+        if response.streaming:
+            # Streaming bodies are produced lazily; drain them so they are timed.
+            for _ in response.streaming_content:
+                pass
+        return response.status_code
@@ -0,0 +1,25 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core import session_storage
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete expired sessions for the configured session engine, in small "
+        "transactions when sessions are stored in the database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=session_storage.BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be at least 1.")
+        deleted = session_storage.clear_expired(options["batch_size"])
+        if deleted is None:
+            self.stdout.write(
+                self.style.SUCCESS(f"Cleared expired sessions for {settings.SESSION_ENGINE}.")
+            )
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} expired session(s)."))
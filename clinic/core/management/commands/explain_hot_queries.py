@@ -0,0 +1,93 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from core import probes
+
+
+# Small tables that are read in full by design.
+EXPECTED_SCANS = {"core_statcounter"}
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Request every core URL, run EXPLAIN QUERY PLAN on each SELECT it "
+        "issues and flag full table scans and temporary sort b-trees. All "
+        "sample data is rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--ignore",
+            action="append",
+            default=[],
+            metavar="TABLE",
+            help="Table whose full scans are expected (repeatable).",
+        )
+        parser.add_argument(
+            "--fail-on-scan",
+            action="store_true",
+            help="Exit with an error if any full scan is found.",
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != "sqlite":
+            raise CommandError("explain_hot_queries only supports SQLite.")
+
+        plans = []
+        try:
+            # Page caching is switched off so every view issues its real queries.
+            with transaction.atomic(), override_settings(
+                ALLOWED_HOSTS=["testserver"], CLINIC_PAGE_CACHE_SECONDS=0
+            ):
+                sample = probes.create_sample_data()
+                client = Client()
+                client.force_login(sample["user"])
+                for name, path in probes.iter_probe_paths(sample):
+                    with CaptureQueriesContext(connection) as ctx:
+                        client.get(path)
+                    for query in ctx.captured_queries:
+                        if query["sql"].lstrip().upper().startswith("SELECT"):
+                            plans.append((name, query["sql"], self.explain(query["sql"])))
+                raise Rollback
+        except Rollback:
+            pass
+
+        ignored = EXPECTED_SCANS | set(options["ignore"])
+        problems = 0
+        for name, sql, plan in plans:
+            findings = [
+                detail
+                for detail in plan
+                if self.is_full_scan(detail, ignored) or "TEMP B-TREE" in detail
+            ]
+            if not findings:
+                continue
+            problems += sum(self.is_full_scan(detail, ignored) for detail in findings)
+            self.stdout.write(self.style.WARNING(f"[{name}] {sql}"))
+            for detail in findings:
+                self.stdout.write(f"    {detail}")
+
+        self.stdout.write(f"Checked {len(plans)} queries, {problems} full table scan(s).")
+        if problems and options["fail_on_scan"]:
+            raise CommandError(f"{problems} full table scan(s) found.")
+
+    def explain(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+            return [row[-1] for row in cursor.fetchall()]
+
+    @staticmethod
+    def is_full_scan(detail, ignored):
+        if not detail.startswith("SCAN ") or " USING " in detail:
+            return False
+        if " VIRTUAL TABLE INDEX " in detail:
+            # Full-text search: the FTS module resolves MATCH from its own index.
+            return False
+        table = detail.split()[1]
+        return table not in ignored and table != "CONSTANT"
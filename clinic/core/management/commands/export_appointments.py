@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core import exports
+from core.forms import AppointmentFilterForm
+from core.models import Appointment
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream appointments joined with patient and doctor as CSV or NDJSON. "
+        "Accepts the same filters as the appointments panel."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--format", choices=sorted(exports.FORMATS), default="csv")
+        parser.add_argument("--output", "-o", help="File to write (default: stdout).")
+        parser.add_argument("--doctor", help="Doctor id.")
+        parser.add_argument("--status", choices=[s for s, _ in Appointment.STATUS_CHOICES])
+        parser.add_argument("--from", dest="date_from", help="First date, YYYY-MM-DD.")
+        parser.add_argument("--to", dest="date_to", help="Last date, YYYY-MM-DD.")
+        parser.add_argument("--chunk-size", type=int, default=exports.CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        filter_form = AppointmentFilterForm(
+            {
+                key: options[key]
+                for key in ("doctor", "status", "date_from", "date_to")
+                if options[key]
+            }
+        )
+        if not filter_form.is_valid():
+            raise CommandError(filter_form.errors.as_text())
+
+        lines = exports.export_lines(
+            filter_form.filter(Appointment.objects.all()),
+            options["format"],
+            options["chunk_size"],
+        )
+        if options["output"]:
+            with open(options["output"], "w", newline="", encoding="utf-8") as fh:
+                count = self._write(fh, lines)
+            self.stderr.write(f"Wrote {count} line(s) to {options['output']}.")
+        else:
+            self._write(self.stdout, lines)
+
+    @staticmethod
+    def _write(fh, lines):
+        count = 0
+        for line in lines:
+            fh.write(line)
+            count += 1
+        return count
@@ -0,0 +1,51 @@
+import csv
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import importers
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk import doctors, patients or appointments from a CSV, JSON or "
+        "NDJSON file. Invalid rows are reported and skipped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("kind", choices=sorted(importers.IMPORTERS))
+        parser.add_argument("path")
+        parser.add_argument(
+            "--format", choices=["csv", "json", "ndjson"], help="Defaults to the file extension."
+        )
+        parser.add_argument("--batch-size", type=int, default=importers.BATCH_SIZE)
+        parser.add_argument("--rejects", help="Write rejected rows to this CSV file.")
+
+    def handle(self, *args, **options):
+        importer = importers.IMPORTERS[options["kind"]](batch_size=options["batch_size"])
+        started = time.perf_counter()
+        try:
+            result = importer.run(importers.read_rows(options["path"], options["format"]))
+        except (OSError, ValueError) as exc:
+            raise CommandError(str(exc))
+        elapsed = time.perf_counter() - started
+
+        for number, reason, _ in result.rejected[:20]:
+            self.stderr.write(f"row {number}: {reason}")
+        if len(result.rejected) > 20:
+            self.stderr.write(f"... and {len(result.rejected) - 20} more")
+        if options["rejects"] and result.rejected:
+            with open(options["rejects"], "w", newline="", encoding="utf-8") as fh:
+                writer = csv.writer(fh)
+                writer.writerow(["row", "reason", "data"])
+                for number, reason, row in result.rejected:
+                    writer.writerow([number, reason, json.dumps(row, default=str)])
+
+        rate = result.created / elapsed * 60 if elapsed else 0
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Imported {result.created} {options['kind']}, rejected "
+                f"{len(result.rejected)} in {elapsed:.1f}s ({rate:,.0f} rows/min)."
+            )
+        )
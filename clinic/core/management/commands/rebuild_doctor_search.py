@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core import search
+
+
+class Command(BaseCommand):
+    help = (
+        "Create the doctor full-text search table if needed and reindex every "
+        "doctor, e.g. after queryset updates that skip the model signals."
+    )
+
+    def handle(self, *args, **options):
+        if not search.create():
+            raise CommandError("Full-text search needs SQLite with the FTS5 extension.")
+        count = search.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Indexed {count} doctor(s)."))
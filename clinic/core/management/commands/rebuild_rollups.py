@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core import reporting
+
+
+class Command(BaseCommand):
+    help = "Recompute the monthly appointment and revenue rollups from the appointment table."
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            count = reporting.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {count} doctor-month rollup(s)."))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core import stats
+
+
+class Command(BaseCommand):
+    help = "Recount doctors, patients and appointments and repair the dashboard counters."
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            drift = stats.reconcile()
+        if not drift:
+            self.stdout.write(self.style.SUCCESS("Counters are in sync."))
+            return
+        for name, delta in sorted(drift.items()):
+            self.stdout.write(f"{name}: {delta:+d}")
+        self.stdout.write(self.style.SUCCESS(f"Repaired {len(drift)} counter(s)."))
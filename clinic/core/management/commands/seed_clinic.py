@@ -0,0 +1,28 @@
+import random
+
+from django.core.management.base import BaseCommand
+
+from core import seeding
+
+
+class Command(BaseCommand):
+    help = "Generate synthetic specializations, doctors, patients and appointments."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--specializations", type=int, default=10)
+        parser.add_argument("--doctors", type=int, default=50)
+        parser.add_argument("--patients", type=int, default=1000)
+        parser.add_argument("--appointments", type=int, default=10000)
+        parser.add_argument("--seed", type=int, help="Random seed for repeatable data.")
+
+    def handle(self, *args, **options):
+        created = seeding.seed(
+            specializations=options["specializations"],
+            doctors=options["doctors"],
+            patients=options["patients"],
+            appointments=options["appointments"],
+            rng=random.Random(options["seed"]),
+        )
+        self.stdout.write(
+            self.style.SUCCESS(", ".join(f"{count} {name}" for name, count in created.items()) + " created.")
+        )
@@ -0,0 +1,47 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import notifications
+
+
+class Command(BaseCommand):
+    help = (
+        "Send queued patient notifications in batches, retrying failures with "
+        "backoff. Runs until the outbox has nothing due, or forever with --loop."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=notifications.BATCH_SIZE)
+        parser.add_argument(
+            "--loop", action="store_true", help="Keep polling for new notifications."
+        )
+        parser.add_argument(
+            "--interval", type=float, default=5.0, help="Seconds to wait when nothing is due."
+        )
+
+    def handle(self, *args, **options):
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be at least 1.")
+        totals = {"sent": 0, "retried": 0, "failed": 0}
+        try:
+            while True:
+                counts = notifications.send_batch(options["batch_size"])
+                for key, value in counts.items():
+                    totals[key] += value
+                if any(counts.values()):
+                    if options["verbosity"] > 1:
+                        self.stdout.write(
+                            "sent {sent}, retrying {retried}, failed {failed}".format(**counts)
+                        )
+                    continue
+                if not options["loop"]:
+                    break
+                time.sleep(options["interval"])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(
+            self.style.SUCCESS(
+                "Sent {sent} notification(s); {retried} to retry, {failed} failed.".format(**totals)
+            )
+        )
@@ -0,0 +1,45 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import reminders
+
+
+class Command(BaseCommand):
+    help = (
+        "Send day-before reminders for every Approved appointment on a date "
+        "(default tomorrow). Safe to rerun: patients already reminded are skipped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--date", help="Appointment date as YYYY-MM-DD (default: tomorrow).")
+        parser.add_argument("--chunk-size", type=int, default=reminders.CHUNK_SIZE)
+        parser.add_argument(
+            "--threads", type=int, default=reminders.THREADS, help="Concurrent senders."
+        )
+        parser.add_argument(
+            "--dry-run", action="store_true", help="Only count the reminders that are due."
+        )
+
+    def handle(self, *args, **options):
+        try:
+            day = date.fromisoformat(options["date"]) if options["date"] else reminders.default_date()
+        except ValueError:
+            raise CommandError("--date must be a date in YYYY-MM-DD format.")
+        if options["chunk_size"] < 1 or options["threads"] < 1:
+            raise CommandError("--chunk-size and --threads must be at least 1.")
+
+        if options["dry_run"]:
+            self.stdout.write(f"{reminders.due(day).count()} reminder(s) due for {day}.")
+            return
+
+        stats = reminders.send_reminders(day, options["chunk_size"], options["threads"])
+        for error in stats.errors[:20]:
+            self.stderr.write(error)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Reminders for {day}: {stats.sent} sent, {stats.failed} failed out of "
+                f"{stats.appointments} in {stats.chunks} chunk(s), {stats.seconds:.1f}s "
+                f"({stats.per_second:,.0f}/s with {options['threads']} thread(s))."
+            )
+        )
@@ -0,0 +1,45 @@
+import logging
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+
+from .profiling import QueryProfile, history
+
+logger = logging.getLogger("core.sql")
+
+
+class QueryProfileMiddleware:
+    """
+    Opt-in (``CLINIC_SQL_PROFILE = True``) per-request SQL profiling. Adds an
+    ``X-SQL-Profile`` header with the query count, total SQL time and number
+    of repeated statements, appends a summary to ``core.profiling.history``
+    and logs it to the ``core.sql`` logger, warning on repeated statements.
+
+    Queries run while a streaming response is being consumed are not counted.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, "CLINIC_SQL_PROFILE", False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        profile = QueryProfile()
+        with connection.execute_wrapper(profile):
+            response = self.get_response(request)
+        response["X-SQL-Profile"] = profile.header()
+        summary = profile.summary(request, response.status_code)
+        history.append(summary)
+        if profile.duplicates:
+            logger.warning(
+                "%s %s: %d queries, %.2f ms, repeated: %s",
+                request.method, request.path, profile.count,
+                profile.seconds * 1000, profile.duplicates,
+            )
+        else:
+            logger.info(
+                "%s %s: %d queries, %.2f ms",
+                request.method, request.path, profile.count, profile.seconds * 1000,
+            )
+        return response
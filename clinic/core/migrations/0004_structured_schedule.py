@@ -0,0 +1,191 @@
+"""Normalize doctor schedules and store Appointment.time as a TimeField
+
+Existing free-text times ("10:00 AM", "2:00PM") are rewritten to ISO
+"HH:MM:SS" before the column type changes. Values that cannot be parsed are
+set to midnight and the original text is kept in the appointment notes.
+
+Two spellings of one slot ("10:00 AM" and "10:00AM"), or two unparseable
+values, can end up on the same (doctor, date, time). When the rows belong
+to the same patient the lowest id keeps the slot and the others move to the
+next free minute that day, with a note saying where they came from. Rows of
+different patients are left alone and the migration stops with a list of
+them to fix by hand.
+
+The time parsing is copied from core.schedule as it was when this migration
+was written, so later changes there cannot change what it does.
+"""
+from datetime import datetime, timedelta
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+WEEKDAY_NAMES = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+WEEKDAYS = {name.lower(): index for index, name in enumerate(WEEKDAY_NAMES)}
+TIME_INPUT_FORMATS = ["%I:%M %p", "%I:%M%p", "%I %p", "%I%p", "%H:%M", "%H:%M:%S"]
+BATCH_SIZE = 500
+
+
+def parse_weekday(value):
+    return WEEKDAYS.get(value.strip()[:3].lower())
+
+
+def parse_slot_time(value):
+    value = " ".join(value.split()).upper()
+    for fmt in TIME_INPUT_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).time()
+        except ValueError:
+            continue
+    return None
+
+
+def format_slot_time(value):
+    hour = value.hour % 12 or 12
+    suffix = "AM" if value.hour < 12 else "PM"
+    return f"{hour}:{value.minute:02d} {suffix}"
+
+
+def parse_schedule(available_days, time_slots):
+    days = {parse_weekday(day) for day in available_days.split(",") if day.strip()}
+    times = {parse_slot_time(slot) for slot in time_slots.split(",") if slot.strip()}
+    days.discard(None)
+    times.discard(None)
+    return sorted(days), sorted(times)
+
+
+def _add_note(notes, line):
+    return f"{notes}\n{line}".strip()
+
+
+def _next_free_minute(day, slot, taken):
+    moment = datetime.combine(day, slot)
+    while True:
+        moment += timedelta(minutes=1)
+        if moment.date() != day:
+            return None
+        if moment.time() not in taken:
+            return moment.time()
+
+
+def normalize_times(rows):
+    """
+    Work out the rewrite for ``(id, doctor_id, date, time, patient_id,
+    status, notes)`` rows. Returns ``(updates, moved)``: ``{id: (time,
+    notes)}`` for every row and ``{id: kept_id}`` for duplicates moved off
+    another row's slot. Raises RuntimeError listing the collisions between
+    different patients.
+    """
+    slots = {}
+    for pk, doctor_id, day, raw, patient_id, status, notes in sorted(rows):
+        parsed = parse_slot_time(raw)
+        if parsed is None:
+            notes = _add_note(notes, f"Original time: {raw}")
+            parsed = parse_slot_time("00:00")
+        slots.setdefault((doctor_id, day, parsed), []).append((pk, raw, patient_id, notes))
+
+    taken = {}
+    for doctor_id, day, parsed in slots:
+        taken.setdefault((doctor_id, day), set()).add(parsed)
+
+    updates, moved, clashes = {}, {}, []
+    for (doctor_id, day, parsed), group in slots.items():
+        pk, _, _, notes = group[0]
+        if len({row[2] for row in group}) > 1:
+            clashes.append(
+                f"doctor {doctor_id} on {day} at {parsed:%H:%M}: "
+                + ", ".join(f"appointment {row[0]} ({row[1]!r}, patient {row[2]})" for row in group)
+            )
+            continue
+        updates[pk] = (parsed.isoformat(), notes)
+        for duplicate, raw, _, duplicate_notes in group[1:]:
+            free = _next_free_minute(day, parsed, taken[doctor_id, day])
+            if free is None:
+                clashes.append(f"doctor {doctor_id} on {day}: no free minute for appointment {duplicate}")
+                continue
+            taken[doctor_id, day].add(free)
+            updates[duplicate] = (
+                free.isoformat(),
+                _add_note(
+                    duplicate_notes,
+                    f"Moved from {raw} to {free:%H:%M}: appointment {pk} has the same slot.",
+                ),
+            )
+            moved[duplicate] = pk
+    if clashes:
+        raise RuntimeError(
+            "These appointments book the same slot once their times are normalized. "
+            "Move or delete all but one of each and migrate again:\n" + "\n".join(clashes)
+        )
+    return updates, moved
+
+
+def forwards(apps, schema_editor):
+    Appointment = apps.get_model("core", "Appointment")
+    Doctor = apps.get_model("core", "Doctor")
+    ScheduleSlot = apps.get_model("core", "ScheduleSlot")
+
+    rows = list(
+        Appointment.objects.values_list("id", "doctor_id", "date", "time", "patient_id", "status", "notes")
+    )
+    updates, _ = normalize_times(rows)
+    current = {row[0]: (row[3], row[6]) for row in rows}
+    changed = [
+        Appointment(pk=pk, time=time, notes=notes)
+        for pk, (time, notes) in updates.items()
+        if current[pk] != (time, notes)
+    ]
+    # (doctor, date, time) is unique and SQLite checks it row by row, so
+    # park the changed rows on unique placeholders before the real times.
+    parked = [Appointment(pk=appointment.pk, time=f"migrating-{appointment.pk}") for appointment in changed]
+    Appointment.objects.bulk_update(parked, ["time"], batch_size=BATCH_SIZE)
+    Appointment.objects.bulk_update(changed, ["time", "notes"], batch_size=BATCH_SIZE)
+
+    slots = []
+    for doctor in Doctor.objects.all().iterator():
+        days, times = parse_schedule(doctor.available_days, doctor.time_slots)
+        slots.extend(
+            ScheduleSlot(doctor=doctor, weekday=day, start_time=time)
+            for day in days
+            for time in times
+        )
+    ScheduleSlot.objects.bulk_create(slots)
+
+
+def backwards(apps, schema_editor):
+    Appointment = apps.get_model("core", "Appointment")
+    changed = []
+    for pk, value in Appointment.objects.values_list("id", "time").iterator():
+        parsed = parse_slot_time(value)
+        if parsed is not None:
+            changed.append(Appointment(pk=pk, time=format_slot_time(parsed)))
+    Appointment.objects.bulk_update(changed, ["time"], batch_size=BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0003_patient_user"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ScheduleSlot",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("weekday", models.PositiveSmallIntegerField(choices=[(0, "Mon"), (1, "Tue"), (2, "Wed"), (3, "Thu"), (4, "Fri"), (5, "Sat"), (6, "Sun")])),
+                ("start_time", models.TimeField()),
+                ("duration", models.PositiveSmallIntegerField(default=30, help_text="Slot length in minutes")),
+                ("doctor", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="schedule_slots", to="core.doctor")),
+            ],
+            options={
+                "ordering": ["doctor", "weekday", "start_time"],
+                "unique_together": {("doctor", "weekday", "start_time")},
+            },
+        ),
+        migrations.RunPython(forwards, backwards),
+        migrations.AlterField(
+            model_name="appointment",
+            name="time",
+            field=models.TimeField(),
+        ),
+    ]
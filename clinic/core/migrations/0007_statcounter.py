@@ -0,0 +1,40 @@
+# Generated by Django 5.2.8 on 2026-10-18 03:38
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def seed_counters(apps, schema_editor):
+    StatCounter = apps.get_model("core", "StatCounter")
+    Appointment = apps.get_model("core", "Appointment")
+    counts = {
+        "doctors": apps.get_model("core", "Doctor").objects.count(),
+        "patients": apps.get_model("core", "Patient").objects.count(),
+        "appointments": Appointment.objects.count(),
+        "status:Pending": 0,
+        "status:Approved": 0,
+        "status:Completed": 0,
+    }
+    for row in Appointment.objects.values("status").annotate(total=Count("id")).order_by():
+        counts[f"status:{row['status']}"] = row["total"]
+    StatCounter.objects.bulk_create(
+        StatCounter(name=name, value=value) for name, value in counts.items()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_query_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StatCounter',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('value', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(seed_counters, migrations.RunPython.noop),
+    ]
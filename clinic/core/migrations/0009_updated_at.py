@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-18 03:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_cacheversion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='doctor',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='specialization',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
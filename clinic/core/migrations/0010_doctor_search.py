@@ -0,0 +1,28 @@
+"""Create and fill the FTS5 doctor search index (see core.search).
+
+Without FTS5 this does nothing and searches fall back to icontains.
+"""
+from django.db import migrations
+
+from core import search
+
+
+def forwards(apps, schema_editor):
+    alias = schema_editor.connection.alias
+    if search.create(alias):
+        search.rebuild(alias)
+
+
+def backwards(apps, schema_editor):
+    search.drop(schema_editor.connection.alias)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0009_updated_at"),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, backwards),
+    ]
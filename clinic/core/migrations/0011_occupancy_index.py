@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2026-10-18 04:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_doctor_search'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['date', 'doctor'], name='appt_date_doctor_idx'),
+        ),
+    ]
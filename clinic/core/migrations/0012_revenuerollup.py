@@ -0,0 +1,46 @@
+# Generated by Django 5.2.8 on 2026-10-18 04:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth
+
+
+def build_rollups(apps, schema_editor):
+    Appointment = apps.get_model("core", "Appointment")
+    RevenueRollup = apps.get_model("core", "RevenueRollup")
+    rows = (
+        Appointment.objects.filter(status="Completed")
+        .values_list("doctor_id", TruncMonth("date"))
+        .annotate(completed=Count("id"), revenue=Sum("doctor__fees"))
+        .order_by()
+    )
+    RevenueRollup.objects.bulk_create(
+        RevenueRollup(doctor_id=doctor_id, month=month, completed=completed, revenue=revenue)
+        for doctor_id, month, completed, revenue in rows
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_occupancy_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RevenueRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(help_text='First day of the month')),
+                ('completed', models.IntegerField(default=0)),
+                ('revenue', models.BigIntegerField(default=0)),
+                ('doctor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='revenue_rollups', to='core.doctor')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['month', 'doctor'], name='rollup_month_doctor_idx')],
+                'unique_together': {('doctor', 'month')},
+            },
+        ),
+        migrations.RunPython(build_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.8 on 2026-10-18 04:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_notification'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReminderSent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('appointment_id', models.BigIntegerField()),
+                ('date', models.DateField(help_text='The appointment date the reminder was for')),
+                ('sent_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'unique_together': {('date', 'appointment_id')},
+            },
+        ),
+    ]
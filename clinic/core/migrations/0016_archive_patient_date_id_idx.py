@@ -0,0 +1,21 @@
+# Generated by Django 5.2.8 on 2026-10-18 05:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_remindersent'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='appointmentarchive',
+            name='archive_patient_date_idx',
+        ),
+        migrations.AddIndex(
+            model_name='appointmentarchive',
+            index=models.Index(fields=['patient', 'date', 'time', 'id'], name='archive_patient_date_idx'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+"""Store the fee on each appointment so revenue does not follow fee changes
+
+Existing live and archived appointments are given their doctor's current
+fee, which is what the revenue rollups counted them at until now.
+"""
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_fees(apps, schema_editor):
+    Doctor = apps.get_model("core", "Doctor")
+    fees = Subquery(Doctor.objects.filter(pk=OuterRef("doctor_id")).values("fees")[:1])
+    for name in ("Appointment", "AppointmentArchive"):
+        apps.get_model("core", name).objects.update(fee=fees)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0016_archive_patient_date_id_idx"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="appointment",
+            name="fee",
+            field=models.IntegerField(
+                blank=True, default=0, help_text="The doctor's fee when the appointment was booked"
+            ),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name="appointmentarchive",
+            name="fee",
+            field=models.IntegerField(default=0),
+            preserve_default=False,
+        ),
+        migrations.RunPython(backfill_fees, migrations.RunPython.noop),
+    ]
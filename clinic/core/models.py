@@ -1,8 +1,12 @@
 from django.db import models
+from django.utils import timezone
+
+from .schedule import DEFAULT_SLOT_MINUTES, WEEKDAY_CHOICES, parse_schedule, schedule_for
 
 
 class Specialization(models.Model):
     name = models.CharField(max_length=100, unique=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ["name"]
@@ -28,20 +32,75 @@ class Doctor(models.Model):
     )
     biography = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ["name"]
+        indexes = [
+            models.Index(fields=["name"], name="doctor_name_idx"),
+            models.Index(fields=["specialization", "name"], name="doctor_spec_name_idx"),
+        ]
 
     def __str__(self):
         return self.name
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored schedule so save() only rebuilds it on change.
+        instance._loaded_schedule = (
+            instance.__dict__.get("available_days"),
+            instance.__dict__.get("time_slots"),
+        )
+        return instance
+
+    def save(self, *args, **kwargs):
+        changed = getattr(self, "_loaded_schedule", None) != (self.available_days, self.time_slots)
+        super().save(*args, **kwargs)
+        if changed:
+            self.sync_schedule()
+            self._loaded_schedule = (self.available_days, self.time_slots)
+
+    def sync_schedule(self):
+        """Rebuild the normalized ScheduleSlot rows from the CSV fields."""
+        days, times = parse_schedule(self.available_days, self.time_slots)
+        ScheduleSlot.objects.filter(doctor=self).delete()
+        ScheduleSlot.objects.bulk_create(
+            ScheduleSlot(doctor=self, weekday=day, start_time=time)
+            for day in days
+            for time in times
+        )
+
+    @property
+    def schedule(self):
+        """The parsed weekly schedule, memoized per (pk, updated_at) in ``core.schedule``."""
+        return schedule_for(self.pk, self.updated_at, self.available_days, self.time_slots)
+
     @property
     def day_list(self):
-        return [day.strip() for day in self.available_days.split(",") if day.strip()]
+        return self.schedule.day_names
 
     @property
     def slot_list(self):
-        return [slot.strip() for slot in self.time_slots.split(",") if slot.strip()]
+        return self.schedule.slot_labels
+
+
+class ScheduleSlot(models.Model):
+    doctor = models.ForeignKey(
+        Doctor, on_delete=models.CASCADE, related_name="schedule_slots"
+    )
+    weekday = models.PositiveSmallIntegerField(choices=WEEKDAY_CHOICES)
+    start_time = models.TimeField()
+    duration = models.PositiveSmallIntegerField(
+        default=DEFAULT_SLOT_MINUTES, help_text="Slot length in minutes"
+    )
+
+    class Meta:
+        ordering = ["doctor", "weekday", "start_time"]
+        unique_together = ("doctor", "weekday", "start_time")
+
+    def __str__(self):
+        return f"{self.doctor} - {self.get_weekday_display()} {self.start_time}"
 
 
 class Patient(models.Model):
@@ -71,18 +130,192 @@ class Appointment(models.Model):
     patient = models.ForeignKey(Patient, on_delete=models.CASCADE)
     doctor = models.ForeignKey(Doctor, on_delete=models.CASCADE)
     date = models.DateField()
-    time = models.CharField(max_length=50)
+    time = models.TimeField()
     status = models.CharField(
         max_length=20,
         choices=STATUS_CHOICES,
         default=STATUS_PENDING,
     )
     notes = models.TextField(blank=True)
+    fee = models.IntegerField(
+        blank=True, help_text="The doctor's fee when the appointment was booked"
+    )
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         ordering = ["-date", "-time"]
         unique_together = ("doctor", "date", "time")
+        indexes = [
+            # Each index ends in (date, time) so the filtered lists can walk
+            # it in "-date, -time" order without a sort step.
+            models.Index(fields=["date", "time"], name="appt_date_time_idx"),
+            models.Index(fields=["status", "date", "time"], name="appt_status_date_idx"),
+            models.Index(fields=["patient", "date", "time"], name="appt_patient_date_idx"),
+            models.Index(
+                fields=["doctor", "status", "date", "time"], name="appt_doctor_status_idx"
+            ),
+            # Covers the occupancy GROUP BY date, doctor over a date window.
+            models.Index(fields=["date", "doctor"], name="appt_date_doctor_idx"),
+        ]
 
     def __str__(self):
         return f"{self.patient.name} - {self.doctor.name}"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored status so signal handlers can see transitions.
+        instance._loaded_status = instance.__dict__.get("status")
+        return instance
+
+    def save(self, *args, **kwargs):
+        # Revenue is counted at the fee the patient booked at, so later
+        # changes to Doctor.fees do not restate it. bulk_create skips this.
+        if self.fee is None:
+            self.fee = self.doctor.fees
+        super().save(*args, **kwargs)
+
+
+class AppointmentArchive(models.Model):
+    """
+    A completed appointment moved out of ``Appointment`` by ``core.archive``.
+
+    Rows keep their original id, so archived and live appointments can be
+    paged through together in one ordering.
+    """
+
+    id = models.BigIntegerField(primary_key=True)
+    patient = models.ForeignKey(Patient, on_delete=models.CASCADE)
+    doctor = models.ForeignKey(Doctor, on_delete=models.CASCADE)
+    date = models.DateField()
+    time = models.TimeField()
+    status = models.CharField(max_length=20, choices=Appointment.STATUS_CHOICES)
+    notes = models.TextField(blank=True)
+    fee = models.IntegerField()
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["-date", "-time"]
+        indexes = [
+            # Ends in id to match APPOINTMENT_ORDERING, so history pages seek
+            # through it without a sort. A bigint primary key is not SQLite's
+            # rowid, so unlike on Appointment the id is not implied.
+            models.Index(fields=["patient", "date", "time", "id"], name="archive_patient_date_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.patient.name} - {self.doctor.name} (archived)"
+
+
+class StatCounter(models.Model):
+    """A named running total kept up to date by ``core.stats``."""
+
+    name = models.CharField(max_length=50, primary_key=True)
+    value = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name}={self.value}"
+
+
+class CacheVersion(models.Model):
+    """Version stamp folded into cache keys; bumping it invalidates them everywhere."""
+
+    key = models.CharField(max_length=100, primary_key=True)
+    version = models.CharField(max_length=32)
+
+    def __str__(self):
+        return f"{self.key}@{self.version}"
+
+
+class SlotHold(models.Model):
+    """A short-lived claim on a slot while a patient finishes the booking form."""
+
+    doctor = models.ForeignKey(Doctor, on_delete=models.CASCADE)
+    date = models.DateField()
+    time = models.TimeField()
+    user = models.ForeignKey("auth.User", on_delete=models.CASCADE)
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ("doctor", "date", "time")
+
+    def __str__(self):
+        return f"{self.doctor} {self.date} {self.time} held by {self.user}"
+
+
+class RevenueRollup(models.Model):
+    """Completed appointments and fee revenue for one doctor in one month, kept by ``core.reporting``."""
+
+    doctor = models.ForeignKey(Doctor, on_delete=models.CASCADE, related_name="revenue_rollups")
+    month = models.DateField(help_text="First day of the month")
+    completed = models.IntegerField(default=0)
+    revenue = models.BigIntegerField(default=0)
+
+    class Meta:
+        unique_together = ("doctor", "month")
+        indexes = [models.Index(fields=["month", "doctor"], name="rollup_month_doctor_idx")]
+
+    def __str__(self):
+        return f"{self.doctor} {self.month:%Y-%m}: {self.completed} / {self.revenue}"
+
+
+class Notification(models.Model):
+    """
+    An email or SMS waiting in the outbox. Rows are written in the same
+    transaction as the booking or status change and sent by
+    ``manage.py send_notifications`` (see ``core.notifications``).
+    """
+
+    CHANNEL_EMAIL = "email"
+    CHANNEL_SMS = "sms"
+    CHANNEL_CHOICES = [(CHANNEL_EMAIL, "Email"), (CHANNEL_SMS, "SMS")]
+
+    STATUS_PENDING = "pending"
+    STATUS_SENT = "sent"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = [
+        (STATUS_PENDING, "Pending"),
+        (STATUS_SENT, "Sent"),
+        (STATUS_FAILED, "Failed"),
+    ]
+
+    # A plain id rather than a foreign key: archiving deletes appointments
+    # without cascades, and the outbox must not block that.
+    appointment_id = models.BigIntegerField(null=True, blank=True)
+    channel = models.CharField(max_length=10, choices=CHANNEL_CHOICES)
+    recipient = models.CharField(max_length=254)
+    subject = models.CharField(max_length=200)
+    body = models.TextField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["status", "next_attempt_at"], name="notification_due_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.channel} to {self.recipient}: {self.subject} ({self.status})"
+
+
+class ReminderSent(models.Model):
+    """Marks an appointment whose day-before reminder went out (see ``core.reminders``)."""
+
+    # A plain id for the same reason as Notification.appointment_id.
+    appointment_id = models.BigIntegerField()
+    date = models.DateField(help_text="The appointment date the reminder was for")
+    sent_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        # (date, appointment_id) so a run's "already sent" lookup reads only its own day.
+        unique_together = ("date", "appointment_id")
+
+    def __str__(self):
+        return f"reminder for appointment {self.appointment_id} on {self.date}"
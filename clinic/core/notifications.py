@@ -0,0 +1,244 @@
+"""
+Patient notifications through a transactional outbox.
+
+Bookings and status changes add ``Notification`` rows in the same
+transaction as the change itself. A rolled back booking therefore never
+notifies anyone, and the request never waits on SMTP or an SMS gateway.
+``manage.py send_notifications`` drains the outbox:
+- It claims a batch of due rows by pushing their ``next_attempt_at``
+  forward by a lease, in one short transaction.
+- It sends them with no transaction open.
+- It records the outcome. A failed send is retried with exponential
+  backoff until ``CLINIC_NOTIFICATION_MAX_ATTEMPTS``, after which the row
+  is marked failed.
+
+A worker that dies mid-batch leaves its rows to be picked up again once
+the lease runs out, so delivery is at least once.
+
+Email goes through Django's mail backend (``EMAIL_BACKEND``). SMS calls
+the function named by ``CLINIC_SMS_SENDER`` with ``(phone, text)``.
+``CLINIC_NOTIFICATION_CHANNELS`` chooses which channels are queued.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import router, transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Appointment, Notification
+from .schedule import format_slot_time
+
+BATCH_SIZE = 50
+LEASE_SECONDS = 300
+MAX_BACKOFF_SECONDS = 3600
+
+# Message kind for the day-before reminders sent by ``core.reminders``.
+REMINDER = "reminder"
+# Message kind confirming a recurring booking request (``booking.create_series``).
+SERIES = "series"
+
+_SUBJECTS = {
+    Appointment.STATUS_PENDING: "Appointment request received",
+    Appointment.STATUS_APPROVED: "Appointment confirmed",
+    Appointment.STATUS_COMPLETED: "Thank you for your visit",
+    REMINDER: "Appointment reminder",
+    SERIES: "Appointment requests received",
+}
+_BODIES = {
+    Appointment.STATUS_PENDING: (
+        "Hello {patient}, we have received your request to see {doctor} on "
+        "{date} at {time}. We will confirm it soon."
+    ),
+    Appointment.STATUS_APPROVED: (
+        "Hello {patient}, your appointment with {doctor} on {date} at {time} "
+        "is confirmed."
+    ),
+    Appointment.STATUS_COMPLETED: (
+        "Hello {patient}, thank you for visiting {doctor} on {date}."
+    ),
+    REMINDER: (
+        "Hello {patient}, this is a reminder of your appointment with {doctor} "
+        "on {date} at {time}."
+    ),
+    SERIES: (
+        "Hello {patient}, we have received your {count} requests to see {doctor}, "
+        "starting {date} at {time}:\n{schedule}\nWe will confirm them soon."
+    ),
+}
+
+
+def channels():
+    return tuple(getattr(settings, "CLINIC_NOTIFICATION_CHANNELS", (Notification.CHANNEL_EMAIL,)))
+
+
+def max_attempts():
+    return getattr(settings, "CLINIC_NOTIFICATION_MAX_ATTEMPTS", 5)
+
+
+def retry_seconds():
+    return getattr(settings, "CLINIC_NOTIFICATION_RETRY_SECONDS", 60)
+
+
+def _when(date):
+    return f"{date:%a %d %b %Y}"
+
+
+def build(appointment_id, kind, patient, email, phone, doctor, date, time, **extra):
+    """
+    Unsaved Notification rows for ``kind`` (an appointment status,
+    ``REMINDER`` or ``SERIES``), one per configured channel with a
+    recipient. ``extra`` fills any further placeholders in the message.
+    """
+    text = _BODIES[kind].format(
+        patient=patient, doctor=doctor, date=_when(date), time=format_slot_time(time), **extra
+    )
+    recipients = {Notification.CHANNEL_EMAIL: email, Notification.CHANNEL_SMS: phone}
+    return [
+        Notification(
+            appointment_id=appointment_id,
+            channel=channel,
+            recipient=recipients[channel],
+            subject=_SUBJECTS[kind],
+            body=text,
+        )
+        for channel in channels()
+        if recipients.get(channel)
+    ]
+
+
+def for_appointment(appointment):
+    """Queue notifications for ``appointment``'s current status."""
+    patient = appointment.patient
+    Notification.objects.bulk_create(
+        build(
+            appointment.pk,
+            appointment.status,
+            patient.name,
+            patient.email,
+            patient.phone,
+            appointment.doctor.name,
+            appointment.date,
+            appointment.time,
+        )
+    )
+
+
+def for_series(appointments):
+    """Queue one message covering every appointment of a recurring booking."""
+    if not appointments:
+        return
+    first = appointments[0]
+    patient = first.patient
+    Notification.objects.bulk_create(
+        build(
+            first.pk,
+            SERIES,
+            patient.name,
+            patient.email,
+            patient.phone,
+            first.doctor.name,
+            first.date,
+            first.time,
+            count=len(appointments),
+            schedule="\n".join(
+                f"- {_when(appointment.date)} at {format_slot_time(appointment.time)}"
+                for appointment in appointments
+            ),
+        )
+    )
+
+
+def for_bulk_status(queryset, status):
+    """Queue ``status`` notifications for every appointment in ``queryset``."""
+    rows = queryset.order_by().values_list(
+        "id", "patient__name", "patient__email", "patient__phone", "doctor__name", "date", "time"
+    )
+    Notification.objects.bulk_create(
+        [
+            notification
+            for pk, patient, email, phone, doctor, date, time in rows
+            for notification in build(pk, status, patient, email, phone, doctor, date, time)
+        ],
+        batch_size=500,
+    )
+
+
+def claim(batch_size=BATCH_SIZE, now=None):
+    """
+    Lease up to ``batch_size`` due notifications to this worker and return
+    them, with ``attempts`` already counting this try.
+    """
+    now = now or timezone.now()
+    with transaction.atomic(using=router.db_for_write(Notification)):
+        due = list(
+            Notification.objects.select_for_update(skip_locked=True)
+            .filter(status=Notification.STATUS_PENDING, next_attempt_at__lte=now)
+            .order_by("next_attempt_at", "id")[:batch_size]
+        )
+        for notification in due:
+            notification.attempts += 1
+            notification.next_attempt_at = now + timedelta(seconds=LEASE_SECONDS)
+        Notification.objects.bulk_update(due, ["attempts", "next_attempt_at"])
+    return due
+
+
+def deliver(notification, mail_connection=None):
+    """Send one notification; raises whatever the backend raises on failure."""
+    if notification.channel == Notification.CHANNEL_EMAIL:
+        EmailMessage(
+            notification.subject,
+            notification.body,
+            to=[notification.recipient],
+            connection=mail_connection,
+        ).send()
+    elif notification.channel == Notification.CHANNEL_SMS:
+        sender = getattr(settings, "CLINIC_SMS_SENDER", None)
+        if not sender:
+            raise RuntimeError("CLINIC_SMS_SENDER is not configured.")
+        import_string(sender)(notification.recipient, notification.body)
+    else:
+        raise ValueError(f"Unknown channel {notification.channel!r}")
+
+
+def backoff(attempts):
+    return timedelta(seconds=min(retry_seconds() * 2 ** (attempts - 1), MAX_BACKOFF_SECONDS))
+
+
+def send_batch(batch_size=BATCH_SIZE):
+    """Claim, send and record one batch; returns ``{"sent", "retried", "failed"}`` counts."""
+    counts = {"sent": 0, "retried": 0, "failed": 0}
+    due = claim(batch_size)
+    if not due:
+        return counts
+    mail_connection = get_connection()
+    try:
+        # One SMTP session for the batch. If it cannot be opened, each send
+        # tries again and records its own error.
+        mail_connection.open()
+    except OSError:
+        pass
+    try:
+        for notification in due:
+            try:
+                deliver(notification, mail_connection)
+            except Exception as exc:
+                notification.last_error = f"{type(exc).__name__}: {exc}"[:1000]
+                if notification.attempts >= max_attempts():
+                    notification.status = Notification.STATUS_FAILED
+                    counts["failed"] += 1
+                else:
+                    notification.next_attempt_at = timezone.now() + backoff(notification.attempts)
+                    counts["retried"] += 1
+            else:
+                notification.status = Notification.STATUS_SENT
+                notification.sent_at = timezone.now()
+                notification.last_error = ""
+                counts["sent"] += 1
+    finally:
+        mail_connection.close()
+    Notification.objects.bulk_update(
+        due, ["status", "next_attempt_at", "last_error", "sent_at"]
+    )
+    return counts
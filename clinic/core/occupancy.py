@@ -0,0 +1,56 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db.models import Count
+
+from .models import Appointment, Doctor, ScheduleSlot
+
+MAX_RANGE_DAYS = 92
+
+
+def occupancy(start, end, specialization_id=None):
+    """
+    Booked appointments against scheduled capacity for every doctor on every
+    day from ``start`` to ``end`` (inclusive).
+
+    Returns ``(days, rows)``. Each row is ``{"id", "name", "booked",
+    "capacity"}``, with the two lists aligned to ``days``. Three queries in
+    total, however many doctors and days there are:
+    - the doctors
+    - slots per (doctor, weekday)
+    - one ``GROUP BY date, doctor_id`` over the window
+    """
+    days = [start + timedelta(days=offset) for offset in range((end - start).days + 1)]
+    doctors = Doctor.objects.order_by("name", "id")
+    slots = ScheduleSlot.objects.order_by()
+    bookings = Appointment.objects.filter(date__range=(start, end)).order_by()
+    if specialization_id:
+        doctors = doctors.filter(specialization_id=specialization_id)
+        slots = slots.filter(doctor__specialization_id=specialization_id)
+        bookings = bookings.filter(doctor__specialization_id=specialization_id)
+
+    weekly = defaultdict(dict)
+    for doctor_id, weekday, total in slots.values_list("doctor_id", "weekday").annotate(
+        total=Count("id")
+    ):
+        weekly[doctor_id][weekday] = total
+    # Grouped in (date, doctor) order so appt_date_doctor_idx covers it.
+    booked = {
+        (doctor_id, day): total
+        for day, doctor_id, total in bookings.values_list("date", "doctor_id").annotate(
+            total=Count("id")
+        )
+    }
+
+    rows = []
+    for doctor_id, name in doctors.values_list("id", "name"):
+        capacity = weekly.get(doctor_id, {})
+        rows.append(
+            {
+                "id": doctor_id,
+                "name": name,
+                "booked": [booked.get((doctor_id, day), 0) for day in days],
+                "capacity": [capacity.get(day.weekday(), 0) for day in days],
+            }
+        )
+    return days, rows
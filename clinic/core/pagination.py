@@ -0,0 +1,181 @@
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+
+PAGE_SIZE = 25
+
+APPOINTMENT_ORDERING = ("-date", "-time", "-id")
+DOCTOR_ORDERING = ("name", "id")
+
+
+class KeysetPage:
+    """One page of a keyset-paginated queryset plus opaque next/prev cursors."""
+
+    def __init__(self, items, next_cursor=None, prev_cursor=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.prev_cursor is not None
+
+
+def encode_cursor(direction, values):
+    raw = json.dumps({"d": direction, "k": values}, cls=DjangoJSONEncoder)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor, model=None, ordering=None):
+    """
+    Return ``(direction, values)``, or None for a missing or garbled cursor.
+
+    With ``model`` and ``ordering`` the values must also match the ordering
+    fields and are coerced with them (ISO strings back to dates and times),
+    so a tampered cursor falls back to the first page instead of failing
+    in the query.
+    """
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        data = json.loads(raw)
+        direction, values = data["d"], data["k"]
+    except (ValueError, TypeError, KeyError):
+        return None
+    if direction not in ("n", "p") or not isinstance(values, list):
+        return None
+    if model is not None:
+        values = _coerce(model, ordering, values)
+        if values is None:
+            return None
+    return direction, values
+
+
+def _coerce(model, ordering, values):
+    if len(values) != len(ordering):
+        return None
+    coerced = []
+    for field, value in zip(ordering, values):
+        if value is None or isinstance(value, (list, dict, bool)):
+            return None
+        try:
+            coerced.append(model._meta.get_field(field.lstrip("-")).to_python(value))
+        except (ValidationError, TypeError, ValueError):
+            return None
+    return coerced
+
+
+def _value(row, field):
+    name = field.lstrip("-")
+    return row[name] if isinstance(row, dict) else getattr(row, name)
+
+
+def _seek(ordering, values, forward):
+    """
+    Build the row-value comparison ``(a, b, c) > (x, y, z)`` as nested ORs so
+    the database can seek through the index matching ``ordering``.
+    """
+    condition = Q()
+    equal = Q()
+    for field, value in zip(ordering, values):
+        name = field.lstrip("-")
+        lookup = "lt" if field.startswith("-") == forward else "gt"
+        condition |= equal & Q(**{f"{name}__{lookup}": value})
+        equal &= Q(**{name: value})
+    return condition
+
+
+def _reverse(ordering):
+    return [field[1:] if field.startswith("-") else f"-{field}" for field in ordering]
+
+
+def keyset_paginate(queryset, ordering, cursor=None, per_page=PAGE_SIZE):
+    """
+    Return a KeysetPage of ``queryset`` ordered by ``ordering``, which must end
+    in a unique field. Every page costs one indexed query no matter how deep
+    it is, unlike OFFSET which reads and discards all earlier rows.
+    """
+    rows, decoded, forward = _page_rows(queryset, ordering, cursor, per_page)
+    page = _build_page(list(rows), ordering, decoded, forward, per_page)
+    if page is None:
+        # Walked back to the start: show a full first page instead.
+        return keyset_paginate(queryset, ordering, None, per_page)
+    return page
+
+
+async def akeyset_paginate(queryset, ordering, cursor=None, per_page=PAGE_SIZE):
+    """``keyset_paginate`` for async views, fetching rows with async iteration."""
+    rows, decoded, forward = _page_rows(queryset, ordering, cursor, per_page)
+    page = _build_page([row async for row in rows], ordering, decoded, forward, per_page)
+    if page is None:
+        return await akeyset_paginate(queryset, ordering, None, per_page)
+    return page
+
+
+def keyset_paginate_merged(querysets, ordering, cursor=None, per_page=PAGE_SIZE):
+    """
+    ``keyset_paginate`` over several querysets read as one ordered list, e.g.
+    live and archived appointments. ``ordering`` must be unique across all of
+    them. Each page costs one indexed query per queryset, and their rows are
+    merged in Python.
+    """
+    fetched = [_page_rows(queryset, ordering, cursor, per_page) for queryset in querysets]
+    _, decoded, forward = fetched[0]
+    rows = [row for queryset_rows, _, _ in fetched for row in queryset_rows]
+    page = _build_page(_sort_rows(rows, ordering, forward)[: per_page + 1], ordering, decoded, forward, per_page)
+    if page is None:
+        return keyset_paginate_merged(querysets, ordering, None, per_page)
+    return page
+
+
+def _sort_rows(rows, ordering, forward):
+    # Stable sorts from the last key to the first give the full ordering.
+    for field in reversed(ordering):
+        rows.sort(key=lambda row: _value(row, field), reverse=field.startswith("-") == forward)
+    return rows
+
+
+def _page_rows(queryset, ordering, cursor, per_page):
+    decoded = decode_cursor(cursor, queryset.model, ordering)
+    forward = decoded is None or decoded[0] == "n"
+
+    rows = queryset.order_by(*(ordering if forward else _reverse(ordering)))
+    if decoded is not None:
+        rows = rows.filter(_seek(ordering, decoded[1], forward))
+    return rows[: per_page + 1], decoded, forward
+
+
+def _build_page(rows, ordering, decoded, forward, per_page):
+    """Turn the fetched rows into a KeysetPage, or None if a backwards walk ran out."""
+    more = len(rows) > per_page
+    rows = rows[:per_page]
+
+    if not forward:
+        if not more:
+            return None
+        rows.reverse()
+    has_next = more if forward else True
+    has_previous = decoded is not None
+
+    def cursor_for(direction, row):
+        return encode_cursor(direction, [_value(row, field) for field in ordering])
+
+    return KeysetPage(
+        rows,
+        next_cursor=cursor_for("n", rows[-1]) if has_next and rows else None,
+        prev_cursor=cursor_for("p", rows[0]) if has_previous and rows else None,
+    )
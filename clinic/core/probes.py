@@ -0,0 +1,206 @@
+"""
+Helpers for driving every URL in ``core.urls`` through the test client, used
+by the query-plan audit and the benchmark commands.
+"""
+import json
+import subprocess
+from contextlib import contextmanager
+from datetime import date, time, timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.urls import reverse
+from django.utils.http import urlencode
+
+from . import urls
+from .models import Appointment, Doctor, Patient, Specialization
+
+# Views that change data on GET or only make sense as POST targets. The
+# delete views are still probed, by ``iter_post_probes``.
+SKIP_URL_NAMES = {"logout", "admin_doctor_delete", "admin_specialization_delete"}
+
+
+@contextmanager
+def scratch_database():
+    """Run the block against a freshly migrated throwaway test database."""
+    old_name = connection.settings_dict["NAME"]
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+def create_sample_data():
+    """Create one of each object a URL can point at, owned by a staff patient."""
+    User = get_user_model()
+    user = User.objects.create_user(
+        "probe-staff", "probe-staff@example.com", "probe-pass", is_staff=True
+    )
+    patient = Patient.objects.create(
+        user=user, name="Probe Patient", phone="000", email="probe-staff@example.com"
+    )
+    specialization, _ = Specialization.objects.get_or_create(name="Probe Specialization")
+    doctor = Doctor.objects.create(
+        name="Dr Probe",
+        specialization=specialization,
+        experience=10,
+        fees=100,
+        available_days="Mon,Tue,Wed,Thu,Fri",
+        time_slots="9:00 AM,10:00 AM,11:00 AM",
+    )
+    appointment = Appointment.objects.create(
+        patient=patient,
+        doctor=doctor,
+        date=date.today() + timedelta(days=365 * 5),
+        time=time(9, 0),
+    )
+    return {
+        "user": user,
+        "patient": patient,
+        "specialization": specialization,
+        "doctor": doctor,
+        "appointment": appointment,
+    }
+
+
+def _target(name, sample):
+    if "specialization" in name:
+        return sample["specialization"]
+    if "appointment" in name and "doctor" not in name:
+        return sample["appointment"]
+    return sample["doctor"]
+
+
+def _query_variants(name, sample):
+    """Filtered variants worth probing on top of the bare URL."""
+    name = name.removesuffix("_async")
+    if name == "doctor_list":
+        return [
+            {"specialization": sample["specialization"].pk},
+            {"q": "prob"},
+            {"q": "prob", "specialization": sample["specialization"].pk},
+        ]
+    if name == "api_revenue_report":
+        return [{"group": "doctor"}, {"group": "specialization", "from": "2020-01"}]
+    if name == "admin_appointments":
+        return [
+            {"status": Appointment.STATUS_PENDING},
+            {"doctor": sample["doctor"].pk, "status": Appointment.STATUS_PENDING},
+        ]
+    return []
+
+
+def iter_probe_paths(sample):
+    """Yield ``(url_name, path)`` for every GET-able route in ``core.urls``."""
+    for pattern in urls.urlpatterns:
+        name = getattr(pattern, "name", None)
+        if not name or name in SKIP_URL_NAMES:
+            continue
+        kwargs = {}
+        if "pk" in pattern.pattern.converters:
+            kwargs["pk"] = _target(name, sample).pk
+        path = reverse(name, kwargs=kwargs)
+        yield name, path
+        for query in _query_variants(name, sample):
+            yield name, f"{path}?{urlencode(query)}"
+
+
+def iter_post_probes(sample):
+    """
+    Yield ``(url_name, path, post_kwargs)`` for a successful POST to every
+    form view in ``core.urls``, for the client's ``post(path, **post_kwargs)``.
+
+    The slot-booking views are left to the tests, which need holds enabled.
+    The deletes come last and remove ``sample``'s specialization and doctor,
+    and signup comes after them because it logs the client in as a new
+    patient.
+    """
+    doctor, specialization = sample["doctor"], sample["specialization"]
+    appointment = sample["appointment"]
+    doctor_form = {
+        "name": "Dr Probe Two",
+        "specialization": specialization.pk,
+        "experience": 5,
+        "fees": 80,
+        "available_days": "Mon,Wed",
+        "time_slots": "9:00 AM,10:00 AM",
+        "biography": "",
+    }
+    yield "admin_doctors", reverse("admin_doctors"), {"data": doctor_form}
+    yield (
+        "admin_doctor_edit",
+        reverse("admin_doctor_edit", kwargs={"pk": doctor.pk}),
+        {"data": {**doctor_form, "name": doctor.name, "time_slots": "9:00 AM,11:00 AM"}},
+    )
+    yield "admin_specializations", reverse("admin_specializations"), {"data": {"name": "Probe Two"}}
+    edit_path = reverse("admin_specialization_edit", kwargs={"pk": specialization.pk})
+    yield "admin_specialization_edit", edit_path, {"data": {"name": "Probe Renamed"}}
+    yield (
+        "admin_specialization_edit",
+        edit_path,
+        {"data": json.dumps({"name": specialization.name}), "content_type": "application/json"},
+    )
+    appointments_path = reverse("admin_appointments")
+    yield (
+        "admin_appointments",
+        appointments_path,
+        {"data": {"id": appointment.pk, "status": Appointment.STATUS_APPROVED}},
+    )
+    yield (
+        "admin_appointments",
+        appointments_path,
+        {
+            "data": {
+                "action": "bulk",
+                "scope": "selected",
+                "ids": [appointment.pk],
+                "status": Appointment.STATUS_PENDING,
+            }
+        },
+    )
+    yield (
+        "admin_appointments",
+        f"{appointments_path}?{urlencode({'doctor': doctor.pk})}",
+        {
+            "data": json.dumps({"scope": "filtered", "status": Appointment.STATUS_COMPLETED}),
+            "content_type": "application/json",
+        },
+    )
+    yield (
+        "admin_specialization_delete",
+        reverse("admin_specialization_delete", kwargs={"pk": specialization.pk}),
+        {},
+    )
+    yield "admin_doctor_delete", reverse("admin_doctor_delete", kwargs={"pk": doctor.pk}), {}
+    yield (
+        "signup",
+        reverse("signup"),
+        {
+            "data": {
+                "username": "probe-signup",
+                "email": "probe-signup@example.com",
+                "name": "Probe Signup",
+                "phone": "001",
+                "password1": "Clinic-Probe-2024!",
+                "password2": "Clinic-Probe-2024!",
+            }
+        },
+    )
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def git_commit():
+    """Short hash of the checked out commit, or None outside a git checkout."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
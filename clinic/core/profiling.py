@@ -0,0 +1,81 @@
+"""
+SQL profiling shared by QueryProfileMiddleware and the query-budget tests.
+"""
+import re
+import time
+from collections import Counter, deque
+
+from django.conf import settings
+
+_IN_LIST = re.compile(r"IN \((?:%s, )*%s\)")
+_LITERAL = re.compile(r"'(?:[^']|'')*'|\b\d+\b")
+
+
+def fingerprint(sql):
+    """Collapse literals and IN lists so repeats of one statement compare equal."""
+    return _LITERAL.sub("?", _IN_LIST.sub("IN (...)", sql))
+
+
+def query_budget(limit, post=None):
+    """
+    Declare the most queries a view may issue; checked by ``core.testing``.
+    ``post``, when given, is the budget for POST requests, whose write paths
+    usually cost more than rendering the page.
+    """
+
+    def decorator(view):
+        view.query_budget = limit
+        view.post_query_budget = limit if post is None else post
+        return view
+
+    return decorator
+
+
+class QueryProfile:
+    """
+    ``connection.execute_wrapper`` hook that counts statements, times them
+    and groups them by fingerprint.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.fingerprints = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - started
+            self.count += 1
+            self.fingerprints[fingerprint(sql)] += 1
+
+    @property
+    def duplicates(self):
+        """``{fingerprint: times}`` for statements issued more than once."""
+        return {sql: n for sql, n in self.fingerprints.items() if n > 1}
+
+    def header(self):
+        return (
+            f"count={self.count}; time_ms={self.seconds * 1000:.2f}; "
+            f"duplicates={sum(n - 1 for n in self.duplicates.values())}"
+        )
+
+    def summary(self, request=None, status=None):
+        return {
+            "method": getattr(request, "method", None),
+            "path": getattr(request, "path", None),
+            "status": status,
+            "count": self.count,
+            "time_ms": round(self.seconds * 1000, 3),
+            "duplicates": self.duplicates,
+        }
+
+
+history = deque(maxlen=getattr(settings, "CLINIC_SQL_PROFILE_HISTORY", 200))
+
+
+def recent_profiles():
+    """The most recent request summaries, newest last."""
+    return list(history)
@@ -0,0 +1,131 @@
+"""
+Day-before reminders for approved appointments.
+
+``send_reminders`` streams the day's Approved appointments, joined with
+patient and doctor, in one query read ``chunk_size`` rows at a time. It
+skips those with a ``ReminderSent`` marker and sends each chunk over a
+bounded thread pool. Each worker thread keeps its own mail connection.
+Markers for a chunk are written in one insert once its sends finish, so
+running the job again the same day only retries the appointments that
+have not been reached yet.
+
+Messages are built and delivered by ``core.notifications``. An appointment
+is marked as soon as any configured channel reaches the patient.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import timedelta
+from itertools import islice
+
+from django.core.mail import get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from . import notifications
+from .models import Appointment, ReminderSent
+
+CHUNK_SIZE = 1000
+THREADS = 8
+KEEP_MARKERS_DAYS = 30
+MAX_ERRORS_KEPT = 100
+
+
+@dataclass
+class ReminderStats:
+    appointments: int = 0
+    sent: int = 0
+    failed: int = 0
+    chunks: int = 0
+    seconds: float = 0.0
+    errors: list = field(default_factory=list)
+
+    @property
+    def per_second(self):
+        return self.sent / self.seconds if self.seconds else 0.0
+
+
+def default_date():
+    return timezone.localdate() + timedelta(days=1)
+
+
+def due(day):
+    """Approved appointments on ``day`` not reminded yet, as flat tuples for ``notifications.build``."""
+    return (
+        Appointment.objects.filter(status=Appointment.STATUS_APPROVED, date=day)
+        .exclude(id__in=ReminderSent.objects.filter(date=day).values("appointment_id"))
+        .order_by()
+        .values_list(
+            "id", "patient__name", "patient__email", "patient__phone", "doctor__name", "date", "time"
+        )
+    )
+
+
+def _chunks(rows, size):
+    rows = iter(rows)
+    while chunk := list(islice(rows, size)):
+        yield chunk
+
+
+class _Sender:
+    """Delivers one appointment's reminders; called from the pool's threads."""
+
+    def __init__(self):
+        self.local = threading.local()
+        self.connections = []
+        self.lock = threading.Lock()
+
+    def connection(self):
+        if not hasattr(self.local, "connection"):
+            self.local.connection = get_connection()
+            with self.lock:
+                self.connections.append(self.local.connection)
+        return self.local.connection
+
+    def __call__(self, row):
+        """Return ``(appointment_id, delivered, errors)``."""
+        delivered, errors = False, []
+        for notification in notifications.build(row[0], notifications.REMINDER, *row[1:]):
+            try:
+                notifications.deliver(notification, self.connection())
+            except Exception as exc:
+                errors.append(f"{notification.channel} to {notification.recipient}: {type(exc).__name__}: {exc}")
+            else:
+                delivered = True
+        return row[0], delivered, errors
+
+    def close(self):
+        for connection in self.connections:
+            connection.close()
+
+
+def send_reminders(day=None, chunk_size=CHUNK_SIZE, threads=THREADS):
+    """Send every outstanding reminder for ``day`` (default tomorrow); returns ReminderStats."""
+    day = day or default_date()
+    stats = ReminderStats()
+    started = time.perf_counter()
+    ReminderSent.objects.filter(date__lt=day - timedelta(days=KEEP_MARKERS_DAYS)).delete()
+    sender = _Sender()
+    try:
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            for chunk in _chunks(due(day).iterator(chunk_size=chunk_size), chunk_size):
+                stats.chunks += 1
+                stats.appointments += len(chunk)
+                reached = []
+                for appointment_id, delivered, errors in pool.map(sender, chunk):
+                    if delivered:
+                        reached.append(appointment_id)
+                    else:
+                        stats.failed += 1
+                    stats.errors.extend(errors[: MAX_ERRORS_KEPT - len(stats.errors)])
+                with transaction.atomic():
+                    ReminderSent.objects.bulk_create(
+                        [ReminderSent(appointment_id=pk, date=day) for pk in reached],
+                        ignore_conflicts=True,
+                    )
+                stats.sent += len(reached)
+    finally:
+        sender.close()
+    stats.seconds = time.perf_counter() - started
+    return stats
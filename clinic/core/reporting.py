@@ -0,0 +1,149 @@
+"""
+Monthly appointment and revenue rollups.
+
+RevenueRollup holds, for each (doctor, month), the number of completed
+appointments and the fees they earned. ``core.signals`` and
+``booking.bulk_set_status`` adjust it whenever an appointment moves into
+or out of Completed, and the importer does the same for completed rows.
+Reports then read a few hundred rollup rows instead of aggregating the
+whole appointment table.
+
+Revenue is counted at ``Appointment.fee``, the doctor's fee when the
+appointment was booked, so changing a doctor's fee does not restate past
+months. Moving an already completed appointment to another doctor or month
+is not tracked. ``manage.py rebuild_rollups`` repairs that and recomputes
+everything from the stored fees.
+"""
+from django.db.models import BigIntegerField, Case, Count, F, Q, Sum, Value, When
+from django.db.models.functions import TruncMonth
+
+from .models import Appointment, AppointmentArchive, RevenueRollup
+
+GROUPS = ("doctor", "specialization", "month")
+# (doctor, month) keys per UPDATE. Each key adds a WHEN and an OR'd term, and
+# SQLite rejects expression trees deeper than 1000.
+RECORD_CHUNK_SIZE = 100
+
+
+def month_of(day):
+    return day.replace(day=1)
+
+
+def record(deltas):
+    """
+    Add ``{(doctor_id, month): (completed, revenue)}`` to the rollups, one
+    UPDATE per ``RECORD_CHUNK_SIZE`` keys, creating rows for new
+    (doctor, month) pairs.
+    """
+    items = [(key, delta) for key, delta in deltas.items() if any(delta)]
+    for start in range(0, len(items), RECORD_CHUNK_SIZE):
+        _record_chunk(dict(items[start:start + RECORD_CHUNK_SIZE]))
+
+
+def _record_chunk(deltas):
+    def increment(index):
+        return Case(
+            *(
+                When(doctor_id=doctor_id, month=month, then=Value(delta[index]))
+                for (doctor_id, month), delta in deltas.items()
+            ),
+            default=Value(0),
+            output_field=BigIntegerField(),
+        )
+
+    keys = Q()
+    for doctor_id, month in deltas:
+        keys |= Q(doctor_id=doctor_id, month=month)
+    updated = RevenueRollup.objects.filter(keys).update(
+        completed=F("completed") + increment(0), revenue=F("revenue") + increment(1)
+    )
+    if updated < len(deltas):
+        existing = set(RevenueRollup.objects.filter(keys).values_list("doctor_id", "month"))
+        RevenueRollup.objects.bulk_create(
+            [
+                RevenueRollup(doctor_id=doctor_id, month=month, completed=completed, revenue=revenue)
+                for (doctor_id, month), (completed, revenue) in deltas.items()
+                # A decrement with no row to apply to is drift for rebuild to fix,
+                # and may belong to a doctor that is being deleted.
+                if (doctor_id, month) not in existing and completed > 0
+            ],
+            ignore_conflicts=True,
+        )
+
+
+def record_appointment(appointment, sign=1):
+    """
+    Count one completed ``appointment`` in (``sign=1``) or out
+    (``sign=-1``) at its booked fee.
+    """
+    record(
+        {
+            (appointment.doctor_id, month_of(appointment.date)): (
+                sign,
+                sign * appointment.fee,
+            )
+        }
+    )
+
+
+def grouped(queryset):
+    """``{(doctor_id, month): (appointments, fees)}`` over every row in ``queryset``."""
+    rows = (
+        queryset.order_by()
+        .values_list("doctor_id", TruncMonth("date"))
+        .annotate(completed=Count("id"), revenue=Sum("fee"))
+    )
+    return {(doctor_id, month): (completed, revenue) for doctor_id, month, completed, revenue in rows}
+
+
+def grouped_completed(queryset):
+    return grouped(queryset.filter(status=Appointment.STATUS_COMPLETED))
+
+
+def negate(deltas):
+    return {key: (-completed, -revenue) for key, (completed, revenue) in deltas.items()}
+
+
+def rebuild():
+    """Recompute every rollup from live and archived appointments; returns the row count."""
+    RevenueRollup.objects.all().delete()
+    totals = grouped_completed(Appointment.objects.all())
+    for key, (completed, revenue) in grouped_completed(AppointmentArchive.objects.all()).items():
+        live_completed, live_revenue = totals.get(key, (0, 0))
+        totals[key] = (live_completed + completed, live_revenue + revenue)
+    rows = [
+        RevenueRollup(doctor_id=doctor_id, month=month, completed=completed, revenue=revenue)
+        for (doctor_id, month), (completed, revenue) in totals.items()
+    ]
+    RevenueRollup.objects.bulk_create(rows)
+    return len(rows)
+
+
+def report(group, start=None, end=None):
+    """
+    Rollup totals grouped by ``doctor``, ``specialization`` or ``month`` for
+    the months from ``start`` to ``end`` (inclusive), highest revenue first
+    (oldest first for ``month``).
+    """
+    rollups = RevenueRollup.objects.all()
+    if start:
+        rollups = rollups.filter(month__gte=month_of(start))
+    if end:
+        rollups = rollups.filter(month__lte=month_of(end))
+    if group == "doctor":
+        rows = rollups.values("doctor_id", name=F("doctor__name"))
+    elif group == "specialization":
+        rows = rollups.values(
+            specialization_id=F("doctor__specialization_id"),
+            name=F("doctor__specialization__name"),
+        )
+    elif group == "month":
+        rows = rollups.values("month")
+    else:
+        raise ValueError(f"group must be one of {', '.join(GROUPS)}")
+    rows = rows.annotate(completed=Sum("completed"), revenue=Sum("revenue")).order_by(
+        *(["month"] if group == "month" else ["-revenue", "name"])
+    )
+    if group == "month":
+        return [{**row, "month": row["month"].strftime("%Y-%m")} for row in rows]
+    return list(rows)
@@ -0,0 +1,108 @@
+from datetime import datetime
+from typing import NamedTuple
+
+WEEKDAY_NAMES = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+WEEKDAY_CHOICES = list(enumerate(WEEKDAY_NAMES))
+WEEKDAYS = {name.lower(): index for index, name in enumerate(WEEKDAY_NAMES)}
+
+# Accepted spellings for a slot: "10:00 AM", "10:00AM", "10 AM", "14:30".
+TIME_INPUT_FORMATS = ["%I:%M %p", "%I:%M%p", "%I %p", "%I%p", "%H:%M", "%H:%M:%S"]
+
+DEFAULT_SLOT_MINUTES = 30
+
+
+def parse_weekday(value):
+    """Map "Mon", "monday" or " MON " to 0..6, or None if unrecognised."""
+    return WEEKDAYS.get(value.strip()[:3].lower())
+
+
+def parse_slot_time(value):
+    """Parse a free-text slot such as "9:00 am" into a ``time``, or None."""
+    value = " ".join(value.split()).upper()
+    for fmt in TIME_INPUT_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).time()
+        except ValueError:
+            continue
+    return None
+
+
+def format_slot_time(value):
+    """Render a ``time`` the way slots are written on the site, e.g. "9:00 AM"."""
+    hour = value.hour % 12 or 12
+    suffix = "AM" if value.hour < 12 else "PM"
+    return f"{hour}:{value.minute:02d} {suffix}"
+
+
+def parse_schedule(available_days, time_slots):
+    """
+    Turn the comma separated ``available_days``/``time_slots`` strings into a
+    sorted list of weekday numbers and a sorted list of ``time`` objects.
+    Unrecognised entries are dropped.
+    """
+    days = {parse_weekday(day) for day in available_days.split(",") if day.strip()}
+    times = {parse_slot_time(slot) for slot in time_slots.split(",") if slot.strip()}
+    days.discard(None)
+    times.discard(None)
+    return sorted(days), sorted(times)
+
+
+class CompiledSchedule(NamedTuple):
+    """
+    A doctor's weekly schedule parsed once: a frozen set of weekday numbers
+    and the sorted slot times, with a frozen set of the same times for O(1)
+    membership checks.
+    """
+
+    weekdays: frozenset
+    slots: tuple
+    slot_set: frozenset
+    source: tuple
+
+    def works_on(self, day):
+        return day.weekday() in self.weekdays
+
+    def has_slot(self, value):
+        return value in self.slot_set
+
+    def allows(self, day, value):
+        return day.weekday() in self.weekdays and value in self.slot_set
+
+    @property
+    def day_names(self):
+        return [WEEKDAY_NAMES[day] for day in sorted(self.weekdays)]
+
+    @property
+    def slot_labels(self):
+        return [format_slot_time(slot) for slot in self.slots]
+
+
+def compile_schedule(available_days, time_slots):
+    days, times = parse_schedule(available_days, time_slots)
+    return CompiledSchedule(
+        frozenset(days), tuple(times), frozenset(times), (available_days, time_slots)
+    )
+
+
+# (doctor pk, updated_at) -> CompiledSchedule, shared by every request in
+# the process. Cleared wholesale when full; recompiling is cheap.
+_compiled = {}
+COMPILED_CACHE_SIZE = 4096
+
+
+def schedule_for(pk, updated_at, available_days, time_slots):
+    """
+    The compiled schedule for a doctor, memoized by ``(pk, updated_at)``.
+    Unsaved doctors and in-memory edits that no longer match the memoized
+    source strings are compiled afresh.
+    """
+    if pk is None or updated_at is None:
+        return compile_schedule(available_days, time_slots)
+    key = (pk, updated_at)
+    compiled = _compiled.get(key)
+    if compiled is None or compiled.source != (available_days, time_slots):
+        compiled = compile_schedule(available_days, time_slots)
+        if len(_compiled) >= COMPILED_CACHE_SIZE:
+            _compiled.clear()
+        _compiled[key] = compiled
+    return compiled
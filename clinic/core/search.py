@@ -0,0 +1,178 @@
+"""
+Doctor search over name, specialization and biography.
+
+On SQLite with FTS5 the text lives in the ``core_doctor_search`` virtual
+table, keyed by doctor id and ranked with bm25 (name weighs most). Migration
+0010 creates and fills it. The Doctor and Specialization signal handlers
+keep it in sync, and paths that skip signals (bulk_create, queryset
+updates) call ``index_doctors`` themselves or leave it to
+``manage.py rebuild_doctor_search``. There are no triggers: a trigger
+that mentions ``core_doctor`` makes SQLite reject the drop-and-rename a
+migration uses to rebuild that table. Without FTS5 (or on another
+database) there is no index and searches fall back to ``icontains``
+filtering.
+"""
+import re
+
+from django.db import DatabaseError, connections, transaction
+from django.db.models import Case, Q, When
+
+TABLE = "core_doctor_search"
+RESULT_LIMIT = 48
+CHUNK_SIZE = 500
+
+# Name first, then specialization, then biography.
+_RANK = f"bm25({TABLE}, 10.0, 5.0, 1.0)"
+_CREATE = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} USING fts5("
+    "name, specialization, biography, "
+    "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+)
+_INDEX = (
+    f"INSERT INTO {TABLE}(rowid, name, specialization, biography) "
+    "SELECT d.id, d.name, COALESCE(s.name, ''), d.biography "
+    "FROM core_doctor d LEFT JOIN core_specialization s ON s.id = d.specialization_id"
+)
+_OF_SPECIALIZATION = "rowid IN (SELECT id FROM core_doctor WHERE specialization_id = %s)"
+
+# alias -> whether the index table exists; looked up once per process.
+_available = {}
+
+
+def available(using=None):
+    using = using or "default"
+    if using not in _available:
+        conn = connections[using]
+        if conn.vendor != "sqlite":
+            _available[using] = False
+        else:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [TABLE])
+                _available[using] = cursor.fetchone() is not None
+    return _available[using]
+
+
+def create(using=None):
+    """Create the index table if missing; returns False when FTS5 is unavailable."""
+    using = using or "default"
+    conn = connections[using]
+    _available.pop(using, None)
+    if conn.vendor != "sqlite":
+        return False
+    try:
+        with transaction.atomic(using=using), conn.cursor() as cursor:
+            cursor.execute(_CREATE)
+    except DatabaseError:
+        # SQLite built without FTS5.
+        return False
+    return True
+
+
+def drop(using=None):
+    using = using or "default"
+    _available.pop(using, None)
+    if connections[using].vendor == "sqlite":
+        with connections[using].cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {TABLE}")
+
+
+def _write(using, *statements):
+    if not available(using):
+        return
+    with connections[using or "default"].cursor() as cursor:
+        for sql, params in statements:
+            cursor.execute(sql, params)
+
+
+def index_doctors(ids, using=None):
+    """(Re)index the doctors with these ids from their current rows."""
+    ids = list(ids)
+    for start in range(0, len(ids), CHUNK_SIZE):
+        chunk = ids[start:start + CHUNK_SIZE]
+        placeholders = ", ".join(["%s"] * len(chunk))
+        _write(
+            using,
+            (f"DELETE FROM {TABLE} WHERE rowid IN ({placeholders})", chunk),
+            (f"{_INDEX} WHERE d.id IN ({placeholders})", chunk),
+        )
+
+
+def unindex_doctor(pk, using=None):
+    _write(using, (f"DELETE FROM {TABLE} WHERE rowid = %s", [pk]))
+
+
+def rename_specialization(specialization, using=None):
+    _write(
+        using,
+        (f"UPDATE {TABLE} SET specialization = %s WHERE {_OF_SPECIALIZATION}",
+         [specialization.name, specialization.pk]),
+    )
+
+
+def clear_specialization(pk, using=None):
+    """Blank the specialization of its doctors, before it is deleted and they are SET_NULL."""
+    _write(using, (f"UPDATE {TABLE} SET specialization = '' WHERE {_OF_SPECIALIZATION}", [pk]))
+
+
+def rebuild(using=None):
+    """Repopulate the index from scratch; returns the number of doctors indexed."""
+    conn = connections[using or "default"]
+    with transaction.atomic(using=conn.alias), conn.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {TABLE}")
+        cursor.execute(_INDEX)
+        cursor.execute(f"SELECT count(*) FROM {TABLE}")
+        return cursor.fetchone()[0]
+
+
+def terms(query):
+    return re.findall(r"\w+", query)
+
+
+def match_expression(query):
+    """Quote each word and allow prefix matches: ``car kh`` -> ``"car"* "kh"*``."""
+    return " ".join(f'"{term}"*' for term in terms(query))
+
+
+def ranked_ids(query, specialization_id=None, limit=RESULT_LIMIT, using=None):
+    """Best matching doctor ids, best first, or None if FTS5 is not usable."""
+    expression = match_expression(query)
+    if not expression or not available(using):
+        return None
+    conn = connections[using or "default"]
+    sql = f"SELECT {TABLE}.rowid FROM {TABLE}"
+    params = [expression]
+    if specialization_id:
+        sql += f" JOIN core_doctor ON core_doctor.id = {TABLE}.rowid AND core_doctor.specialization_id = %s"
+        params.insert(0, specialization_id)
+    sql += f" WHERE {TABLE} MATCH %s ORDER BY {_RANK} LIMIT %s"
+    try:
+        # A failed read leaves an SQLite transaction usable, so no savepoint.
+        with conn.cursor() as cursor:
+            cursor.execute(sql, [*params, limit])
+            return [row[0] for row in cursor.fetchall()]
+    except DatabaseError:
+        return None
+
+
+def search_doctors(queryset, query, specialization_id=None, limit=RESULT_LIMIT):
+    """
+    Up to ``limit`` doctors from ``queryset`` matching ``query`` (and
+    ``specialization_id`` if given), best match first, using FTS5 when
+    available and ``icontains`` otherwise.
+    """
+    if specialization_id:
+        queryset = queryset.filter(specialization_id=specialization_id)
+    ids = ranked_ids(query, specialization_id, limit, using=queryset.db)
+    if ids is None:
+        condition = Q()
+        for term in terms(query):
+            condition &= (
+                Q(name__icontains=term)
+                | Q(specialization__name__icontains=term)
+                | Q(biography__icontains=term)
+            )
+        return list(queryset.filter(condition).order_by("name", "id")[:limit])
+    if not ids:
+        return []
+    rank = Case(*(When(pk=pk, then=position) for position, pk in enumerate(ids)))
+    return list(queryset.filter(pk__in=ids).order_by(rank))
@@ -0,0 +1,157 @@
+"""
+Synthetic clinic data with roughly realistic shape: a few large
+specializations and a long tail, doctor popularity following a power law,
+bookings skewed towards the recent past, and statuses that depend on
+whether the date has passed. Everything is written with ``bulk_create``,
+then the counters, revenue rollups, search index and doctor cache are
+brought back in sync.
+"""
+import random
+from datetime import date, time, timedelta
+from itertools import accumulate
+
+from django.db import transaction
+
+from . import caching, reporting, search, stats
+from .models import Appointment, Doctor, Patient, ScheduleSlot, Specialization
+from .schedule import WEEKDAY_NAMES, format_slot_time, parse_schedule
+
+SPECIALIZATION_NAMES = [
+    "General Medicine", "Pediatrics", "Gynecology", "Dermatology", "Cardiology",
+    "Orthopedics", "ENT", "Ophthalmology", "Psychiatry", "Neurology",
+    "Gastroenterology", "Urology", "Endocrinology", "Pulmonology", "Nephrology",
+    "Oncology", "Rheumatology", "Dentistry", "Physiotherapy", "Nutrition",
+]
+FIRST_NAMES = [
+    "Ayesha", "Bilal", "Fatima", "Hamza", "Hina", "Imran", "Maria", "Omar",
+    "Sana", "Usman", "Zara", "Ali", "Nadia", "Kamran", "Sara", "Tariq",
+]
+LAST_NAMES = [
+    "Khan", "Ahmed", "Malik", "Hussain", "Siddiqui", "Qureshi", "Raza",
+    "Sheikh", "Butt", "Chaudhry", "Mirza", "Javed", "Iqbal", "Aslam",
+]
+SLOT_TIMES = [time(hour, minute) for hour in range(8, 18) for minute in (0, 30)]
+
+BATCH_SIZE = 5000
+
+
+def _name(rng):
+    return f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+
+
+def seed(specializations=10, doctors=50, patients=1000, appointments=10000, rng=None, today=None):
+    """Create the requested rows and return how many of each were written."""
+    rng = rng or random.Random()
+    today = today or date.today()
+    token = f"{rng.getrandbits(32):08x}"
+
+    with transaction.atomic():
+        names = SPECIALIZATION_NAMES[:specializations] + [
+            f"Specialty {token}-{i}" for i in range(max(0, specializations - len(SPECIALIZATION_NAMES)))
+        ]
+        Specialization.objects.bulk_create(
+            [Specialization(name=name) for name in names], ignore_conflicts=True
+        )
+        spec_ids = list(Specialization.objects.filter(name__in=names).values_list("id", flat=True))
+        # A handful of big specializations and a long tail.
+        spec_weights = list(accumulate(1 / (rank + 1) for rank in range(len(spec_ids))))
+
+        doctor_rows = []
+        for _ in range(doctors):
+            days = sorted(rng.sample(range(6), rng.randint(3, 6)))
+            slots = sorted(rng.sample(SLOT_TIMES, rng.randint(4, 10)))
+            doctor_rows.append(
+                Doctor(
+                    name=f"Dr {_name(rng)}",
+                    specialization_id=rng.choices(spec_ids, cum_weights=spec_weights)[0] if spec_ids else None,
+                    experience=rng.randint(1, 35),
+                    fees=rng.randrange(500, 5001, 100),
+                    available_days=",".join(WEEKDAY_NAMES[day] for day in days),
+                    time_slots=",".join(format_slot_time(slot) for slot in slots),
+                    biography="Synthetic doctor created by seed_clinic.",
+                )
+            )
+        Doctor.objects.bulk_create(doctor_rows, batch_size=BATCH_SIZE)
+        schedules, fees = {}, {}
+        slot_rows = []
+        for doctor in doctor_rows:
+            days, times = parse_schedule(doctor.available_days, doctor.time_slots)
+            schedules[doctor.pk] = (set(days), times)
+            fees[doctor.pk] = doctor.fees
+            slot_rows.extend(
+                ScheduleSlot(doctor_id=doctor.pk, weekday=day, start_time=slot)
+                for day in days
+                for slot in times
+            )
+        ScheduleSlot.objects.bulk_create(slot_rows, batch_size=BATCH_SIZE)
+
+        patient_rows = [
+            Patient(
+                name=_name(rng),
+                phone=f"03{rng.randint(0, 999999999):09d}",
+                email=f"patient-{token}-{i}@example.com",
+            )
+            for i in range(patients)
+        ]
+        Patient.objects.bulk_create(patient_rows, batch_size=BATCH_SIZE)
+        patient_ids = [patient.pk for patient in patient_rows]
+
+        appointment_rows = _appointments(rng, today, appointments, schedules, fees, patient_ids)
+        Appointment.objects.bulk_create(appointment_rows, batch_size=BATCH_SIZE)
+
+        stats.reconcile()
+        reporting.rebuild()
+        search.index_doctors(doctor.pk for doctor in doctor_rows)
+        caching.bump(caching.DOCTORS)
+
+    return {
+        "specializations": len(spec_ids),
+        "doctors": len(doctor_rows),
+        "patients": len(patient_rows),
+        "appointments": len(appointment_rows),
+    }
+
+
+def _appointments(rng, today, count, schedules, fees, patient_ids):
+    if not schedules or not patient_ids:
+        return []
+    doctor_ids = list(schedules)
+    rng.shuffle(doctor_ids)
+    # Power-law popularity: the busiest doctors get most of the bookings.
+    doctor_weights = list(accumulate(1 / (rank + 1) ** 0.8 for rank in range(len(doctor_ids))))
+
+    booked = set()
+    rows = []
+    attempts = 0
+    while len(rows) < count and attempts < count * 20:
+        attempts += 1
+        doctor_id = rng.choices(doctor_ids, cum_weights=doctor_weights)[0]
+        days, times = schedules[doctor_id]
+        if not days or not times:
+            continue
+        # 70% history over the last year (denser recently), 30% in the next 60 days.
+        if rng.random() < 0.7:
+            day = today - timedelta(days=int(rng.expovariate(1 / 90)) % 365 + 1)
+        else:
+            day = today + timedelta(days=rng.randint(0, 60))
+        if day.weekday() not in days:
+            continue
+        slot = rng.choice(times)
+        if (doctor_id, day, slot) in booked:
+            continue
+        booked.add((doctor_id, day, slot))
+        if day < today:
+            status = Appointment.STATUS_COMPLETED if rng.random() < 0.85 else Appointment.STATUS_APPROVED
+        else:
+            status = Appointment.STATUS_PENDING if rng.random() < 0.6 else Appointment.STATUS_APPROVED
+        rows.append(
+            Appointment(
+                patient_id=rng.choice(patient_ids),
+                doctor_id=doctor_id,
+                date=day,
+                time=slot,
+                status=status,
+                fee=fees[doctor_id],
+            )
+        )
+    return rows
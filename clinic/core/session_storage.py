@@ -0,0 +1,48 @@
+"""
+Cleanup for whichever session engine ``CLINIC_SESSION_STORAGE`` selects.
+
+Django's ``clear_expired`` for the database engines is a single DELETE,
+which holds the SQLite write lock for as long as it takes to remove every
+expired row. ``clear_expired`` here deletes a batch per transaction
+instead, like ``core.archive``. The file engine removes its files directly,
+and signed cookies leave nothing on the server.
+"""
+from importlib import import_module
+
+from django.conf import settings
+from django.db import router, transaction
+from django.utils import timezone
+
+BATCH_SIZE = 1000
+
+
+def session_store():
+    return import_module(settings.SESSION_ENGINE).SessionStore
+
+
+def uses_database():
+    return hasattr(session_store(), "get_model_class")
+
+
+def clear_expired(batch_size=BATCH_SIZE):
+    """Remove expired sessions; returns how many rows were deleted, or None if not counted."""
+    store = session_store()
+    if not uses_database():
+        store.clear_expired()
+        return None
+    model = store.get_model_class()
+    using = router.db_for_write(model)
+    now = timezone.now()
+    deleted = 0
+    while True:
+        with transaction.atomic(using=using):
+            keys = list(
+                model.objects.using(using)
+                .filter(expire_date__lt=now)
+                .values_list("session_key", flat=True)[:batch_size]
+            )
+            if keys:
+                model.objects.using(using).filter(session_key__in=keys).delete()
+        deleted += len(keys)
+        if len(keys) < batch_size:
+            return deleted
@@ -0,0 +1,80 @@
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import caching, notifications, reporting, search, stats
+from .models import Appointment, AppointmentArchive, Doctor, Patient, Specialization
+
+
+@receiver(post_save, sender=Doctor)
+def doctor_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        stats.adjust({stats.DOCTORS: 1})
+    caching.invalidate_doctor(instance.pk)
+    search.index_doctors([instance.pk])
+
+
+@receiver(post_delete, sender=Doctor)
+def doctor_deleted(sender, instance, **kwargs):
+    stats.adjust({stats.DOCTORS: -1})
+    caching.invalidate_doctor(instance.pk)
+    search.unindex_doctor(instance.pk)
+
+
+@receiver(post_save, sender=Specialization)
+def specialization_saved(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        caching.invalidate_specialization(instance)
+        if not created:
+            search.rename_specialization(instance)
+
+
+@receiver(pre_delete, sender=Specialization)
+def specialization_deleting(sender, instance, **kwargs):
+    # SET_NULL on the doctors happens without signals or auto_now, so look
+    # them up first.
+    caching.invalidate_specialization(instance)
+    search.clear_specialization(instance.pk)
+    Doctor.objects.filter(specialization=instance).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=Patient)
+def patient_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        stats.adjust({stats.PATIENTS: 1})
+
+
+@receiver(post_delete, sender=Patient)
+def patient_deleted(sender, instance, **kwargs):
+    stats.adjust({stats.PATIENTS: -1})
+
+
+@receiver(post_save, sender=Appointment)
+def appointment_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, "_loaded_status", None)
+    completed = Appointment.STATUS_COMPLETED
+    if created:
+        stats.adjust({stats.APPOINTMENTS: 1, stats.status_key(instance.status): 1})
+        if instance.status == completed:
+            reporting.record_appointment(instance)
+        notifications.for_appointment(instance)
+    elif previous is not None and previous != instance.status:
+        stats.adjust(
+            {stats.status_key(previous): -1, stats.status_key(instance.status): 1}
+        )
+        if completed in (previous, instance.status):
+            reporting.record_appointment(instance, 1 if instance.status == completed else -1)
+        notifications.for_appointment(instance)
+    instance._loaded_status = instance.status
+
+
+@receiver(post_delete, sender=Appointment)
+@receiver(post_delete, sender=AppointmentArchive)
+def appointment_deleted(sender, instance, **kwargs):
+    stats.adjust({stats.APPOINTMENTS: -1, stats.status_key(instance.status): -1})
+    if instance.status == Appointment.STATUS_COMPLETED:
+        reporting.record_appointment(instance, -1)
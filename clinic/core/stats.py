@@ -0,0 +1,78 @@
+"""
+Denormalized dashboard counters.
+
+Creating or deleting a Doctor, Patient or Appointment, or changing an
+appointment's status, adjusts the matching StatCounter rows in one UPDATE
+(see ``core.signals``). The home page and admin dashboard read every number
+with a single query. ``manage.py reconcile_stats`` repairs any drift left by
+writes that bypass the ORM signals. Archived appointments (see
+``core.archive``) still count.
+"""
+from django.db.models import Case, Count, F, IntegerField, Value, When
+
+from .models import Appointment, AppointmentArchive, Doctor, Patient, StatCounter
+
+DOCTORS = "doctors"
+PATIENTS = "patients"
+APPOINTMENTS = "appointments"
+
+
+def status_key(status):
+    return f"status:{status}"
+
+
+def counter_names():
+    return [DOCTORS, PATIENTS, APPOINTMENTS] + [
+        status_key(status) for status, _ in Appointment.STATUS_CHOICES
+    ]
+
+
+def adjust(deltas):
+    """Add ``{name: delta}`` to the named counters in a single UPDATE."""
+    deltas = {name: delta for name, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    updated = StatCounter.objects.filter(name__in=deltas).update(
+        value=F("value")
+        + Case(
+            *(When(name=name, then=Value(delta)) for name, delta in deltas.items()),
+            default=Value(0),
+            output_field=IntegerField(),
+        )
+    )
+    if updated < len(deltas):
+        existing = set(StatCounter.objects.filter(name__in=deltas).values_list("name", flat=True))
+        StatCounter.objects.bulk_create(
+            [StatCounter(name=name, value=delta) for name, delta in deltas.items() if name not in existing],
+            ignore_conflicts=True,
+        )
+
+
+def snapshot():
+    """Return every counter as ``{name: value}``, defaulting missing ones to 0."""
+    values = dict.fromkeys(counter_names(), 0)
+    values.update(StatCounter.objects.values_list("name", "value"))
+    return values
+
+
+def actual_counts():
+    counts = {
+        DOCTORS: Doctor.objects.count(),
+        PATIENTS: Patient.objects.count(),
+        APPOINTMENTS: Appointment.objects.count() + AppointmentArchive.objects.count(),
+    }
+    counts.update({status_key(status): 0 for status, _ in Appointment.STATUS_CHOICES})
+    for model in (Appointment, AppointmentArchive):
+        for row in model.objects.values("status").annotate(total=Count("id")).order_by():
+            counts[status_key(row["status"])] += row["total"]
+    return counts
+
+
+def reconcile():
+    """Overwrite every counter with a fresh COUNT(*) and return the drift found."""
+    stored = snapshot()
+    actual = actual_counts()
+    drift = {name: actual[name] - stored.get(name, 0) for name in actual if actual[name] != stored.get(name, 0)}
+    for name, value in actual.items():
+        StatCounter.objects.update_or_create(name=name, defaults={"value": value})
+    return drift
@@ -0,0 +1,36 @@
+"""Test helpers for keeping views inside their declared query budgets."""
+from django.db import connection
+from django.urls import resolve
+
+from .profiling import QueryProfile
+
+
+class QueryBudgetMixin:
+    """
+    ``assertWithinQueryBudget(path)`` requests ``path`` with ``self.client``
+    and fails if the resolved view has no ``@query_budget`` or issues more
+    queries than it declares. The failure lists repeated statements, which
+    is usually where an N+1 hides. Pass ``method="post"`` and ``data`` to
+    check a view's write path against its POST budget.
+    """
+
+    def assertWithinQueryBudget(self, path, method="get", data=None, **extra):
+        view = resolve(path.split("?", 1)[0]).func
+        budget = getattr(view, "query_budget", None)
+        if budget is None:
+            self.fail(f"{view.__module__}.{view.__name__} has no @query_budget")
+        if method == "post":
+            budget = view.post_query_budget
+        profile = QueryProfile()
+        with connection.execute_wrapper(profile):
+            response = getattr(self.client, method)(path, data, **extra)
+            if response.streaming:
+                for _ in response.streaming_content:
+                    pass
+        if profile.count > budget:
+            repeated = "\n".join(f"  {n}x {sql}" for sql, n in profile.duplicates.items())
+            self.fail(
+                f"{path} issued {profile.count} queries, budget is {budget}."
+                + (f"\nRepeated statements:\n{repeated}" if repeated else "")
+            )
+        return response
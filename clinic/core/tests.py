@@ -1,9 +1,34 @@
-from django.test import TestCase
-from django.urls import reverse
+import os
+import runpy
+import sqlite3
+from datetime import date, time, timedelta
+from importlib import import_module
+from io import StringIO
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import mock
+
+from django.contrib.sessions.models import Session
+from django.core import mail
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.db import connection, connections, transaction
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+from django.utils import timezone
 from django.contrib.auth import get_user_model
 import json
 
-from .models import Specialization, Doctor
+from . import archive, booking, caching, importers, notifications, probes, profiling, reminders, reporting, search, session_storage, stats
+from .forms import AppointmentFilterForm, AppointmentForm
+from .testing import QueryBudgetMixin
+from .occupancy import occupancy
+from .pagination import APPOINTMENT_ORDERING, encode_cursor, keyset_paginate, keyset_paginate_merged
+from .models import (
+    Appointment, AppointmentArchive, Doctor, Notification, Patient, ReminderSent, RevenueRollup, ScheduleSlot, SlotHold, Specialization, StatCounter,
+)
 
 
 User = get_user_model()
@@ -54,3 +79,1088 @@ class SpecializationDeleteTests(TestCase):
         resp2 = self.client.get(delete_url)
         self.assertEqual(resp2.status_code, 400)
 
+
+
+class AvailabilityApiTests(TestCase):
+    def setUp(self):
+        self.doctor = Doctor.objects.create(
+            name='Dr Slots', experience=3, fees=50, available_days='Mon, Wed', time_slots='9:00 AM,10:00 AM',
+        )
+        self.patient = Patient.objects.create(name='Pat', phone='123', email='pat@example.com')
+
+    def test_free_slots_exclude_booked(self):
+        # 2030-01-07 is a Monday
+        Appointment.objects.create(patient=self.patient, doctor=self.doctor, date=date(2030, 1, 7), time=time(9, 0))
+        url = reverse('api_doctor_availability', args=[self.doctor.id])
+        with self.assertNumQueries(3):
+            resp = self.client.get(url, {'from': '2030-01-07', 'to': '2030-01-13'})
+        self.assertEqual(resp.status_code, 200)
+        days = resp.json()['days']
+        self.assertEqual([d['date'] for d in days], ['2030-01-07', '2030-01-09'])
+        self.assertEqual(days[0]['slots'], [{'time': '10:00', 'label': '10:00 AM'}])
+        self.assertEqual([s['time'] for s in days[1]['slots']], ['09:00', '10:00'])
+
+    def test_range_defaults_to_the_local_date(self):
+        url = reverse('api_doctor_availability', args=[self.doctor.id])
+        with mock.patch.object(timezone, 'localdate', return_value=date(2030, 1, 7)):
+            days = self.client.get(url).json()['days']
+        self.assertEqual(days[0]['date'], '2030-01-07')
+
+    def test_invalid_range_rejected(self):
+        url = reverse('api_doctor_availability', args=[self.doctor.id])
+        self.assertEqual(self.client.get(url, {'from': 'soon'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'from': '2030-01-07', 'to': '2030-03-07'}).status_code, 400)
+
+
+class ScheduleStorageTests(TestCase):
+    def test_doctor_save_builds_schedule_slots(self):
+        doctor = Doctor.objects.create(
+            name='Dr Csv', experience=1, fees=10, available_days='Mon,Friday,Someday', time_slots='10:00 AM, 9:00am,2:30PM',
+        )
+        slots = list(doctor.schedule_slots.values_list('weekday', 'start_time'))
+        self.assertEqual(slots, [
+            (0, time(9, 0)), (0, time(10, 0)), (0, time(14, 30)),
+            (4, time(9, 0)), (4, time(10, 0)), (4, time(14, 30)),
+        ])
+        doctor.available_days = 'Tue'
+        doctor.save()
+        self.assertEqual(set(doctor.schedule_slots.values_list('weekday', flat=True)), {1})
+
+    def test_save_without_schedule_change_keeps_slots(self):
+        Doctor.objects.create(name='Dr Same', experience=1, fees=10, available_days='Mon', time_slots='9:00 AM')
+        doctor = Doctor.objects.get(name='Dr Same')
+        doctor.fees = 20
+        with CaptureQueriesContext(connection) as ctx:
+            doctor.save()
+        self.assertFalse([q for q in ctx.captured_queries if 'core_scheduleslot' in q['sql']])
+        doctor.time_slots = '10:00 AM'
+        doctor.save()
+        self.assertEqual(list(doctor.schedule_slots.values_list('start_time', flat=True)), [time(10, 0)])
+
+    def test_time_migration_moves_duplicate_spellings(self):
+        migration = import_module('core.migrations.0004_structured_schedule')
+        day = date(2030, 1, 7)
+        updates, moved = migration.normalize_times([
+            (2, 1, day, '10:00AM', 5, 'Pending', 'second'),
+            (1, 1, day, '10:00 AM', 5, 'Approved', ''),
+            (5, 1, day, '10:01', 5, 'Pending', ''),
+            (3, 1, day, 'soon', 5, 'Pending', ''),
+            (4, 1, day, 'later', 5, 'Pending', ''),
+        ])
+        self.assertEqual(moved, {2: 1, 4: 3})
+        self.assertEqual(updates[1], ('10:00:00', ''))
+        self.assertEqual(updates[2], ('10:02:00', 'second\nMoved from 10:00AM to 10:02: appointment 1 has the same slot.'))
+        self.assertEqual(updates[3], ('00:00:00', 'Original time: soon'))
+        self.assertEqual(updates[4], ('00:01:00', 'Original time: later\nMoved from later to 00:01: appointment 3 has the same slot.'))
+        with self.assertRaisesMessage(RuntimeError, 'appointment 2'):
+            migration.normalize_times([
+                (1, 1, day, '10:00 AM', 5, 'Pending', ''),
+                (2, 1, day, '10:00AM', 6, 'Pending', ''),
+            ])
+
+    def test_appointments_order_by_real_time(self):
+        doctor = Doctor.objects.create(name='Dr T', experience=1, fees=10, available_days='Mon', time_slots='9:00 AM')
+        patient = Patient.objects.create(name='P', phone='1', email='p@example.com')
+        for slot in (time(9, 0), time(10, 0)):
+            Appointment.objects.create(patient=patient, doctor=doctor, date=date(2030, 1, 7), time=slot)
+        self.assertEqual([a.time for a in Appointment.objects.all()], [time(10, 0), time(9, 0)])
+
+
+class BookingTests(TestCase):
+    def setUp(self):
+        self.doctor = Doctor.objects.create(
+            name='Dr Busy', experience=3, fees=50, available_days='Mon', time_slots='9:00 AM',
+        )
+        self.user = User.objects.create_user('alice', 'alice@example.com', 'pass')
+        self.patient = Patient.objects.create(user=self.user, name='Alice', phone='1', email='alice@example.com')
+        self.other = User.objects.create_user('bob', 'bob@example.com', 'pass')
+        self.payload = {
+            'name': 'Alice', 'phone': '1', 'email': 'alice@example.com',
+            'doctor': self.doctor.id, 'date': '2030-01-07', 'time': '9:00 AM',
+        }
+
+    def test_booking_inserts_without_an_existence_check(self):
+        with CaptureQueriesContext(connection) as ctx:
+            booking.create_booking(self.patient, self.doctor, date(2030, 1, 7), time(9, 0))
+        statements = [
+            ' '.join(q['sql'].split()[:3]) for q in ctx.captured_queries
+            if not q['sql'].startswith(('SAVEPOINT', 'RELEASE SAVEPOINT'))
+        ]
+        # No existence check: one appointment INSERT, then the dashboard
+        # counters and the patient's outbox message, written by the
+        # post_save handlers in the same transaction.
+        self.assertEqual(statements, [
+            'INSERT INTO "core_appointment"',
+            'UPDATE "core_statcounter" SET',
+            'INSERT INTO "core_notification"',
+        ])
+
+    def test_taken_slot_returns_form_error(self):
+        Appointment.objects.create(patient=self.patient, doctor=self.doctor, date=date(2030, 1, 7), time=time(9, 0))
+        self.client.force_login(self.user)
+        resp = self.client.post(reverse('book_appointment'), self.payload)
+        self.assertEqual(resp.status_code, 200)
+        self.assertContains(resp, 'already been booked')
+        self.assertEqual(Appointment.objects.count(), 1)
+
+    @override_settings(CLINIC_SLOT_HOLD_SECONDS=300)
+    def test_hold_blocks_other_users(self):
+        self.client.force_login(self.other)
+        url = reverse('api_slot_hold')
+        hold = {'doctor': self.doctor.id, 'date': '2030-01-07', 'time': '09:00'}
+        self.assertEqual(self.client.post(url, hold).status_code, 201)
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.post(url, hold).status_code, 409)
+        resp = self.client.post(reverse('book_appointment'), self.payload)
+        self.assertContains(resp, 'being booked by another patient')
+        # the holder can complete the booking, which releases the hold
+        with self.assertRaises(booking.SlotUnavailable):
+            booking.create_booking(self.patient, self.doctor, date(2030, 1, 7), time(9, 0), user=self.user)
+        booking.create_booking(self.patient, self.doctor, date(2030, 1, 7), time(9, 0), user=self.other)
+        self.assertFalse(SlotHold.objects.exists())
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        self.doctor = Doctor.objects.create(name='Dr Page', experience=1, fees=10, available_days='Mon', time_slots='9:00 AM')
+        self.patient = Patient.objects.create(name='P', phone='1', email='p@example.com')
+        Appointment.objects.bulk_create(
+            Appointment(patient=self.patient, doctor=self.doctor, date=date(2030, 1, 1 + i // 3), time=time(9 + i % 3, 0), fee=10)
+            for i in range(60)
+        )
+        self.expected = list(Appointment.objects.order_by('-date', '-time', '-id').values_list('id', flat=True))
+
+    def test_walk_forward_and_back(self):
+        first = keyset_paginate(Appointment.objects.all(), APPOINTMENT_ORDERING, per_page=25)
+        self.assertFalse(first.has_previous)
+        second = keyset_paginate(Appointment.objects.all(), APPOINTMENT_ORDERING, first.next_cursor, per_page=25)
+        third = keyset_paginate(Appointment.objects.all(), APPOINTMENT_ORDERING, second.next_cursor, per_page=25)
+        self.assertEqual([a.id for a in first] + [a.id for a in second] + [a.id for a in third], self.expected)
+        self.assertFalse(third.has_next)
+        back = keyset_paginate(Appointment.objects.all(), APPOINTMENT_ORDERING, third.prev_cursor, per_page=25)
+        self.assertEqual([a.id for a in back], [a.id for a in second])
+        self.assertEqual(
+            [a.id for a in keyset_paginate(Appointment.objects.all(), APPOINTMENT_ORDERING, back.prev_cursor, per_page=25)],
+            [a.id for a in first],
+        )
+
+    def test_tampered_cursors_fall_back_to_the_first_page(self):
+        staff = User.objects.create_user('staff', 'staff@example.com', 'pass', is_staff=True)
+        self.client.force_login(staff)
+        cursors = [
+            encode_cursor('n', ['garbage', '09:00:00', 1]),
+            encode_cursor('n', ['2030-01-05', 'noon', 1]),
+            encode_cursor('n', ['2030-01-05', '09:00:00', 'x']),
+            encode_cursor('n', [None, {}, []]),
+            encode_cursor('p', ['Dr', 'x']),
+        ]
+        for cursor in cursors:
+            with self.subTest(cursor=cursor):
+                resp = self.client.get(reverse('admin_appointments'), {'cursor': cursor})
+                self.assertEqual([a.id for a in resp.context['page']], self.expected[:25])
+                self.assertEqual(self.client.get(reverse('doctor_list'), {'cursor': cursor}).status_code, 200)
+                self.assertEqual(self.client.get(reverse('api_doctor_list'), {'cursor': cursor}).status_code, 200)
+
+    def test_admin_list_is_paginated_and_keeps_filters(self):
+        staff = User.objects.create_user('staff', 'staff@example.com', 'pass', is_staff=True)
+        self.client.force_login(staff)
+        resp = self.client.get(reverse('admin_appointments'), {'status': 'Pending', 'cursor': 'garbage'})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(len(resp.context['page']), 25)
+        self.assertContains(resp, 'status=Pending&amp;cursor=')
+
+
+class ExplainHotQueriesTests(TestCase):
+    def test_no_full_scans_on_hot_paths(self):
+        out = StringIO()
+        call_command('explain_hot_queries', '--fail-on-scan', stdout=out)
+        self.assertIn('0 full table scan(s)', out.getvalue())
+        self.assertFalse(User.objects.filter(username='probe-staff').exists())
+
+
+class StatCounterTests(TestCase):
+    def test_counters_follow_writes_and_reconcile(self):
+        doctor = Doctor.objects.create(name='Dr Count', experience=1, fees=10, available_days='Mon', time_slots='9:00 AM')
+        patient = Patient.objects.create(name='P', phone='1', email='p@example.com')
+        appt = Appointment.objects.create(patient=patient, doctor=doctor, date=date(2030, 1, 7), time=time(9, 0))
+        appt = Appointment.objects.get(pk=appt.pk)
+        appt.status = Appointment.STATUS_APPROVED
+        appt.save()
+        counters = stats.snapshot()
+        self.assertEqual(counters[stats.DOCTORS], 1)
+        self.assertEqual(counters[stats.APPOINTMENTS], 1)
+        self.assertEqual(counters['status:Pending'], 0)
+        self.assertEqual(counters['status:Approved'], 1)
+
+        doctor.delete()  # cascades to the appointment
+        counters = stats.snapshot()
+        self.assertEqual((counters[stats.DOCTORS], counters[stats.APPOINTMENTS], counters['status:Approved']), (0, 0, 0))
+
+        Patient.objects.filter(pk=patient.pk).update(name='Q')
+        StatCounter.objects.filter(name=stats.PATIENTS).update(value=42)
+        self.assertEqual(stats.reconcile(), {stats.PATIENTS: -41})
+        self.assertEqual(stats.snapshot()[stats.PATIENTS], 1)
+
+    def test_home_reads_counters_in_one_query(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(reverse('home'))
+        self.assertEqual(sum('COUNT(' in q['sql'] for q in ctx.captured_queries), 0)
+
+
+class CachedDoctorMixin:
+    def setUp(self):
+        self.spec = Specialization.objects.create(name='Neurology')
+        self.doctor = Doctor.objects.create(
+            name='Dr Cached', specialization=self.spec, experience=1, fees=10, available_days='Mon', time_slots='9:00 AM',
+        )
+
+    def doctor_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.get(url)
+        # Full doctor rows only; the conditional GET check reads just the timestamps.
+        return resp, sum('"core_doctor"."biography"' in q['sql'] for q in ctx.captured_queries)
+
+
+class DoctorPageCacheTests(CachedDoctorMixin, TestCase):
+    def test_list_is_served_from_cache_until_a_doctor_changes(self):
+        url = reverse('doctor_list')
+        self.assertEqual(self.doctor_queries(url)[1], 1)
+        resp, queries = self.doctor_queries(url)
+        self.assertEqual(queries, 0)
+        self.assertContains(resp, 'Dr Cached')
+        self.doctor.name = 'Dr Renamed'
+        self.doctor.save()
+        resp, queries = self.doctor_queries(url)
+        self.assertEqual(queries, 1)
+        self.assertContains(resp, 'Dr Renamed')
+
+    def test_detail_invalidated_by_specialization_delete(self):
+        url = reverse('doctor_detail', args=[self.doctor.pk])
+        self.assertContains(self.client.get(url), 'Neurology')
+        self.assertEqual(self.doctor_queries(url)[1], 0)
+        staff = User.objects.create_user('staff', 'staff@example.com', 'pass', is_staff=True)
+        self.client.force_login(staff)
+        self.client.post(reverse('admin_specialization_delete', args=[self.spec.pk]))
+        self.assertNotContains(self.client.get(url), 'Neurology')
+
+    def test_missing_doctor_is_404(self):
+        self.assertEqual(self.client.get(reverse('doctor_detail', args=[999])).status_code, 404)
+
+
+class AsyncReadViewTests(CachedDoctorMixin, TestCase):
+    def test_async_pages_match_sync_pages_and_share_the_cache(self):
+        for name, args in [('doctor_list', []), ('doctor_detail', [self.doctor.pk])]:
+            with self.subTest(name=name):
+                sync_url, async_url = reverse(name, args=args), reverse(f'{name}_async', args=args)
+                resp, queries = self.doctor_queries(async_url)
+                self.assertEqual(queries, 1)
+                self.assertContains(resp, 'Dr Cached')
+                self.assertEqual(self.doctor_queries(async_url)[1], 0)
+                self.assertEqual(self.doctor_queries(sync_url)[1], 0)
+
+    def test_non_numeric_specialization_is_ignored(self):
+        for name in ('doctor_list', 'doctor_list_async'):
+            for params in ({'specialization': 'abc'}, {'specialization': 'abc', 'q': 'cached'}):
+                with self.subTest(name=name, params=params):
+                    self.assertContains(self.client.get(reverse(name), params), 'Dr Cached')
+
+    def test_async_missing_doctor_is_404(self):
+        self.assertEqual(self.client.get(reverse('doctor_detail_async', args=[999])).status_code, 404)
+
+    def test_async_specialization_detail(self):
+        url = reverse('api_specialization_detail_async', args=[self.spec.pk])
+        self.assertEqual(self.client.get(url).status_code, 302)
+        staff = User.objects.create_user('staff', 'staff@example.com', 'pass', is_staff=True)
+        self.client.force_login(staff)
+        self.assertEqual(
+            self.client.get(url).json(), {'id': self.spec.pk, 'name': 'Neurology', 'doctor_count': 1}
+        )
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        self.spec = Specialization.objects.create(name='Dermatology')
+        self.doctor = Doctor.objects.create(
+            name='Dr Etag', specialization=self.spec, experience=3, fees=50, available_days='Mon,Wed', time_slots='9:00 AM',
+        )
+
+    def revalidate(self, url, response):
+        headers = {'HTTP_IF_NONE_MATCH': response['ETag']}
+        if response.has_header('Last-Modified'):
+            headers['HTTP_IF_MODIFIED_SINCE'] = response['Last-Modified']
+        return self.client.get(url, **headers)
+
+    def test_unchanged_resources_return_304_until_edited(self):
+        urls = [
+            reverse('doctor_list'),
+            reverse('doctor_detail', args=[self.doctor.pk]),
+            reverse('doctor_detail_async', args=[self.doctor.pk]),
+            reverse('api_doctor_list'),
+            reverse('api_doctor_detail', args=[self.doctor.pk]),
+        ]
+        first = {url: self.client.get(url) for url in urls}
+        for url, response in first.items():
+            with self.subTest(url=url):
+                self.assertEqual(response.status_code, 200)
+                self.assertIn('no-cache', response['Cache-Control'])
+                self.assertEqual(self.revalidate(url, response).status_code, 304)
+        self.assertTrue(first[reverse('api_doctor_detail', args=[self.doctor.pk])].has_header('Last-Modified'))
+        self.assertFalse(first[reverse('api_doctor_list')].has_header('Last-Modified'))
+
+        self.spec.name = 'Skin'
+        self.spec.save()
+        for url, response in first.items():
+            with self.subTest(url=url, after='edit'):
+                self.assertEqual(self.revalidate(url, response).status_code, 200)
+
+    def test_specialization_detail_etag_tracks_doctor_count(self):
+        staff = User.objects.create_user('staff', 'staff@example.com', 'pass', is_staff=True)
+        self.client.force_login(staff)
+        url = reverse('api_specialization_detail', args=[self.spec.pk])
+        response = self.client.get(url)
+        self.assertEqual(self.revalidate(url, response).status_code, 304)
+        self.doctor.delete()
+        self.assertEqual(self.revalidate(url, response).json()['doctor_count'], 0)
+
+    def test_doctor_api(self):
+        payload = self.client.get(reverse('api_doctor_list'), {'specialization': self.spec.pk}).json()
+        self.assertEqual([d['name'] for d in payload['results']], ['Dr Etag'])
+        self.assertIsNone(payload['next'])
+        detail = self.client.get(reverse('api_doctor_detail', args=[self.doctor.pk])).json()
+        self.assertEqual(detail['specialization'], {'id': self.spec.pk, 'name': 'Dermatology'})
+        self.assertEqual(detail['available_days'], ['Mon', 'Wed'])
+        self.assertEqual(self.client.get(reverse('api_doctor_detail', args=[999])).status_code, 404)
+        self.assertEqual(self.client.get(reverse('api_doctor_list'), {'specialization': 'x'}).status_code, 400)
+
+
+class DoctorSearchTests(TestCase):
+    def setUp(self):
+        self.cardio = Specialization.objects.create(name='Cardiology')
+        self.derm = Specialization.objects.create(name='Dermatology')
+        common = {'experience': 1, 'fees': 10, 'available_days': 'Mon', 'time_slots': '9:00 AM'}
+        self.khan = Doctor.objects.create(name='Dr Ayesha Khan', specialization=self.cardio, **common)
+        self.malik = Doctor.objects.create(
+            name='Dr Omar Malik', specialization=self.derm, biography='Treats Khan syndrome.', **common
+        )
+
+    def names(self, query, specialization_id=None):
+        doctors = Doctor.objects.select_related('specialization')
+        return [d.name for d in search.search_doctors(doctors, query, specialization_id)]
+
+    def test_prefix_match_ranks_names_above_biography(self):
+        self.assertEqual(self.names('kha'), ['Dr Ayesha Khan', 'Dr Omar Malik'])
+        self.assertEqual(self.names('cardio'), ['Dr Ayesha Khan'])
+        self.assertEqual(self.names('kha', self.derm.pk), ['Dr Omar Malik'])
+
+    def test_index_follows_edits_and_deletes(self):
+        self.cardio.name = 'Heart'
+        self.cardio.save()
+        self.assertEqual(self.names('heart'), ['Dr Ayesha Khan'])
+        self.malik.name = 'Dr Omar Qureshi'
+        self.malik.save()
+        self.assertEqual(self.names('qureshi'), ['Dr Omar Qureshi'])
+        self.khan.delete()
+        self.assertEqual(self.names('heart'), [])
+        staff = User.objects.create_user('staff', 'staff@example.com', 'pass', is_staff=True)
+        self.client.force_login(staff)
+        self.client.post(reverse('admin_specialization_delete', args=[self.derm.pk]))
+        self.assertEqual(self.names('dermatology'), [])
+
+    def test_queryset_updates_need_a_rebuild(self):
+        Doctor.objects.filter(pk=self.malik.pk).update(name='Dr Omar Qureshi')
+        self.assertEqual(self.names('qureshi'), [])
+        call_command('rebuild_doctor_search', stdout=StringIO())
+        self.assertEqual(self.names('qureshi'), ['Dr Omar Qureshi'])
+
+    def test_falls_back_to_icontains_without_fts(self):
+        # The table comes back with the rollback; the cached lookup must too.
+        self.addCleanup(search._available.clear)
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP TABLE {search.TABLE}')
+        self.assertIsNone(search.ranked_ids('khan'))
+        self.assertEqual(self.names('khan'), ['Dr Ayesha Khan', 'Dr Omar Malik'])
+        # Once the index is known to be missing, searches skip it entirely.
+        search.drop()
+        self.assertFalse(search.available())
+        with self.assertNumQueries(0):
+            self.assertIsNone(search.ranked_ids('khan'))
+
+    def test_doctor_list_search_box(self):
+        response = self.client.get(reverse('doctor_list'), {'q': 'malik'})
+        self.assertContains(response, 'Dr Omar Malik')
+        self.assertNotContains(response, 'Dr Ayesha Khan')
+        self.assertContains(self.client.get(reverse('doctor_list'), {'q': 'zzz'}), 'No doctors match')
+
+
+class OccupancyTests(TestCase):
+    def setUp(self):
+        self.patient = Patient.objects.create(name='P', phone='1', email='p@example.com')
+        common = {'experience': 1, 'fees': 10}
+        self.busy = Doctor.objects.create(
+            name='Dr Busy', available_days='Mon,Tue', time_slots='9:00 AM,10:00 AM', **common
+        )
+        self.idle = Doctor.objects.create(name='Dr Idle', available_days='Mon', time_slots='9:00 AM', **common)
+        # 2030-01-07 is a Monday.
+        for slot in (time(9, 0), time(10, 0)):
+            Appointment.objects.create(patient=self.patient, doctor=self.busy, date=date(2030, 1, 7), time=slot)
+
+    def test_booked_and_capacity_per_doctor_per_day(self):
+        with CaptureQueriesContext(connection) as ctx:
+            days, rows = occupancy(date(2030, 1, 7), date(2030, 1, 9))
+        self.assertEqual(len(ctx.captured_queries), 3)
+        self.assertEqual(len(days), 3)
+        self.assertEqual(rows[0], {'id': self.busy.pk, 'name': 'Dr Busy', 'booked': [2, 0, 0], 'capacity': [2, 2, 0]})
+        self.assertEqual(rows[1]['capacity'], [1, 0, 0])
+
+    def test_api_requires_staff_and_validates_range(self):
+        url = reverse('api_occupancy')
+        self.assertEqual(self.client.get(url).status_code, 302)
+        staff = User.objects.create_user('staff', 'staff@example.com', 'pass', is_staff=True)
+        self.client.force_login(staff)
+        payload = self.client.get(url, {'from': '2030-01-07', 'to': '2030-01-08'}).json()
+        self.assertEqual(payload['totals'], {'booked': [2, 0], 'capacity': [3, 2]})
+        self.assertEqual(self.client.get(url, {'from': '2030-01-01', 'to': '2030-06-01'}).status_code, 400)
+
+
+class RevenueRollupTests(TestCase):
+    def setUp(self):
+        spec = Specialization.objects.create(name='Cardiology')
+        common = {'experience': 1, 'available_days': 'Mon', 'time_slots': '9:00 AM,10:00 AM'}
+        self.doctor = Doctor.objects.create(name='Dr Fee', specialization=spec, fees=100, **common)
+        self.other = Doctor.objects.create(name='Dr Other', fees=250, **common)
+        patient = Patient.objects.create(name='P', phone='1', email='p@example.com')
+        self.jan = [
+            Appointment.objects.create(patient=patient, doctor=self.doctor, date=date(2030, 1, 7), time=time(9, 0)),
+            Appointment.objects.create(patient=patient, doctor=self.doctor, date=date(2030, 1, 14), time=time(9, 0)),
+        ]
+        self.feb = Appointment.objects.create(patient=patient, doctor=self.other, date=date(2030, 2, 4), time=time(9, 0))
+
+    def rollups(self):
+        return {
+            (r.doctor_id, r.month): (r.completed, r.revenue) for r in RevenueRollup.objects.all()
+        }
+
+    def test_incremental_updates_match_a_rebuild(self):
+        self.feb.status = Appointment.STATUS_COMPLETED
+        self.feb.save()
+        booking.bulk_set_status(Appointment.objects.filter(doctor=self.doctor), Appointment.STATUS_COMPLETED)
+        self.assertEqual(self.rollups(), {
+            (self.doctor.pk, date(2030, 1, 1)): (2, 200),
+            (self.other.pk, date(2030, 2, 1)): (1, 250),
+        })
+        booking.bulk_set_status(Appointment.objects.filter(pk=self.jan[0].pk), Appointment.STATUS_APPROVED)
+        Appointment.objects.get(pk=self.jan[1].pk).delete()
+        incremental = {key: value for key, value in self.rollups().items() if value != (0, 0)}
+        reporting.rebuild()
+        self.assertEqual(incremental, self.rollups())
+        self.assertEqual(self.rollups(), {(self.other.pk, date(2030, 2, 1)): (1, 250)})
+
+    def test_report_groups_and_endpoint(self):
+        booking.bulk_set_status(Appointment.objects.all(), Appointment.STATUS_COMPLETED)
+        self.assertEqual(
+            [(r['month'], r['revenue']) for r in reporting.report('month')],
+            [('2030-01', 200), ('2030-02', 250)],
+        )
+        self.assertEqual(
+            [(r['name'], r['completed']) for r in reporting.report('specialization')],
+            [(None, 1), ('Cardiology', 2)],
+        )
+        staff = User.objects.create_user('staff', 'staff@example.com', 'pass', is_staff=True)
+        self.client.force_login(staff)
+        with CaptureQueriesContext(connection) as ctx:
+            payload = self.client.get(reverse('api_revenue_report'), {'group': 'doctor', 'from': '2030-02'}).json()
+        self.assertFalse(any('core_appointment' in q['sql'] for q in ctx.captured_queries))
+        self.assertEqual(payload['rows'], [{'doctor_id': self.other.pk, 'name': 'Dr Other', 'completed': 1, 'revenue': 250}])
+        self.assertEqual(self.client.get(reverse('api_revenue_report'), {'group': 'year'}).status_code, 400)
+
+    def test_fee_changes_do_not_restate_booked_appointments(self):
+        booking.bulk_set_status(Appointment.objects.filter(pk=self.jan[0].pk), Appointment.STATUS_COMPLETED)
+        self.doctor.fees = 300
+        self.doctor.save()
+        later = Appointment.objects.create(
+            patient=self.jan[0].patient, doctor=self.doctor, date=date(2030, 1, 21), time=time(9, 0),
+            status=Appointment.STATUS_COMPLETED,
+        )
+        self.assertEqual(later.fee, 300)
+        self.assertEqual(self.rollups(), {(self.doctor.pk, date(2030, 1, 1)): (2, 400)})
+        booking.bulk_set_status(Appointment.objects.filter(pk=self.jan[0].pk), Appointment.STATUS_APPROVED)
+        self.assertEqual(self.rollups(), {(self.doctor.pk, date(2030, 1, 1)): (1, 300)})
+        reporting.rebuild()
+        self.assertEqual(self.rollups(), {(self.doctor.pk, date(2030, 1, 1)): (1, 300)})
+
+    def test_deleting_a_doctor_with_completed_visits(self):
+        booking.bulk_set_status(Appointment.objects.all(), Appointment.STATUS_COMPLETED)
+        self.doctor.delete()
+        self.assertEqual(set(self.rollups()), {(self.other.pk, date(2030, 2, 1))})
+
+    def test_bulk_completion_over_many_doctor_months(self):
+        common = {'experience': 1, 'fees': 10, 'available_days': 'Mon', 'time_slots': '9:00 AM'}
+        doctors = Doctor.objects.bulk_create([Doctor(name=f'Dr {i}', **common) for i in range(60)])
+        patient = Patient.objects.get()
+        Appointment.objects.bulk_create([
+            Appointment(patient=patient, doctor=doctor, date=date(2030 + month // 12, month % 12 + 1, 1), time=time(9, 0), fee=10)
+            for doctor in doctors
+            for month in range(24)
+        ])
+        queryset = Appointment.objects.filter(doctor__in=doctors)
+        self.assertEqual(booking.bulk_set_status(queryset, Appointment.STATUS_COMPLETED), 1440)
+        self.assertEqual(RevenueRollup.objects.filter(doctor__in=doctors).count(), 1440)
+        booking.bulk_set_status(queryset, Appointment.STATUS_APPROVED)
+        self.assertFalse(RevenueRollup.objects.filter(doctor__in=doctors).exclude(completed=0, revenue=0).exists())
+
+    def test_status_change_reads_the_fee_with_the_appointment(self):
+        staff = User.objects.create_user('staff', 'staff@example.com', 'pass', is_staff=True)
+        self.client.force_login(staff)
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.post(reverse('admin_appointments'), {'id': self.feb.pk, 'status': 'Completed'})
+        self.assertEqual(self.rollups(), {(self.other.pk, date(2030, 2, 1)): (1, 250)})
+        self.assertFalse([q for q in ctx.captured_queries if q['sql'].startswith('SELECT "core_doctor"')])
+
+
+class AppointmentArchiveTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('pat', 'pat@example.com', 'pass')
+        self.patient = Patient.objects.create(user=self.user, name='P', phone='1', email='pat@example.com')
+        self.doctor = Doctor.objects.create(name='Dr Old', experience=1, fees=100, available_days='Mon', time_slots='9:00 AM')
+        for day in range(1, 8):
+            Appointment.objects.create(
+                patient=self.patient, doctor=self.doctor, date=date(2020, 1, day), time=time(9, 0),
+                status=Appointment.STATUS_COMPLETED if day != 4 else Appointment.STATUS_PENDING,
+            )
+        Appointment.objects.create(
+            patient=self.patient, doctor=self.doctor, date=date(2030, 1, 7), time=time(9, 0),
+            status=Appointment.STATUS_COMPLETED,
+        )
+        self.expected = list(Appointment.objects.order_by('-date', '-time', '-id').values_list('id', flat=True))
+
+    def test_batches_move_rows_without_changing_totals(self):
+        counters = stats.snapshot()
+        rollups = set(RevenueRollup.objects.values_list('doctor_id', 'month', 'completed', 'revenue'))
+        self.assertEqual(list(archive.archive_completed(date(2021, 1, 1), batch_size=4)), [4, 2])
+        self.assertEqual(AppointmentArchive.objects.count(), 6)
+        self.assertEqual(
+            list(Appointment.objects.values_list('date', flat=True).order_by('date')),
+            [date(2020, 1, 4), date(2030, 1, 7)],
+        )
+        self.assertEqual(stats.snapshot(), counters)
+        self.assertEqual(stats.reconcile(), {})
+        reporting.rebuild()
+        self.assertEqual(set(RevenueRollup.objects.values_list('doctor_id', 'month', 'completed', 'revenue')), rollups)
+
+    def test_history_pages_into_the_archive(self):
+        call_command('archive_appointments', before='2021-01-01', batch_size=3, pause=0, stdout=StringIO())
+        querysets = [model.objects.filter(patient=self.patient) for model in (Appointment, AppointmentArchive)]
+        pages = [keyset_paginate_merged(querysets, APPOINTMENT_ORDERING, per_page=3)]
+        while pages[-1].has_next:
+            pages.append(keyset_paginate_merged(querysets, APPOINTMENT_ORDERING, pages[-1].next_cursor, per_page=3))
+        self.assertEqual([appt.id for page in pages for appt in page], self.expected)
+        back = keyset_paginate_merged(querysets, APPOINTMENT_ORDERING, pages[-1].prev_cursor, per_page=3)
+        self.assertEqual([appt.id for appt in back], [appt.id for appt in pages[-2]])
+
+        self.client.force_login(self.user)
+        resp = self.client.get(reverse('appointment_history'))
+        self.assertEqual([appt.id for appt in resp.context['page']], self.expected)
+
+
+def load_settings(**env):
+    """Run the settings module afresh with ``env`` set; returns its namespace."""
+    with mock.patch.dict(os.environ, env):
+        return runpy.run_path(import_module('clinic.settings').__file__)
+
+
+class SqliteProfileTests(TestCase):
+    def test_production_profile_settings(self):
+        self.assertNotIn('OPTIONS', load_settings(CLINIC_DB_PROFILE='development')['DATABASES']['default'])
+        database = load_settings(CLINIC_DB_PROFILE='production')['DATABASES']['default']
+        self.assertEqual(database['OPTIONS']['transaction_mode'], 'IMMEDIATE')
+        self.assertIn('PRAGMA journal_mode=WAL', database['OPTIONS']['init_command'])
+        self.assertEqual((database['CONN_MAX_AGE'], database['CONN_HEALTH_CHECKS']), (600, True))
+
+    def test_production_options_apply_to_a_connection(self):
+        options = load_settings(CLINIC_DB_PROFILE='production')['CLINIC_SQLITE_PRODUCTION_OPTIONS']
+        tmp = TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        path = str(Path(tmp.name) / 'profile.sqlite3')
+        connections['profile'] = DatabaseWrapper({**connection.settings_dict, 'NAME': path, 'OPTIONS': options}, 'profile')
+        profiled = connections['profile']
+        self.addCleanup(connections.__delitem__, 'profile')
+        self.addCleanup(profiled.close)
+        with profiled.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode')
+            self.assertEqual(cursor.fetchone()[0], 'wal')
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)  # NORMAL
+        other = sqlite3.connect(path, timeout=0, isolation_level=None)
+        self.addCleanup(other.close)
+        with transaction.atomic(using='profile'):
+            # IMMEDIATE takes the write lock at BEGIN, before any write.
+            with self.assertRaisesMessage(sqlite3.OperationalError, 'database is locked'):
+                other.execute('BEGIN IMMEDIATE')
+
+
+class SessionStorageTests(TestCase):
+    def test_unknown_mode_lists_the_allowed_ones(self):
+        with self.assertRaisesMessage(ImproperlyConfigured, "'redis' is not one of: db, cached_db, file, signed_cookies"):
+            load_settings(CLINIC_SESSION_STORAGE='redis')
+        self.assertEqual(
+            load_settings(CLINIC_SESSION_STORAGE='file')['SESSION_ENGINE'], 'django.contrib.sessions.backends.file'
+        )
+
+    def test_cleanup_deletes_expired_sessions_in_batches(self):
+        past = timezone.now() - timedelta(days=1)
+        Session.objects.bulk_create(
+            Session(session_key=f'expired{i:02d}', session_data='', expire_date=past) for i in range(5)
+        )
+        Session.objects.create(session_key='live', session_data='', expire_date=timezone.now() + timedelta(days=1))
+        out = StringIO()
+        call_command('cleanup_sessions', batch_size=2, stdout=out)
+        self.assertIn('Deleted 5 expired session(s).', out.getvalue())
+        self.assertEqual(list(Session.objects.values_list('session_key', flat=True)), ['live'])
+
+    @override_settings(
+        SESSION_ENGINE='django.contrib.sessions.backends.signed_cookies',
+        MESSAGE_STORAGE='django.contrib.messages.storage.cookie.CookieStorage',
+    )
+    def test_cookie_mode_login_and_messages_skip_the_session_table(self):
+        User.objects.create_user('pat', 'pat@example.com', 'pass-word-123')
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.post(reverse('login'), {'username': 'pat', 'password': 'pass-word-123'})
+        self.assertEqual(resp.status_code, 302)
+        self.assertFalse(any('django_session' in q['sql'] for q in ctx.captured_queries))
+        self.assertIsNone(session_storage.clear_expired())
+
+
+class NotificationTests(TestCase):
+    def setUp(self):
+        self.doctor = Doctor.objects.create(name='Dr Mail', experience=1, fees=10, available_days='Mon', time_slots='9:00 AM,10:00 AM')
+        self.user = User.objects.create_user('alice', 'alice@example.com', 'pass')
+        self.patient = Patient.objects.create(user=self.user, name='Alice', phone='555', email='alice@example.com')
+
+    def test_booking_queues_in_its_transaction_and_worker_sends(self):
+        self.client.force_login(self.user)
+        payload = {
+            'name': 'Alice', 'phone': '555', 'email': 'alice@example.com',
+            'doctor': self.doctor.id, 'date': '2030-01-07', 'time': '9:00 AM',
+        }
+        self.client.post(reverse('book_appointment'), payload)
+        self.client.post(reverse('book_appointment'), payload)  # slot taken, rolled back
+        self.assertEqual(Notification.objects.count(), 1)
+        self.assertEqual(len(mail.outbox), 0)
+
+        out = StringIO()
+        call_command('send_notifications', stdout=out)
+        self.assertIn('Sent 1 notification(s)', out.getvalue())
+        self.assertEqual(mail.outbox[0].to, ['alice@example.com'])
+        self.assertIn('Dr Mail', mail.outbox[0].body)
+        self.assertEqual(Notification.objects.get().status, Notification.STATUS_SENT)
+
+    @override_settings(CLINIC_NOTIFICATION_CHANNELS=('email', 'sms'), CLINIC_NOTIFICATION_MAX_ATTEMPTS=2)
+    def test_bulk_status_change_and_retries(self):
+        for slot in (time(9, 0), time(10, 0)):
+            Appointment.objects.create(patient=self.patient, doctor=self.doctor, date=date(2030, 1, 7), time=slot)
+        Notification.objects.all().delete()
+        booking.bulk_set_status(Appointment.objects.all(), Appointment.STATUS_APPROVED)
+        self.assertEqual(
+            sorted(Notification.objects.values_list('channel', 'subject')),
+            [('email', 'Appointment confirmed')] * 2 + [('sms', 'Appointment confirmed')] * 2,
+        )
+        # No SMS sender is configured, so those fail until attempts run out.
+        self.assertEqual(notifications.send_batch(), {'sent': 2, 'retried': 2, 'failed': 0})
+        self.assertEqual(notifications.send_batch(), {'sent': 0, 'retried': 0, 'failed': 0})
+        Notification.objects.filter(status=Notification.STATUS_PENDING).update(next_attempt_at=timezone.now())
+        self.assertEqual(notifications.send_batch(), {'sent': 0, 'retried': 0, 'failed': 2})
+        failed = Notification.objects.filter(status=Notification.STATUS_FAILED)
+        self.assertEqual(set(failed.values_list('attempts', flat=True)), {2})
+        self.assertIn('CLINIC_SMS_SENDER', failed.first().last_error)
+        self.assertEqual(len(mail.outbox), 2)
+
+
+class ReminderTests(TestCase):
+    def setUp(self):
+        doctor = Doctor.objects.create(name='Dr Remind', experience=1, fees=10, available_days='Mon', time_slots='9:00 AM')
+        for i in range(5):
+            patient = Patient.objects.create(name=f'P{i}', phone=f'55{i}', email=f'p{i}@example.com')
+            Appointment.objects.create(
+                patient=patient, doctor=doctor, date=date(2030, 1, 7), time=time(9 + i, 0),
+                status=Appointment.STATUS_APPROVED if i < 4 else Appointment.STATUS_PENDING,
+            )
+
+    def test_reminders_are_sent_once(self):
+        out = StringIO()
+        call_command('send_reminders', date='2030-01-07', chunk_size=3, threads=2, stdout=out)
+        self.assertIn('4 sent, 0 failed out of 4 in 2 chunk(s)', out.getvalue())
+        self.assertEqual(sorted(m.to[0] for m in mail.outbox), [f'p{i}@example.com' for i in range(4)])
+        self.assertIn('Dr Remind on Mon 07 Jan 2030 at 9:00 AM.', mail.outbox[0].body)
+        self.assertNotIn('tomorrow', mail.outbox[0].body)
+        self.assertEqual(ReminderSent.objects.count(), 4)
+        self.assertEqual(reminders.send_reminders(date(2030, 1, 7)).appointments, 0)
+        self.assertEqual(len(mail.outbox), 4)
+
+    @override_settings(CLINIC_NOTIFICATION_CHANNELS=('sms',))
+    def test_failed_reminders_stay_due(self):
+        result = reminders.send_reminders(date(2030, 1, 7), threads=2)
+        self.assertEqual((result.sent, result.failed), (0, 4))
+        self.assertIn('CLINIC_SMS_SENDER', result.errors[0])
+        self.assertEqual(reminders.due(date(2030, 1, 7)).count(), 4)
+
+
+class DoctorChoiceTests(TestCase):
+    def setUp(self):
+        self.spec = Specialization.objects.create(name='Cardiology')
+        self.doctor = Doctor.objects.create(
+            name='Dr Choice', specialization=self.spec, experience=1, fees=10, available_days='Mon', time_slots='9:00 AM',
+        )
+        self.user = User.objects.create_user('alice', 'alice@example.com', 'pass')
+        self.client.force_login(self.user)
+
+    def doctor_queries(self, *args):
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.get(*args)
+        return resp, [q['sql'] for q in ctx.captured_queries if 'core_doctor' in q['sql']]
+
+    def test_booking_page_reuses_cached_choices_until_a_change(self):
+        resp, queries = self.doctor_queries(reverse('book_appointment'))
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('"core_doctor"."biography"', queries[0])
+        self.assertContains(resp, 'Dr Choice (Cardiology)')
+        resp, queries = self.doctor_queries(reverse('book_appointment'))
+        self.assertEqual(queries, [])
+        self.spec.name = 'Cardiac Surgery'
+        self.spec.save()
+        self.assertContains(self.client.get(reverse('book_appointment')), 'Dr Choice (Cardiac Surgery)')
+
+    def test_filter_form_validates_against_cached_choices(self):
+        caching.doctor_choices()
+        with CaptureQueriesContext(connection) as ctx:
+            form = AppointmentFilterForm({'doctor': str(self.doctor.pk)})
+            self.assertTrue(form.is_valid())
+        self.assertEqual(form.cleaned_data['doctor'], self.doctor)
+        self.assertFalse(any('core_doctor' in q['sql'] for q in ctx.captured_queries))
+        self.assertIn('doctor', AppointmentFilterForm({'doctor': '999999'}).errors)
+        self.assertIn('Dr Choice</option>', str(AppointmentFilterForm()['doctor']))
+
+
+class CompiledScheduleTests(TestCase):
+    def setUp(self):
+        self.doctor = Doctor.objects.create(
+            name='Dr Week', experience=1, fees=10, available_days='monday, Wed', time_slots='9:00 AM, 14:30',
+        )
+
+    def form(self, day, slot):
+        return AppointmentForm({
+            'name': 'A', 'phone': '1', 'email': 'a@example.com',
+            'doctor': self.doctor.pk, 'date': day, 'time': slot,
+        })
+
+    def test_booking_form_checks_day_and_slot(self):
+        self.assertTrue(self.form('2030-01-09', '2:30 PM').is_valid())
+        self.assertIn('does not see patients on Tue', self.form('2030-01-08', '9:00 AM').errors['date'][0])
+        self.assertIn('Available times: 9:00 AM, 2:30 PM', self.form('2030-01-07', '10:00 AM').errors['time'][0])
+
+    def test_schedule_is_memoized_per_update(self):
+        first = Doctor.objects.get(pk=self.doctor.pk).schedule
+        self.assertIs(Doctor.objects.get(pk=self.doctor.pk).schedule, first)
+        self.assertEqual(first.weekdays, frozenset({0, 2}))
+        self.assertEqual(self.doctor.day_list, ['Mon', 'Wed'])
+        self.doctor.time_slots = '9:00 AM'
+        self.doctor.save()
+        fresh = Doctor.objects.get(pk=self.doctor.pk).schedule
+        self.assertIsNot(fresh, first)
+        self.assertEqual(fresh.slots, (time(9, 0),))
+
+
+class RecurringBookingTests(TestCase):
+    def setUp(self):
+        self.doctor = Doctor.objects.create(
+            name='Dr Series', experience=1, fees=10, available_days='Tue', time_slots='10:00 AM,11:00 AM',
+        )
+        self.user = User.objects.create_user('alice', 'alice@example.com', 'pass')
+        self.patient = Patient.objects.create(user=self.user, name='Alice', phone='1', email='alice@example.com')
+        other = Patient.objects.create(name='Bob', phone='2', email='bob@example.com')
+        Appointment.objects.create(patient=other, doctor=self.doctor, date=date(2030, 1, 15), time=time(10, 0))
+        self.client.force_login(self.user)
+
+    def post(self, **data):
+        return self.client.post(
+            reverse('api_recurring_booking'),
+            json.dumps({'doctor': self.doctor.pk, **data}),
+            content_type='application/json',
+        )
+
+    def test_series_is_all_or_nothing_unless_partial(self):
+        series = {'start': '2030-01-08', 'time': '10:00 AM', 'count': 4}
+        resp = self.post(**series)
+        self.assertEqual(resp.status_code, 409)
+        self.assertEqual(resp.json(), {
+            'created': [], 'conflicts': [{'date': '2030-01-15', 'time': '10:00', 'reason': 'booked'}],
+        })
+        self.assertEqual(Appointment.objects.filter(patient=self.patient).count(), 0)
+
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.post(allow_partial=True, **series)
+        self.assertEqual(resp.status_code, 201)
+        self.assertEqual(
+            [row['date'] for row in resp.json()['created']], ['2030-01-08', '2030-01-22', '2030-01-29'],
+        )
+        appointment_queries = [q['sql'] for q in ctx.captured_queries if 'core_appointment' in q['sql']]
+        self.assertEqual([sql.split()[0] for sql in appointment_queries], ['SELECT', 'INSERT'])
+        self.assertEqual(stats.reconcile(), {})
+        self.assertEqual(Notification.objects.filter(subject='Appointment requests received').count(), 1)
+
+    def test_occurrence_list_reports_off_schedule_slots(self):
+        resp = self.post(
+            allow_partial=True,
+            occurrences=[
+                {'date': '2030-01-08', 'time': '11:00 AM'},
+                {'date': '2030-01-09', 'time': '11:00 AM'},
+                {'date': '2030-01-08', 'time': '3:00 PM'},
+            ],
+        )
+        self.assertEqual(resp.status_code, 201)
+        self.assertEqual(len(resp.json()['created']), 1)
+        self.assertEqual([c['reason'] for c in resp.json()['conflicts']], ['off_schedule', 'off_schedule'])
+        self.assertEqual(self.post(start='2020-01-07', time='10:00 AM', count=2).status_code, 400)
+        self.assertEqual(self.post(occurrences='soon').status_code, 400)
+        self.assertEqual(self.post(start='2030-01-08', time='10:00 AM', count=27).status_code, 400)
+
+
+class BulkStatusTests(TestCase):
+    def setUp(self):
+        self.staff = User.objects.create_user('staff', 'staff@example.com', 'pass', is_staff=True)
+        self.client.force_login(self.staff)
+        self.doctor = Doctor.objects.create(name='Dr Bulk', experience=1, fees=10, available_days='Mon', time_slots='9:00 AM')
+        other = Doctor.objects.create(name='Dr Other', experience=1, fees=10, available_days='Mon', time_slots='9:00 AM')
+        patient = Patient.objects.create(name='P', phone='1', email='p@example.com')
+        self.appts = [
+            Appointment.objects.create(patient=patient, doctor=doctor, date=date(2030, 1, day), time=time(9, 0))
+            for doctor in (self.doctor, other) for day in (7, 14, 21)
+        ]
+        self.url = reverse('admin_appointments')
+
+    def test_bulk_approve_selected(self):
+        ids = [self.appts[0].id, self.appts[3].id]
+        resp = self.client.post(self.url + '?status=Pending', {'action': 'bulk', 'status': 'Approved', 'scope': 'selected', 'ids': ids})
+        self.assertRedirects(resp, self.url + '?status=Pending')
+        self.assertEqual(set(Appointment.objects.filter(status='Approved').values_list('id', flat=True)), set(ids))
+        self.assertEqual(stats.reconcile(), {})
+
+    def test_bulk_complete_filtered_json(self):
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.post(
+                self.url + f'?doctor={self.doctor.id}',
+                data=json.dumps({'status': 'Completed', 'scope': 'filtered'}),
+                content_type='application/json',
+            )
+        self.assertEqual(resp.json(), {'updated': 3, 'status': 'Completed'})
+        updates = [q['sql'] for q in ctx.captured_queries if q['sql'].startswith('UPDATE "core_appointment"')]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(Appointment.objects.filter(doctor=self.doctor, status='Completed').count(), 3)
+        self.assertEqual(stats.snapshot()['status:Completed'], 3)
+        self.assertEqual(stats.reconcile(), {})
+
+    def test_filtered_scope_with_invalid_filters_updates_nothing(self):
+        for query in ('?doctor=99999', '?date_from=garbage'):
+            resp = self.client.post(
+                self.url + query, data=json.dumps({'status': 'Completed', 'scope': 'filtered'}),
+                content_type='application/json',
+            )
+            self.assertEqual(resp.status_code, 400)
+            self.assertIn('errors', resp.json())
+            resp = self.client.post(self.url + query, {'action': 'bulk', 'status': 'Completed', 'scope': 'filtered'})
+            self.assertRedirects(resp, self.url + query, fetch_redirect_response=False)
+        self.assertFalse(Appointment.objects.filter(status='Completed').exists())
+
+    def test_selected_scope_requires_ids(self):
+        resp = self.client.post(self.url, data=json.dumps({'status': 'Approved'}), content_type='application/json')
+        self.assertEqual(resp.status_code, 400)
+
+    def test_non_object_json_rejected(self):
+        for body in ('[]', '"x"', '3'):
+            resp = self.client.post(self.url, data=body, content_type='application/json')
+            self.assertEqual(resp.status_code, 400)
+
+
+class AppointmentExportTests(TestCase):
+    def setUp(self):
+        spec = Specialization.objects.create(name='Dermatology')
+        self.doctor = Doctor.objects.create(
+            name='Dr Export', specialization=spec, experience=1, fees=10, available_days='Mon', time_slots='9:00 AM',
+        )
+        patient = Patient.objects.create(name='Pat, Jr', phone='1', email='p@example.com')
+        for day in (7, 14, 21):
+            Appointment.objects.create(patient=patient, doctor=self.doctor, date=date(2030, 1, day), time=time(9, 0))
+        self.staff = User.objects.create_user('staff', 'staff@example.com', 'pass', is_staff=True)
+
+    def test_streaming_csv_with_date_filter(self):
+        self.client.force_login(self.staff)
+        resp = self.client.get(reverse('admin_appointments_export'), {'date_from': '2030-01-10', 'doctor': self.doctor.id})
+        self.assertEqual(resp.status_code, 200)
+        self.assertTrue(resp.streaming)
+        lines = b''.join(resp.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertTrue(lines[0].startswith('id,date,time,status,patient'))
+        self.assertIn('"Pat, Jr"', lines[1])
+        self.assertIn('Dermatology', lines[1])
+
+    def test_command_writes_ndjson(self):
+        out = StringIO()
+        call_command('export_appointments', '--format', 'ndjson', '--status', 'Pending', stdout=out)
+        rows = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[0]['doctor'], 'Dr Export')
+        self.assertEqual(rows[0]['time'], '09:00:00')
+
+
+class BulkImportTests(TestCase):
+    def setUp(self):
+        self.tmp = TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def write(self, name, text):
+        path = Path(self.tmp.name) / name
+        path.write_text(text)
+        return str(path)
+
+    def test_import_doctors_patients_and_appointments(self):
+        Specialization.objects.create(name='Cardiology')
+        doctors = self.write('doctors.csv', (
+            'name,specialization,experience,fees,available_days,time_slots\n'
+            'Dr A,Cardiology,5,100,"Mon,Tue","9:00 AM,10:00 AM"\n'
+            'Dr B,Oncology,7,150,Wed,11:00 AM\n'
+            'Dr C,Cardiology,lots,100,Mon,9:00 AM\n'
+        ))
+        call_command('import_clinic_data', 'doctors', doctors, stdout=StringIO(), stderr=StringIO())
+        self.assertEqual(Doctor.objects.count(), 2)
+        self.assertTrue(Specialization.objects.filter(name='Oncology').exists())
+        self.assertEqual(ScheduleSlot.objects.filter(doctor__name='Dr A').count(), 4)
+
+        patients = self.write('patients.json', json.dumps([
+            {'name': 'P1', 'phone': '1', 'email': 'p1@example.com'},
+            {'name': 'P1 again', 'phone': '1', 'email': 'P1@example.com'},
+        ]))
+        call_command('import_clinic_data', 'patients', patients, stdout=StringIO(), stderr=StringIO())
+        self.assertEqual(Patient.objects.count(), 1)
+
+        dr_a = Doctor.objects.get(name='Dr A')
+        rows = [
+            {'patient_email': 'p1@example.com', 'doctor_id': dr_a.id, 'date': '2030-01-07', 'time': '9:00 AM'},
+            {'patient_email': 'p1@example.com', 'doctor_id': dr_a.id, 'date': '2030-01-07', 'time': '09:00'},
+            {'patient_email': 'nobody@example.com', 'doctor_id': dr_a.id, 'date': '2030-01-07', 'time': '10:00 AM'},
+            {'patient_email': 'p1@example.com', 'doctor_id': dr_a.id, 'date': '2030-01-08', 'time': '9:00 AM', 'status': 'Completed'},
+        ]
+        appts = self.write('appointments.ndjson', '\n'.join(json.dumps(r) for r in rows))
+        rejects = str(Path(self.tmp.name) / 'rejects.csv')
+        call_command(
+            'import_clinic_data', 'appointments', appts, '--batch-size', '2', '--rejects', rejects,
+            stdout=StringIO(), stderr=StringIO(),
+        )
+        self.assertEqual(Appointment.objects.count(), 2)
+        self.assertEqual(len(Path(rejects).read_text().splitlines()), 3)
+        self.assertEqual(stats.reconcile(), {})
+
+    def test_emails_match_regardless_of_case(self):
+        alice = Patient.objects.create(name='Alice', phone='1', email='Alice@X.com')
+        doctor = Doctor.objects.create(name='Dr A', experience=1, fees=10, available_days='Mon', time_slots='9:00 AM')
+        result = importers.PatientImporter().run([{'name': 'Alice', 'phone': '1', 'email': 'alice@x.com'}])
+        self.assertEqual((result.created, len(result.rejected)), (0, 1))
+        result = importers.AppointmentImporter().run([
+            {'patient_email': 'ALICE@x.com', 'doctor_id': doctor.id, 'date': '2030-01-07', 'time': '9:00 AM'},
+        ])
+        self.assertEqual(result.created, 1)
+        self.assertEqual(Appointment.objects.get().patient, alice)
+
+    def test_malformed_emails_and_json_lines_are_rejected(self):
+        patients = self.write('patients.ndjson', '\n'.join([
+            json.dumps({'name': 'Ok', 'phone': '1', 'email': 'ok@example.com'}),
+            json.dumps({'name': 'Bad', 'phone': '1', 'email': 'not-an-email'}),
+            '{"name": "Broken",',
+            json.dumps({'name': 'Last', 'phone': '1', 'email': 'last@example.com'}),
+        ]))
+        out, err = StringIO(), StringIO()
+        call_command('import_clinic_data', 'patients', patients, stdout=out, stderr=err)
+        self.assertIn('Imported 2 patients, rejected 2', out.getvalue())
+        self.assertIn("row 2: 'email' is not a valid email address", err.getvalue())
+        self.assertIn('row 3: not valid JSON', err.getvalue())
+        self.assertEqual(set(Patient.objects.values_list('email', flat=True)), {'ok@example.com', 'last@example.com'})
+
+    def test_bad_rows_and_failed_batches_are_rejected(self):
+        Patient.objects.create(name='Taken', phone='1', email='taken@example.com')
+        rows = [
+            ['not', 'an', 'object'],
+            {'name': 'New', 'phone': '1', 'email': 'new@example.com'},
+            {'name': 'Taken', 'phone': '1', 'email': 'taken@example.com'},
+            {'name': 'Later', 'phone': '1', 'email': 'later@example.com'},
+        ]
+        # A lookup that misses a patient inserted concurrently.
+        with mock.patch.object(importers, '_patient_ids', return_value={}):
+            result = importers.PatientImporter(batch_size=3).run(rows)
+        self.assertEqual(result.created, 1)
+        self.assertEqual([number for number, _, _ in result.rejected], [1, 2, 3])
+        self.assertIn('batch rolled back', result.rejected[1][1])
+        self.assertEqual(set(Patient.objects.values_list('email', flat=True)), {'taken@example.com', 'later@example.com'})
+        self.assertEqual(stats.reconcile(), {})
+
+
+class SeedClinicTests(TestCase):
+    def test_seed_creates_consistent_data(self):
+        call_command(
+            'seed_clinic', '--specializations', '3', '--doctors', '4', '--patients', '20',
+            '--appointments', '100', '--seed', '7', stdout=StringIO(),
+        )
+        self.assertEqual(Doctor.objects.count(), 4)
+        self.assertEqual(Patient.objects.count(), 20)
+        self.assertEqual(Appointment.objects.count(), 100)
+        self.assertTrue(ScheduleSlot.objects.exists())
+        self.assertFalse(Appointment.objects.filter(date__gte=date.today(), status='Completed').exists())
+        self.assertEqual(stats.reconcile(), {})
+
+
+@override_settings(CLINIC_PAGE_CACHE_SECONDS=0)
+class QueryBudgetTests(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        self.sample = probes.create_sample_data()
+        self.client.login(username='probe-staff', password='probe-pass')
+
+    def test_views_stay_within_query_budget(self):
+        for name, path in probes.iter_probe_paths(self.sample):
+            if resolve(path.split('?')[0]).func.__module__ not in ('core.views', 'core.async_views'):
+                continue
+            with self.subTest(name=name, path=path):
+                self.assertWithinQueryBudget(path)
+
+    def test_form_posts_stay_within_query_budget(self):
+        for name, path, post_kwargs in probes.iter_post_probes(self.sample):
+            with self.subTest(name=name, path=path):
+                response = self.assertWithinQueryBudget(path, method='post', **post_kwargs)
+                # A re-rendered form would only measure the rejection path.
+                self.assertIn(response.status_code, (200, 302))
+                if 'content_type' not in post_kwargs:
+                    self.assertEqual(response.status_code, 302)
+        self.assertTrue(Patient.objects.filter(email='probe-signup@example.com').exists())
+
+    @override_settings(CLINIC_SLOT_HOLD_SECONDS=300)
+    def test_booking_posts_stay_within_query_budget(self):
+        # Holds on and no page cache: the most each write path can cost.
+        doctor = self.sample['doctor']
+        monday = date.today() + timedelta(days=7 - date.today().weekday())
+        booking_form = {
+            'name': 'Probe Patient', 'phone': '000', 'email': 'probe-staff@example.com',
+            'doctor': doctor.pk, 'date': monday.isoformat(), 'time': '10:00 AM',
+        }
+        response = self.assertWithinQueryBudget(reverse('book_appointment'), method='post', data=booking_form)
+        self.assertEqual(response.status_code, 302)
+        series = {'doctor': doctor.pk, 'start': monday.isoformat(), 'time': '11:00 AM', 'count': 4}
+        response = self.assertWithinQueryBudget(
+            reverse('api_recurring_booking'), method='post', data=json.dumps(series), content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 201)
+        hold = {'doctor': doctor.pk, 'date': (monday + timedelta(days=1)).isoformat(), 'time': '09:00'}
+        response = self.assertWithinQueryBudget(reverse('api_slot_hold'), method='post', data=hold)
+        self.assertEqual(response.status_code, 201)
+
+    @override_settings(CLINIC_SQL_PROFILE=True)
+    def test_profile_middleware_reports_queries(self):
+        profiling.history.clear()
+        response = self.client.get(reverse('doctor_list'))
+        self.assertRegex(response['X-SQL-Profile'], r'^count=\d+; time_ms=[\d.]+; duplicates=0$')
+        self.assertEqual(profiling.recent_profiles()[-1]['path'], reverse('doctor_list'))
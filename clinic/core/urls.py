@@ -2,7 +2,7 @@ from django.urls import path
 from django.contrib.auth import views as auth_views
 
 
-from . import views
+from . import async_views, views
 
 urlpatterns = [
     path("", views.home, name="home"),
@@ -51,11 +51,43 @@ urlpatterns = [
         views.admin_specialization_detail,
         name="api_specialization_detail",
     ),
+    path("api/doctors/", views.api_doctor_list, name="api_doctor_list"),
+    path("api/doctors/<int:pk>/", views.api_doctor_detail, name="api_doctor_detail"),
+    path(
+        "api/doctors/<int:pk>/availability/",
+        views.api_doctor_availability,
+        name="api_doctor_availability",
+    ),
+    path("api/holds/", views.api_slot_hold, name="api_slot_hold"),
+    path(
+        "api/bookings/recurring/",
+        views.api_recurring_booking,
+        name="api_recurring_booking",
+    ),
+    path("api/occupancy/", views.api_occupancy, name="api_occupancy"),
+    path("api/reports/revenue/", views.api_revenue_report, name="api_revenue_report"),
+    # Async variants of the public read path, for ASGI deployments
+    path("async/doctors/", async_views.doctor_list, name="doctor_list_async"),
+    path(
+        "async/doctors/<int:pk>/",
+        async_views.doctor_detail,
+        name="doctor_detail_async",
+    ),
+    path(
+        "async/api/specializations/<int:pk>/",
+        async_views.admin_specialization_detail,
+        name="api_specialization_detail_async",
+    ),
     path(
         "panel/appointments/",
         views.admin_appointments,
         name="admin_appointments",
     ),
+    path(
+        "panel/appointments/export/",
+        views.admin_appointments_export,
+        name="admin_appointments_export",
+    ),
 ]
 
 
@@ -1,43 +1,78 @@
+import json
+from datetime import date, timedelta
+
 from django.contrib import messages
 from django.contrib.auth.decorators import user_passes_test
-from django.db.models import Count
-from django.http import JsonResponse, HttpResponseBadRequest
+from django.db import transaction
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.http import JsonResponse, HttpResponseBadRequest, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse
-
+from django.utils import timezone
+from django.utils.functional import SimpleLazyObject
+
+from . import booking, caching, exports, reporting, search, stats
+from .conditional import (
+    conditional,
+    doctor_api_detail_validators,
+    doctor_api_list_validators,
+    doctor_detail_validators,
+    doctor_list_validators,
+    specialization_validators,
+)
+from .availability import MAX_RANGE_DAYS, free_slots
 from .forms import (
+    AppointmentBulkStatusForm,
     AppointmentFilterForm,
     AppointmentForm,
     AppointmentStatusForm,
     DoctorForm,
     SpecializationForm,
     PatientSignupForm,
+    RecurringBookingForm,
+    SlotHoldForm,
+)
+from .models import Appointment, AppointmentArchive, Doctor, Patient, Specialization
+from .occupancy import MAX_RANGE_DAYS as OCCUPANCY_MAX_DAYS, occupancy
+from .profiling import query_budget
+from .pagination import (
+    APPOINTMENT_ORDERING,
+    DOCTOR_ORDERING,
+    KeysetPage,
+    keyset_paginate,
+    keyset_paginate_merged,
 )
-from .models import Appointment, Doctor, Patient, Specialization
+from .schedule import WEEKDAY_NAMES, format_slot_time
 from django.contrib.auth import login
 from django.contrib.auth.decorators import login_required
 
 
+@query_budget(5)
 def home(request):
-    stats = {
-        "doctor_count": Doctor.objects.count(),
-        "patient_count": Patient.objects.count(),
-        "appointment_count": Appointment.objects.count(),
-        "pending_count": Appointment.objects.filter(
-            status=Appointment.STATUS_PENDING
-        ).count(),
+    counters = stats.snapshot()
+    home_stats = {
+        "doctor_count": counters[stats.DOCTORS],
+        "patient_count": counters[stats.PATIENTS],
+        "appointment_count": counters[stats.APPOINTMENTS],
+        "pending_count": counters[stats.status_key(Appointment.STATUS_PENDING)],
     }
     featured_doctors = Doctor.objects.select_related("specialization")[:6]
     return render(
         request,
         "home.html",
         {
-            "stats": stats,
+            "stats": home_stats,
             "featured_doctors": featured_doctors,
+            "cache_seconds": caching.page_cache_seconds(),
+            "cache_version": caching.get_versions(caching.DOCTORS)[caching.DOCTORS],
         },
     )
 
 
+# A POST creates the user and patient, bumps a counter, then logging in
+# replaces the session.
+@query_budget(2, post=13)
 def signup(request):
     form = PatientSignupForm(request.POST or None)
     if request.method == "POST" and form.is_valid():
@@ -49,28 +84,160 @@ def signup(request):
 
 
 
+@query_budget(6)
+@conditional(doctor_list_validators, private=True)
 def doctor_list(request):
     specialization_id = request.GET.get("specialization")
+    if specialization_id and not specialization_id.isdigit():
+        # A page ignores a filter that is not an id; api_doctor_list rejects it.
+        specialization_id = None
+    query = request.GET.get("q", "").strip()
     doctors = Doctor.objects.select_related("specialization")
     specializations = Specialization.objects.all()
-    if specialization_id:
-        doctors = doctors.filter(specialization_id=specialization_id)
+    cursor = request.GET.get("cursor")
+    # Lazy so a cached fragment never runs the query.
+    if search.terms(query):
+        # Ranked results are a single page; relevance has no stable cursor.
+        page = SimpleLazyObject(
+            lambda: KeysetPage(search.search_doctors(doctors, query, specialization_id))
+        )
+    else:
+        if specialization_id:
+            doctors = doctors.filter(specialization_id=specialization_id)
+        page = SimpleLazyObject(
+            lambda: keyset_paginate(doctors, DOCTOR_ORDERING, cursor, per_page=24)
+        )
     return render(
         request,
         "doctors.html",
-        {"doctors": doctors, "specializations": specializations},
+        {
+            "doctors": page,
+            "page": page,
+            "specializations": specializations,
+            "specialization_id": specialization_id or "",
+            "q": query,
+            "cursor": cursor or "",
+            "cache_seconds": caching.page_cache_seconds(),
+            "cache_version": caching.get_versions(caching.DOCTORS, request=request)[caching.DOCTORS],
+        },
     )
 
 
+@query_budget(5)
+@conditional(doctor_detail_validators, private=True)
 def doctor_detail(request, pk):
+    key = caching.doctor_key(pk)
+    # Resolved (or 404'd) only when the cached fragments miss.
+    doctor = SimpleLazyObject(
+        lambda: get_object_or_404(Doctor.objects.select_related("specialization"), pk=pk)
+    )
+    return render(
+        request,
+        "doctor_detail.html",
+        {
+            "doctor": doctor,
+            "doctor_pk": pk,
+            "cache_seconds": caching.page_cache_seconds(),
+            "cache_version": caching.get_versions(key)[key],
+        },
+    )
+
+
+def _date_range(request, default_days, max_days):
+    """
+    The ``?from=&to=`` dates, ``from`` defaulting to today and ``to`` to
+    ``default_days`` later. Raises ValueError with a message for the client.
+    """
+    try:
+        start = date.fromisoformat(request.GET.get("from") or timezone.localdate().isoformat())
+        end = date.fromisoformat(
+            request.GET.get("to") or (start + timedelta(days=default_days)).isoformat()
+        )
+    except ValueError:
+        raise ValueError("Dates must be in YYYY-MM-DD format.")
+    if end < start:
+        raise ValueError("'to' must not be before 'from'.")
+    if (end - start).days >= max_days:
+        raise ValueError(f"Range is limited to {max_days} days.")
+    return start, end
+
+
+@query_budget(3)
+def api_doctor_availability(request, pk):
     doctor = get_object_or_404(Doctor, pk=pk)
-    return render(request, "doctor_detail.html", {"doctor": doctor})
+    try:
+        start, end = _date_range(request, 6, MAX_RANGE_DAYS)
+    except ValueError as exc:
+        return JsonResponse({"error": str(exc)}, status=400)
+
+    days = [
+        {
+            "date": day.isoformat(),
+            "weekday": WEEKDAY_NAMES[day.weekday()],
+            "slots": [
+                {"time": slot.strftime("%H:%M"), "label": format_slot_time(slot)}
+                for slot in slots
+            ],
+        }
+        for day, slots in free_slots(doctor, start, end)
+    ]
+    return JsonResponse(
+        {"doctor": doctor.id, "from": start.isoformat(), "to": end.isoformat(), "days": days}
+    )
+
 
+def _doctor_json(doctor):
+    specialization = doctor.specialization
+    return {
+        "id": doctor.id,
+        "name": doctor.name,
+        "specialization": (
+            {"id": specialization.id, "name": specialization.name} if specialization else None
+        ),
+        "experience": doctor.experience,
+        "fees": doctor.fees,
+        "available_days": doctor.day_list,
+        "time_slots": doctor.slot_list,
+        "biography": doctor.biography,
+        "updated_at": doctor.updated_at.isoformat(),
+    }
+
+
+@query_budget(2)
+@conditional(doctor_api_list_validators)
+def api_doctor_list(request):
+    """Read-only doctor listing: ``?specialization=<id>&cursor=<next>``."""
+    doctors = Doctor.objects.select_related("specialization")
+    specialization_id = request.GET.get("specialization")
+    if specialization_id:
+        if not specialization_id.isdigit():
+            return JsonResponse({"error": "'specialization' must be an id."}, status=400)
+        doctors = doctors.filter(specialization_id=specialization_id)
+    page = keyset_paginate(doctors, DOCTOR_ORDERING, request.GET.get("cursor"))
+    return JsonResponse(
+        {
+            "results": [_doctor_json(doctor) for doctor in page],
+            "next": page.next_cursor,
+            "previous": page.prev_cursor,
+        }
+    )
+
+
+@query_budget(2)
+@conditional(doctor_api_detail_validators)
+def api_doctor_detail(request, pk):
+    doctor = get_object_or_404(Doctor.objects.select_related("specialization"), pk=pk)
+    return JsonResponse(_doctor_json(doctor))
 
 
+
+# A POST with slot holds on: session, user, doctor choices (2), patient,
+# then BEGIN, hold check, INSERT, counters, outbox, hold release, COMMIT.
+@query_budget(12)
 @login_required
 def book_appointment(request):
-    form = AppointmentForm(request.POST or None)
+    doctors = caching.doctor_choices(request)
+    form = AppointmentForm(request.POST or None, doctors=doctors)
     if request.method == "POST" and form.is_valid():
         try:
             patient = request.user.patient
@@ -78,48 +245,150 @@ def book_appointment(request):
             messages.error(request, "Patient profile not found.")
             return redirect("home")
 
-        Appointment.objects.create(
-            patient=patient,
-            doctor=form.cleaned_data["doctor"],
-            date=form.cleaned_data["date"],
-            time=form.cleaned_data["time"],
-            notes=form.cleaned_data["notes"],
-        )
-        messages.success(
-            request,
-            "Your appointment request has been submitted. Our team will confirm soon.",
-        )
-        return redirect("appointment_success")
-    
+        try:
+            booking.create_booking(
+                patient=patient,
+                doctor=form.cleaned_data["doctor"],
+                date=form.cleaned_data["date"],
+                time=form.cleaned_data["time"],
+                notes=form.cleaned_data["notes"],
+                user=request.user,
+            )
+        except booking.SlotUnavailable as exc:
+            form.add_error(None, str(exc))
+        else:
+            messages.success(
+                request,
+                "Your appointment request has been submitted. Our team will confirm soon.",
+            )
+            return redirect("appointment_success")
+
     # Pre-fill name and email/phone if possible? 
     # The form currently doesn't accept initial values nicely without modifying form class or passing initial dictionary.
     # For now, just render.
     return render(
         request,
         "book_appointment.html",
-        {"form": form, "doctors": Doctor.objects.all()},
+        {"form": form, "doctors": doctors},
+    )
+
+
+# Session, user, doctor choices (2), then BEGIN, booked check, expired and
+# stale hold cleanup, existing hold, INSERT in a savepoint (3), COMMIT.
+@query_budget(13)
+@login_required
+def api_slot_hold(request):
+    if request.method != "POST":
+        return HttpResponseBadRequest("Invalid method")
+    if not booking.hold_seconds():
+        return JsonResponse({"error": "Slot holds are disabled."}, status=400)
+    if request.content_type == "application/json":
+        try:
+            data = json.loads(request.body.decode("utf-8") or "{}")
+        except ValueError:
+            return JsonResponse({"error": "Invalid JSON."}, status=400)
+    else:
+        data = request.POST
+    form = SlotHoldForm(data)
+    if not form.is_valid():
+        return JsonResponse({"errors": form.errors}, status=400)
+    try:
+        hold = booking.hold_slot(request.user, **form.cleaned_data)
+    except booking.SlotUnavailable as exc:
+        return JsonResponse({"error": str(exc)}, status=409)
+    return JsonResponse(
+        {
+            "doctor": hold.doctor_id,
+            "date": hold.date.isoformat(),
+            "time": hold.time.strftime("%H:%M"),
+            "expires_at": hold.expires_at.isoformat(),
+        },
+        status=201,
     )
 
 
+# Session, user, patient, doctor choices (2), then BEGIN, booked and held
+# checks, one INSERT, counters, outbox, hold release, COMMIT.
+@query_budget(13)
+@login_required
+def api_recurring_booking(request):
+    """
+    Book a series with one doctor in one transaction. The JSON body is
+    ``{"doctor", "start", "time", "count", "interval_weeks"}`` and/or
+    ``{"doctor", "occurrences": [{"date", "time"}, ...]}``. Conflicting
+    occurrences are listed with a reason. Unless ``allow_partial`` is set,
+    any conflict means nothing is booked (409).
+    """
+    if request.method != "POST":
+        return HttpResponseBadRequest("Invalid method")
+    try:
+        data = json.loads(request.body.decode("utf-8") or "{}")
+    except ValueError:
+        return JsonResponse({"error": "Invalid JSON."}, status=400)
+    if not isinstance(data, dict):
+        return JsonResponse({"error": "Expected a JSON object."}, status=400)
+    try:
+        patient = request.user.patient
+    except Patient.DoesNotExist:
+        return JsonResponse({"error": "Patient profile not found."}, status=400)
+    form = RecurringBookingForm(data, doctors=caching.doctor_choices(request))
+    if not form.is_valid():
+        return JsonResponse({"errors": form.errors}, status=400)
+    try:
+        result = booking.create_series(
+            patient,
+            form.cleaned_data["doctor"],
+            form.cleaned_data["slots"],
+            notes=form.cleaned_data["notes"],
+            user=request.user,
+            allow_partial=form.cleaned_data["allow_partial"],
+        )
+    except booking.SlotUnavailable as exc:
+        return JsonResponse({"error": str(exc)}, status=409)
+    return JsonResponse(
+        {
+            "created": [
+                {"id": appt.pk, "date": appt.date.isoformat(), "time": appt.time.strftime("%H:%M")}
+                for appt in result.created
+            ],
+            "conflicts": [
+                {"date": day.isoformat(), "time": slot.strftime("%H:%M"), "reason": reason}
+                for day, slot, reason in result.conflicts
+            ],
+        },
+        status=201 if result.created else 409,
+    )
+
+
+@query_budget(2)
 def appointment_success(request):
     return render(request, "success.html")
 
 
 
+@query_budget(5)
 @login_required
 def appointment_history(request):
     try:
         patient = request.user.patient
-        appointments = Appointment.objects.filter(
-            patient=patient
-        ).select_related("doctor", "patient").order_by("-date", "-time")
     except Patient.DoesNotExist:
-         appointments = []
+        page = None
+    else:
+        # Old completed visits live in the archive; both tables are read
+        # with the same cursor so paging runs straight on into them.
+        page = keyset_paginate_merged(
+            [
+                model.objects.filter(patient=patient).select_related("doctor")
+                for model in (Appointment, AppointmentArchive)
+            ],
+            APPOINTMENT_ORDERING,
+            request.GET.get("cursor"),
+        )
 
     return render(
         request,
         "appointment_history.html",
-        {"appointments": appointments},
+        {"appointments": page, "page": page},
     )
 
 
@@ -129,31 +398,97 @@ def staff_required():
     )
 
 
+@query_budget(4)
 @staff_required()
 def admin_dashboard(request):
-    stats = {
-        "doctors": Doctor.objects.count(),
-        "patients": Patient.objects.count(),
-        "appointments": Appointment.objects.count(),
-        "pending": Appointment.objects.filter(
-            status=Appointment.STATUS_PENDING
-        ).count(),
+    counters = stats.snapshot()
+    dashboard_stats = {
+        "doctors": counters[stats.DOCTORS],
+        "patients": counters[stats.PATIENTS],
+        "appointments": counters[stats.APPOINTMENTS],
+        "pending": counters[stats.status_key(Appointment.STATUS_PENDING)],
     }
-    appointments_by_status = (
-        Appointment.objects.values("status").annotate(total=Count("id"))
-    )
+    appointments_by_status = [
+        {"status": status, "total": counters[stats.status_key(status)]}
+        for status, _ in Appointment.STATUS_CHOICES
+        if counters[stats.status_key(status)]
+    ]
     recent_appointments = Appointment.objects.select_related("doctor", "patient")[:10]
     return render(
         request,
         "admin/dashboard.html",
         {
-            "stats": stats,
+            "stats": dashboard_stats,
             "appointments_by_status": appointments_by_status,
             "recent_appointments": recent_appointments,
         },
     )
 
 
+@query_budget(5)
+@staff_required()
+def api_occupancy(request):
+    """Booked vs capacity per doctor per day: ``?from=&to=&specialization=``."""
+    try:
+        start, end = _date_range(request, 27, OCCUPANCY_MAX_DAYS)
+    except ValueError as exc:
+        return JsonResponse({"error": str(exc)}, status=400)
+    specialization_id = request.GET.get("specialization")
+    if specialization_id and not specialization_id.isdigit():
+        return JsonResponse({"error": "'specialization' must be an id."}, status=400)
+
+    days, rows = occupancy(start, end, specialization_id)
+    return JsonResponse(
+        {
+            "from": start.isoformat(),
+            "to": end.isoformat(),
+            "days": [day.isoformat() for day in days],
+            "doctors": rows,
+            "totals": {
+                "booked": [sum(row["booked"][i] for row in rows) for i in range(len(days))],
+                "capacity": [sum(row["capacity"][i] for row in rows) for i in range(len(days))],
+            },
+        }
+    )
+
+
+def _parse_month(value):
+    return date.fromisoformat(f"{value}-01") if value else None
+
+
+@query_budget(3)
+@staff_required()
+def api_revenue_report(request):
+    """Completed appointments and revenue from the rollups: ``?group=&from=YYYY-MM&to=YYYY-MM``."""
+    group = request.GET.get("group") or "month"
+    if group not in reporting.GROUPS:
+        return JsonResponse(
+            {"error": f"'group' must be one of: {', '.join(reporting.GROUPS)}."}, status=400
+        )
+    try:
+        start = _parse_month(request.GET.get("from"))
+        end = _parse_month(request.GET.get("to"))
+    except ValueError:
+        return JsonResponse({"error": "Months must be in YYYY-MM format."}, status=400)
+
+    rows = reporting.report(group, start, end)
+    return JsonResponse(
+        {
+            "group": group,
+            "from": request.GET.get("from"),
+            "to": request.GET.get("to"),
+            "rows": rows,
+            "totals": {
+                "completed": sum(row["completed"] for row in rows),
+                "revenue": sum(row["revenue"] for row in rows),
+            },
+        }
+    )
+
+
+# Saving a doctor also bumps counters and cache versions, reindexes it for
+# search and rebuilds its schedule slots, in separate transactions.
+@query_budget(4, post=19)
 @staff_required()
 def admin_doctors(request):
     doctors = Doctor.objects.select_related("specialization").all()
@@ -169,6 +504,7 @@ def admin_doctors(request):
     )
 
 
+@query_budget(4, post=15)
 @staff_required()
 def admin_doctor_edit(request, pk):
     doctor = get_object_or_404(Doctor, pk=pk)
@@ -184,6 +520,9 @@ def admin_doctor_edit(request, pk):
     )
 
 
+# The cascade to slots, holds, rollups and appointments, plus the signals
+# of each deleted appointment and the doctor.
+@query_budget(19)
 @staff_required()
 def admin_doctor_delete(request, pk):
     doctor = get_object_or_404(Doctor, pk=pk)
@@ -192,10 +531,20 @@ def admin_doctor_delete(request, pk):
     return redirect("admin_doctors")
 
 
+@query_budget(3, post=6)
 @staff_required()
 def admin_specializations(request):
     form = SpecializationForm(request.POST or None)
-    specializations = Specialization.objects.all()
+    doctor_counts = (
+        Doctor.objects.filter(specialization=OuterRef("pk"))
+        .order_by()
+        .values("specialization")
+        .annotate(total=Count("pk"))
+        .values("total")
+    )
+    specializations = Specialization.objects.annotate(
+        doctor_count=Coalesce(Subquery(doctor_counts), 0)
+    )
     if request.method == "POST" and form.is_valid():
         form.save()
         messages.success(request, "Specialization saved.")
@@ -207,7 +556,9 @@ def admin_specializations(request):
     )
 
 
+@query_budget(5)
 @staff_required()
+@conditional(specialization_validators)
 def admin_specialization_detail(request, pk):
     specialization = get_object_or_404(Specialization, pk=pk)
     data = {
@@ -218,14 +569,13 @@ def admin_specialization_detail(request, pk):
     return JsonResponse(data)
 
 
+@query_budget(3, post=8)
 @staff_required()
 def admin_specialization_edit(request, pk):
     specialization = get_object_or_404(Specialization, pk=pk)
     # Handle JSON (AJAX) update
     if request.content_type == "application/json":
         try:
-            import json
-
             payload = json.loads(request.body.decode("utf-8") or "{}")
             name = payload.get("name", "").strip()
             if not name:
@@ -249,54 +599,124 @@ def admin_specialization_edit(request, pk):
     )
 
 
+@query_budget(2, post=11)
 @staff_required()
 def admin_specialization_delete(request, pk):
     if request.method != 'POST':
         return HttpResponseBadRequest('Invalid method')
     specialization = get_object_or_404(Specialization, pk=pk)
-    # Set affected doctors' specialization to null and delete
-    from .models import Doctor
-
-    Doctor.objects.filter(specialization=specialization).update(specialization=None)
+    # SET_NULL clears the doctors' specialization; the pre_delete handler
+    # invalidates their cache entries and search rows first.
     specialization.delete()
     messages.success(request, "Specialization removed and assigned doctors cleared.")
     return redirect("admin_specializations")
 
 
+# A bulk update reads the affected rows back for the counters, rollups and
+# notifications.
+@query_budget(5, post=15)
 @staff_required()
 def admin_appointments(request):
-    appointments = Appointment.objects.select_related("doctor", "patient")
     filter_form = AppointmentFilterForm(request.GET or None)
-    if filter_form.is_valid():
-        doctor = filter_form.cleaned_data.get("doctor")
-        status = filter_form.cleaned_data.get("status")
-        if doctor:
-            appointments = appointments.filter(doctor=doctor)
-        if status:
-            appointments = appointments.filter(status=status)
-
-    if request.method == "POST":
-        appointment = get_object_or_404(Appointment, pk=request.POST.get("id"))
+    appointments = filter_form.filter(
+        Appointment.objects.select_related("doctor", "patient")
+    )
+    redirect_url = reverse("admin_appointments")
+    if request.GET:
+        redirect_url = f"{redirect_url}?{request.GET.urlencode()}"
+
+    if request.method == "POST" and request.content_type == "application/json":
+        try:
+            payload = json.loads(request.body.decode("utf-8") or "{}")
+        except ValueError:
+            return JsonResponse({"error": "Invalid JSON."}, status=400)
+        if not isinstance(payload, dict):
+            return JsonResponse({"error": "Expected a JSON object."}, status=400)
+        bulk_form = AppointmentBulkStatusForm(
+            {
+                "status": payload.get("status"),
+                "scope": payload.get("scope", AppointmentBulkStatusForm.SCOPE_SELECTED),
+                "ids": payload.get("ids") or [],
+            }
+        )
+        if not bulk_form.is_valid():
+            return JsonResponse({"errors": bulk_form.errors}, status=400)
+        if _filters_rejected(bulk_form, filter_form):
+            return JsonResponse({"errors": filter_form.errors}, status=400)
+        updated = _bulk_update_appointments(bulk_form, appointments)
+        return JsonResponse({"updated": updated, "status": bulk_form.cleaned_data["status"]})
+
+    if request.method == "POST" and request.POST.get("action") == "bulk":
+        bulk_form = AppointmentBulkStatusForm(request.POST)
+        if bulk_form.is_valid():
+            if _filters_rejected(bulk_form, filter_form):
+                messages.error(request, "Invalid filters; no appointments were updated.")
+                return redirect(redirect_url)
+            updated = _bulk_update_appointments(bulk_form, appointments)
+            messages.success(request, f"{updated} appointment(s) updated.")
+            return redirect(redirect_url)
+        for error in bulk_form.non_field_errors() or ["Invalid status update."]:
+            messages.error(request, error)
+    elif request.method == "POST":
+        # The doctor and patient feed the notification.
+        appointment = get_object_or_404(
+            Appointment.objects.select_related("doctor", "patient"), pk=request.POST.get("id")
+        )
         status_form = AppointmentStatusForm(request.POST, instance=appointment)
         if status_form.is_valid():
-            status_form.save()
+            # Keeps the status change and its queued notification together.
+            with transaction.atomic():
+                status_form.save()
             messages.success(request, "Appointment status updated.")
-            params = request.GET.urlencode()
-            redirect_url = reverse("admin_appointments")
-            if params:
-                redirect_url = f"{redirect_url}?{params}"
             return redirect(redirect_url)
         else:
             messages.error(request, "Invalid status update.")
 
-    appointments = appointments.order_by("-date", "-time")
+    page = keyset_paginate(appointments, APPOINTMENT_ORDERING, request.GET.get("cursor"))
     status_form = AppointmentStatusForm()
     return render(
         request,
         "admin/appointments.html",
         {
-            "appointments": appointments,
+            "appointments": page,
+            "page": page,
             "filter_form": filter_form,
             "status_form": status_form,
+            "bulk_form": AppointmentBulkStatusForm(),
         },
     )
+
+
+@query_budget(3)
+@staff_required()
+def admin_appointments_export(request):
+    fmt = request.GET.get("format", "csv")
+    if fmt not in exports.FORMATS:
+        return HttpResponseBadRequest("Unsupported export format")
+    filter_form = AppointmentFilterForm(request.GET)
+    if not filter_form.is_valid():
+        return JsonResponse({"errors": filter_form.errors}, status=400)
+    _, content_type = exports.FORMATS[fmt]
+    response = StreamingHttpResponse(
+        exports.export_lines(filter_form.filter(Appointment.objects.all()), fmt),
+        content_type=content_type,
+    )
+    response["Content-Disposition"] = f'attachment; filename="appointments.{fmt}"'
+    return response
+
+
+def _filters_rejected(bulk_form, filter_form):
+    """A filtered bulk update with invalid filters would otherwise hit every row."""
+    return (
+        bulk_form.cleaned_data["scope"] == AppointmentBulkStatusForm.SCOPE_FILTERED
+        and bool(filter_form.errors)
+    )
+
+
+def _bulk_update_appointments(bulk_form, filtered):
+    """Apply a validated bulk form to the selected ids or the whole filtered set."""
+    if bulk_form.cleaned_data["scope"] == AppointmentBulkStatusForm.SCOPE_FILTERED:
+        queryset = filtered
+    else:
+        queryset = Appointment.objects.filter(pk__in=bulk_form.cleaned_data["ids"])
+    return booking.bulk_set_status(queryset, bulk_form.cleaned_data["status"])